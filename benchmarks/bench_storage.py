@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+
+def bench_get_messages_in_range_all(message_store, message_count, measure):
+    """读取全部日期范围内的消息"""
+    storage, start, end = message_store
+    messages = measure(lambda: storage.get_messages_in_range(start, end), message_count)
+    assert len(messages) == message_count
+
+
+def bench_get_messages_in_range_last_week(message_store, message_count, measure):
+    """读取最近 7 天的消息（聊天上下文的默认窗口）"""
+    storage, start, end = message_store
+    week_start = max(start, end - timedelta(days=7))
+    messages = measure(lambda: storage.get_messages_in_range(week_start, end), message_count)
+    assert messages
+
+
+def bench_get_messages_page_newest(message_store, message_count, measure):
+    """读取最新的一页消息（聊天页面打开时的默认视图）"""
+    storage, start, end = message_store
+    messages, _ = measure(lambda: storage.get_messages_page(limit=50), message_count)
+    assert len(messages) == min(50, message_count)
@@ -0,0 +1,25 @@
+def bench_load_trajectory(trajectory_file, point_count, measure):
+    """从 JSON 文件加载轨迹"""
+    from modules.spatial_decision.coordinate.coordinate_system import CoordinateSystem
+
+    system = CoordinateSystem()
+    measure(lambda: system.load_trajectory(trajectory_file), point_count)
+    assert len(system.get_trajectory()) == point_count
+
+
+def bench_basic_stats(coordinate_system, point_count, measure):
+    """计算轨迹的基本统计信息"""
+    from modules.spatial_decision.analysis.trajectory_analysis import TrajectoryAnalysis
+
+    analysis = TrajectoryAnalysis(coordinate_system)
+    stats = measure(analysis.get_basic_stats, point_count)
+    assert stats["total_points"] == point_count
+
+
+def bench_create_plot(coordinate_system, point_count, measure):
+    """生成轨迹图"""
+    from modules.spatial_decision.visualization.trajectory_plot import TrajectoryPlot
+
+    plot = TrajectoryPlot(coordinate_system)
+    figure = measure(plot.create_plot, point_count)
+    assert figure.data
@@ -0,0 +1,65 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# 基准测试只测量函数本身，不写入指标文件
+os.environ.setdefault("TELEMETRY_ENABLED", "false")
+
+from benchmarks import datagen  # noqa: E402
+
+# 数据规模通过 BENCH_SCALE 选择：small（默认，适合日常运行）、medium、large（百万级，耗时较长）
+SCALES = {
+    "small": {"messages": [1_000], "points": [1_000]},
+    "medium": {"messages": [1_000, 100_000], "points": [1_000, 100_000]},
+    "large": {"messages": [1_000, 100_000, 1_000_000], "points": [1_000, 1_000_000]},
+}
+SCALE = SCALES[os.getenv("BENCH_SCALE", "small")]
+
+
+def pytest_generate_tests(metafunc):
+    if "message_count" in metafunc.fixturenames:
+        metafunc.parametrize("message_count", SCALE["messages"], scope="session")
+    if "point_count" in metafunc.fixturenames:
+        metafunc.parametrize("point_count", SCALE["points"], scope="session")
+
+
+@pytest.fixture(scope="session")
+def message_store(tmp_path_factory, message_count):
+    """按规模生成的消息目录，返回 (StorageService, 开始时间, 结束时间)"""
+    from server.services.storage_service import StorageService
+
+    base = tmp_path_factory.mktemp(f"messages_{message_count}")
+    messages_dir, thought_dir = str(base / "messages"), str(base / "thought_process")
+    start, end = datagen.write_messages(messages_dir, thought_dir, message_count)
+    return StorageService(messages_dir, thought_dir), start, end
+
+
+@pytest.fixture(scope="session")
+def trajectory_file(tmp_path_factory, point_count):
+    """按规模生成的轨迹文件路径"""
+    base = tmp_path_factory.mktemp(f"trajectory_{point_count}")
+    return datagen.write_trajectory(str(base / "trajectory.json"), point_count)
+
+
+@pytest.fixture(scope="session")
+def coordinate_system(trajectory_file):
+    from modules.spatial_decision.coordinate.coordinate_system import CoordinateSystem
+
+    system = CoordinateSystem()
+    system.load_trajectory(trajectory_file)
+    return system
+
+
+@pytest.fixture
+def measure(benchmark):
+    """小数据量使用默认的自动轮数，大数据量固定轮数，避免单个用例耗时过长"""
+    def run(fn, size: int):
+        if size >= 100_000:
+            return benchmark.pedantic(fn, rounds=3, iterations=1, warmup_rounds=0)
+        return benchmark(fn)
+    return run
@@ -0,0 +1,94 @@
+"""基准测试用的合成数据生成器
+
+生成的数据格式与 StorageService、CoordinateSystem 的存储格式一致。
+"""
+import json
+import math
+import os
+import random
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+SENDERS = ("male", "female")
+SENTENCES = [
+    "今天天气不错，要不要出去走走？",
+    "我在想上次我们聊的那个话题，其实还有另一种可能。",
+    "嗯，我也是这么觉得的。",
+    "你说得对，不过我还是有点担心。",
+    "晚上一起吃饭吧，我知道一家新开的店。",
+]
+
+
+def message_days(total: int) -> int:
+    """消息分布的天数：每天约 100 条，最多一年"""
+    return max(1, min(365, total // 100))
+
+
+def write_messages(messages_dir: str, thought_dir: str, total: int, end: datetime = None,
+                   seed: int = 0) -> Tuple[datetime, datetime]:
+    """生成 total 条消息，按天写入 messages_dir，约三分之一带有思维过程
+
+    Returns:
+        (第一条消息的时间, 最后一条消息的时间)
+    """
+    rng = random.Random(seed)
+    end = end or datetime.now().replace(microsecond=0)
+    days = message_days(total)
+    start = (end - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0)
+    os.makedirs(messages_dir, exist_ok=True)
+    os.makedirs(thought_dir, exist_ok=True)
+
+    per_day = math.ceil(total / days)
+    written = 0
+    for day in range(days):
+        date = start + timedelta(days=day)
+        count = min(per_day, total - written)
+        if count <= 0:
+            break
+        step = 86400 / count
+        messages, thoughts = [], []
+        for i in range(count):
+            thought = rng.choice(SENTENCES) * 3 if rng.random() < 0.33 else None
+            message = {
+                "content": rng.choice(SENTENCES),
+                "sender": SENDERS[(written + i) % 2],
+                "timestamp": (date + timedelta(seconds=int(i * step))).isoformat(),
+                "thought_process": thought,
+            }
+            messages.append(message)
+            if thought:
+                thoughts.append(message)
+        name = f"{date.strftime('%Y-%m-%d')}.json"
+        with open(os.path.join(messages_dir, name), "w", encoding="utf-8") as f:
+            json.dump(messages, f, ensure_ascii=False, indent=2)
+        if thoughts:
+            with open(os.path.join(thought_dir, name), "w", encoding="utf-8") as f:
+                json.dump(thoughts, f, ensure_ascii=False, indent=2)
+        written += count
+    return start, start + timedelta(days=days) - timedelta(seconds=1)
+
+
+def random_walk(points: int, seed: int = 0) -> List[dict]:
+    """生成随机游走的轨迹点，格式与 Coordinate.to_dict() 一致"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    x = y = 0.0
+    trajectory = []
+    for i in range(points):
+        x += rng.gauss(0, 1.5)
+        y += rng.gauss(0, 1.5)
+        trajectory.append({
+            "x": round(x, 3),
+            "y": round(y, 3),
+            "timestamp": (start + timedelta(seconds=i)).isoformat(),
+            "thought_process": "继续向前探索" if i % 10 == 0 else None,
+        })
+    return trajectory
+
+
+def write_trajectory(path: str, points: int, seed: int = 0) -> str:
+    """生成轨迹文件"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(random_walk(points, seed), f, indent=2)
+    return path
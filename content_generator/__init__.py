@@ -1,5 +1,17 @@
 from .base_generator import BaseGenerator
 from .tech_page import TechArticleGenerator
 from .xiaohongshu import XiaohongshuGenerator
+from .tech_article_about_project import ProjectArticleGenerator
+from .pipeline import JobPipeline
+from .jobs import JobRunner, load_manifest, run_manifest
 
-__all__ = ['BaseGenerator', 'TechArticleGenerator', 'XiaohongshuGenerator'] 
\ No newline at end of file
+__all__ = [
+    'BaseGenerator',
+    'TechArticleGenerator',
+    'XiaohongshuGenerator',
+    'ProjectArticleGenerator',
+    'JobPipeline',
+    'JobRunner',
+    'load_manifest',
+    'run_manifest'
+]
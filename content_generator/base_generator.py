@@ -1,21 +1,41 @@
 import os
-from typing import Dict, Any, List
-from openai import OpenAI
-from dotenv import load_dotenv
+from typing import Dict, Any, List, Optional
+from server.config.settings import load_env
+from server.services.llm_provider import create_provider
+from utils.response_cache import get_response_cache
 
-load_dotenv()
-print(os.getenv("API_KEY"))
 class BaseGenerator:
     def __init__(self, output_dir: str = "generated_content"):
+        # 首次创建生成器时才加载 .env，导入模块时不读取文件
+        load_env()
         self.api_key = os.getenv("API_KEY")
         self.api_base = os.getenv("API_BASE_URL")
         self.model_name = os.getenv("MODEL_NAME")
         
-        self.client = OpenAI(
-            api_key=self.api_key,
-            base_url=self.api_base
-        )
+        # 与聊天服务使用相同的 provider，MODEL_TYPE=ollama 时使用 Ollama 原生流式接口
+        model_type = os.getenv("MODEL_TYPE", "openai")
+        if model_type == "ollama":
+            model_config = {"model": self.model_name, "base_url": os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")}
+        else:
+            model_config = {"model_name": self.model_name, "api_key": self.api_key, "base_url": self.api_base}
+        # 文章篇幅较长，不限制最大生成长度
+        model_config["max_tokens"] = None
+        self.provider = create_provider(model_type, model_config)
         self.output_dir = output_dir
+        # 流式生成时边生成边写入临时文件，完成后再重命名，中断后重跑可跳过已完成的文件
+        self.stream_to_file = os.getenv("CONTENT_STREAM_TO_FILE", "true").lower() == "true"
+        # 响应缓存（通过 LLM_CACHE_ENABLED 开启），设为 None 可关闭
+        self.cache = get_response_cache()
+        # 为 True 时生成失败直接抛出异常（批量任务据此区分错误类型），否则打印错误并返回 None
+        self.raise_errors = False
+        
+    def _build_messages(self, prompt: str, system_prompt: str = None) -> List[Dict[str, str]]:
+        """构建请求消息"""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        return messages
         
     def generate_content(self, prompt: str, system_prompt: str = None, temperature: float = 0.7) -> str:
         """
@@ -29,21 +49,115 @@ class BaseGenerator:
         Returns:
             生成的内容
         """
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
+        messages = self._build_messages(prompt, system_prompt)
+        temperature = float(os.getenv("TEMPERATURE", temperature))
+        
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.make_key(self.model_name, messages, temperature)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        try:
+            content = self.provider.complete(messages, temperature=temperature, source="content")
+            if cache_key and content:
+                self.cache.set(cache_key, content)
+            return content
+        except Exception as e:
+            print(f"生成内容时发生错误: {str(e)}")
+            if self.raise_errors:
+                raise
+            return None
+            
+    def generate_content_to_file(self, prompt: str, filename: str, system_prompt: str = None,
+                                 temperature: float = 0.7, directory: str = None,
+                                 overwrite: bool = False) -> Optional[str]:
+        """
+        流式生成内容，边生成边写入文件
+        
+        内容先写入 <文件名>.part 临时文件，生成完成后原子重命名为目标文件。
+        目标文件已存在时视为已完成，直接返回其内容；生成失败时保留 .part 文件供排查，重跑时覆盖。
+        
+        Args:
+            prompt: 用户提示词
+            filename: 文件名，重跑时需使用相同的文件名才能跳过已完成的内容
+            system_prompt: 系统提示词
+            temperature: 生成的随机性，0-1之间
+            directory: 保存目录，如果为None则使用默认目录
+            overwrite: 是否覆盖已存在的文件
+            
+        Returns:
+            生成的内容，失败时返回 None
+        """
+        save_dir = directory or self.output_dir
+        os.makedirs(save_dir, exist_ok=True)
+        file_path = os.path.join(save_dir, filename)
+        
+        if os.path.exists(file_path) and not overwrite:
+            print(f"文件已存在，跳过生成: {file_path}")
+            with open(file_path, "r", encoding="utf-8") as f:
+                return f.read()
+        
+        messages = self._build_messages(prompt, system_prompt)
+        temperature = float(os.getenv("TEMPERATURE", temperature))
         
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.make_key(self.model_name, messages, temperature)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.save_content(cached, filename, save_dir)
+                return cached
+        
+        part_path = file_path + ".part"
         try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=messages,
-                temperature=float(os.getenv("TEMPERATURE", temperature))
-            )
-            return response.choices[0].message.content
+            # 收到第一个数据块前的 429/5xx 错误会自动重试，开始写入后出错不再重试
+            deltas = self.provider.stream(messages, temperature=temperature, source="content")
+            with open(part_path, "w", encoding="utf-8") as f:
+                for delta in deltas:
+                    if delta.content:
+                        f.write(delta.content)
+                        f.flush()
         except Exception as e:
             print(f"生成内容时发生错误: {str(e)}")
+            if os.path.exists(part_path):
+                print(f"已生成的部分保存在: {part_path}")
+            if self.raise_errors:
+                raise
             return None
+        
+        if os.path.getsize(part_path) == 0:
+            os.remove(part_path)
+            print("生成内容为空")
+            return None
+        
+        os.replace(part_path, file_path)
+        print(f"内容已保存到: {file_path}")
+        
+        with open(file_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        if cache_key:
+            self.cache.set(cache_key, content)
+        return content
+        
+    def generate_and_save(self, prompt: str, filename: str, system_prompt: str = None,
+                          temperature: float = 0.7) -> Optional[str]:
+        """
+        生成内容并保存到输出目录
+        
+        开启 stream_to_file 时使用流式写入，否则生成完成后一次性保存
+        
+        Returns:
+            生成的内容，失败时返回 None
+        """
+        if self.stream_to_file:
+            return self.generate_content_to_file(prompt, filename, system_prompt, temperature)
+        
+        content = self.generate_content(prompt, system_prompt, temperature)
+        if content:
+            self.save_content(content, filename)
+        return content
             
     def save_content(self, content: str, filename: str, directory: str = None):
         """
@@ -59,6 +173,9 @@ class BaseGenerator:
             os.makedirs(save_dir)
             
         file_path = os.path.join(save_dir, filename)
-        with open(file_path, "w", encoding="utf-8") as f:
+        # 先写临时文件再替换，避免中断时留下不完整的文件
+        part_path = file_path + ".part"
+        with open(part_path, "w", encoding="utf-8") as f:
             f.write(content)
+        os.replace(part_path, file_path)
         print(f"内容已保存到: {file_path}") 
\ No newline at end of file
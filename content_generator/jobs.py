@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from .pipeline import JobPipeline, JobResult
+from .tech_article_about_project import ProjectArticleGenerator
+from .tech_page import TechArticleGenerator
+from .xiaohongshu import XiaohongshuGenerator
+
+DEFAULT_MANIFEST = "data/config/content_jobs.json"
+CHECKPOINT_FILE = ".checkpoint.jsonl"
+
+
+def load_manifest(path: str) -> Dict:
+    """加载任务清单，支持 JSON 和 YAML（需要安装 PyYAML）"""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("读取 YAML 任务清单需要安装 PyYAML: pip install pyyaml")
+            manifest = yaml.safe_load(f)
+        else:
+            manifest = json.load(f)
+
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("jobs"), list):
+        raise ValueError(f"任务清单格式错误，缺少 jobs 列表: {path}")
+    return manifest
+
+
+@dataclass
+class Job:
+    """一个生成任务，id 由任务类型和参数计算，相同的任务只会执行一次"""
+    type: str
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def id(self) -> str:
+        raw = json.dumps({"type": self.type, "params": self.params}, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+    @property
+    def name(self) -> str:
+        return f"{self.type} {self.params.get('topic', '')}".strip()
+
+    def filename(self) -> str:
+        """固定的输出文件名，包含任务 id 以区分同主题的不同任务"""
+        topic = str(self.params.get("topic", self.type)).replace(" ", "_").replace("/", "_")
+        return f"{self.type}_{topic}_{self.id[:8]}.md"
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Job":
+        data = dict(data)
+        job_type = data.pop("type", None)
+        if not job_type:
+            raise ValueError(f"任务缺少 type 字段: {data}")
+        return cls(type=job_type, params=data)
+
+
+class JobRunner:
+    """按任务清单批量生成内容
+
+    - 按任务 id 去重
+    - 已完成的任务记录在输出目录的 .checkpoint.jsonl 中，重跑时跳过
+    - 接口错误只在 LLM 调用层（call_with_retry）重试，不可重试的错误（如 401、400）和重试后仍然失败的错误直接使任务失败
+    - 生成结果为空时按指数退避加随机抖动重试
+    - 结束后打印吞吐量统计
+    """
+
+    JOB_TYPES = ("tech", "xiaohongshu", "xiaohongshu_titles", "project")
+
+    def __init__(self, manifest: Dict, output_dir: str = None, concurrency: int = None,
+                 requests_per_minute: float = None):
+        self.output_dir = output_dir or manifest.get("output_dir") or f"generated_articles_{datetime.now().strftime('%Y%m%d')}"
+        self.concurrency = concurrency or manifest.get("concurrency") or int(os.getenv("CONTENT_CONCURRENCY", "4"))
+        self.requests_per_minute = (
+            requests_per_minute if requests_per_minute is not None
+            else manifest.get("requests_per_minute", float(os.getenv("CONTENT_RPM", "0")))
+        )
+        self.max_retries = manifest.get("max_retries", 3)
+        self.backoff_base = manifest.get("backoff_base", 2.0)
+        self.backoff_max = manifest.get("backoff_max", 60.0)
+        self.jobs = self._dedupe([Job.from_dict(item) for item in manifest["jobs"]])
+
+        self._generators: Dict[str, Any] = {}
+        self._generator_lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()
+        self._generated_chars = 0
+
+    @property
+    def checkpoint_path(self) -> str:
+        return os.path.join(self.output_dir, CHECKPOINT_FILE)
+
+    def _dedupe(self, jobs: List[Job]) -> List[Job]:
+        """去除重复任务，并检查任务类型"""
+        unique: Dict[str, Job] = {}
+        for job in jobs:
+            if job.type not in self.JOB_TYPES:
+                raise ValueError(f"不支持的任务类型: {job.type}")
+            unique.setdefault(job.id, job)
+        if len(unique) < len(jobs):
+            print(f"去除了 {len(jobs) - len(unique)} 个重复任务")
+        return list(unique.values())
+
+    def load_checkpoint(self) -> Set[str]:
+        """读取已完成的任务 id"""
+        if not os.path.exists(self.checkpoint_path):
+            return set()
+        finished = set()
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    finished.add(json.loads(line)["id"])
+                except (json.JSONDecodeError, KeyError):
+                    # 中断时可能留下不完整的最后一行
+                    continue
+        return finished
+
+    def _record_checkpoint(self, job: Job, duration: float):
+        record = {
+            "id": job.id,
+            "type": job.type,
+            "file": job.filename(),
+            "duration": round(duration, 2),
+            "finished_at": datetime.now().isoformat()
+        }
+        with self._checkpoint_lock:
+            with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _generator(self, job_type: str):
+        """每种任务类型共享一个生成器实例"""
+        with self._generator_lock:
+            if job_type not in self._generators:
+                if job_type == "tech":
+                    generator = TechArticleGenerator(self.output_dir)
+                elif job_type == "project":
+                    generator = ProjectArticleGenerator(self.output_dir)
+                else:
+                    generator = XiaohongshuGenerator(self.output_dir)
+                # 生成失败时抛出原始异常，不再当作空结果重试
+                generator.raise_errors = True
+                self._generators[job_type] = generator
+            return self._generators[job_type]
+
+    def _execute(self, job: Job) -> Optional[str]:
+        """执行一次生成，返回生成的内容"""
+        generator = self._generator(job.type)
+        params = job.params
+        filename = job.filename()
+
+        if job.type == "tech":
+            return generator.generate_tech_article(
+                topic=params["topic"],
+                keywords=params.get("keywords"),
+                filename=filename
+            )
+        if job.type == "xiaohongshu":
+            return generator.generate_post(
+                topic=params["topic"],
+                style=params.get("style", "种草"),
+                tags=params.get("tags"),
+                length=params.get("length", "中等"),
+                filename=filename
+            )
+        if job.type == "xiaohongshu_titles":
+            titles = generator.generate_title_options(params["topic"], params.get("num_options", 3))
+            if not titles:
+                return None
+            content = "\n".join(titles)
+            generator.save_content(content, filename)
+            return content
+        return generator.generate_project_article(filename=filename)
+
+    def _run_with_retry(self, job: Job) -> str:
+        """执行任务，生成结果为空时按指数退避重试
+
+        接口错误在 LLM 调用层已经按错误类型重试过，这里不再重试，直接抛出使任务失败。
+        """
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            content = self._execute(job)
+            if content:
+                self._record_checkpoint(job, time.perf_counter() - start)
+                with self._checkpoint_lock:
+                    self._generated_chars += len(content)
+                return content
+
+            if attempt < self.max_retries:
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt)) * random.uniform(0.5, 1.5)
+                print(f"任务 {job.name} 第 {attempt + 1} 次生成结果为空，{delay:.1f}s 后重试")
+                time.sleep(delay)
+        raise RuntimeError(f"重试 {self.max_retries} 次后生成结果仍然为空")
+
+    def run(self) -> List[JobResult]:
+        """执行所有未完成的任务"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        finished = self.load_checkpoint()
+        pending = [job for job in self.jobs if job.id not in finished]
+        print(f"共 {len(self.jobs)} 个任务，已完成 {len(self.jobs) - len(pending)} 个，待执行 {len(pending)} 个")
+        if not pending:
+            return []
+
+        pipeline = JobPipeline(max_workers=self.concurrency, requests_per_minute=self.requests_per_minute)
+        started = time.perf_counter()
+        for job in pending:
+            pipeline.submit(job.name, self._run_with_retry, job)
+        results = pipeline.wait()
+
+        pipeline.print_summary(results)
+        elapsed = time.perf_counter() - started
+        succeeded = sum(1 for result in results if result.ok)
+        print(f"吞吐量: {succeeded / elapsed * 60:.1f} 篇/分钟，{self._generated_chars / elapsed:.0f} 字/秒")
+        print(f"输出目录: {self.output_dir}")
+        return results
+
+
+def run_manifest(path: str = DEFAULT_MANIFEST, **kwargs) -> List[JobResult]:
+    """加载任务清单并执行"""
+    return JobRunner(load_manifest(path), **kwargs).run()
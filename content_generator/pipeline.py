@@ -0,0 +1,91 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+
+@dataclass
+class JobResult:
+    """单个生成任务的结果和耗时"""
+    name: str
+    result: Any = None
+    error: Optional[str] = None
+    started_at: float = None
+    duration: float = None  # 秒
+
+    @property
+    def ok(self) -> bool:
+        # 生成器在出错时返回 None，同样视为失败
+        return self.error is None and self.result is not None
+
+
+class JobPipeline:
+    """并发执行内容生成任务的流水线
+
+    所有任务提交到同一个线程池，通过 max_workers 限制并发数，
+    通过 requests_per_minute 限制任务启动速率，避免触发服务端限流。
+    """
+
+    def __init__(self, max_workers: int = 4, requests_per_minute: float = 0):
+        self.max_workers = max_workers
+        self.min_interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="content-job")
+        self._jobs: List[Tuple[str, Future]] = []
+        self._pace_lock = threading.Lock()
+        self._next_start = 0.0
+        self._started = time.perf_counter()
+
+    def submit(self, name: str, fn: Callable, *args, **kwargs) -> Future:
+        """提交一个任务，返回的 Future 结果为 JobResult"""
+        future = self._executor.submit(self._run, name, fn, args, kwargs)
+        self._jobs.append((name, future))
+        return future
+
+    def _wait_for_slot(self):
+        """按最小间隔排队启动任务"""
+        if not self.min_interval:
+            return
+        with self._pace_lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_start)
+            self._next_start = start_at + self.min_interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
+    def _run(self, name: str, fn: Callable, args: tuple, kwargs: dict) -> JobResult:
+        self._wait_for_slot()
+        job = JobResult(name=name, started_at=time.perf_counter() - self._started)
+        start = time.perf_counter()
+        try:
+            job.result = fn(*args, **kwargs)
+        except Exception as e:
+            job.error = str(e)
+            print(f"任务 {name} 失败: {e}")
+        finally:
+            job.duration = round(time.perf_counter() - start, 2)
+        return job
+
+    def wait(self) -> List[JobResult]:
+        """等待所有任务完成，按提交顺序返回结果"""
+        results = [future.result() for _, future in self._jobs]
+        self._executor.shutdown(wait=True)
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._executor.shutdown(wait=True)
+
+    def print_summary(self, results: List[JobResult], slowest: int = 3):
+        """打印任务统计信息"""
+        wall_time = time.perf_counter() - self._started
+        succeeded = [job for job in results if job.ok]
+        busy_time = sum(job.duration or 0 for job in results)
+
+        print(f"\n共 {len(results)} 个任务，成功 {len(succeeded)} 个，失败 {len(results) - len(succeeded)} 个")
+        print(f"总耗时 {wall_time:.1f}s，任务累计耗时 {busy_time:.1f}s，并发数 {self.max_workers}")
+        for job in sorted(results, key=lambda j: j.duration or 0, reverse=True)[:slowest]:
+            status = "成功" if job.ok else f"失败 {job.error or ''}".strip()
+            print(f"  {job.name}: {job.duration}s（开始于 {job.started_at:.1f}s，{status}）")
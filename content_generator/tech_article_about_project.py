@@ -2,8 +2,8 @@ from .base_generator import BaseGenerator
 import datetime
 
 class ProjectArticleGenerator(BaseGenerator):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, output_dir: str = "generated_content"):
+        super().__init__(output_dir)
         self.system_prompt = """你是一位技术博主，擅长写作技术分享文章。
 你需要写一篇介绍开源项目的技术文章，要求：
 1. 文风专业但不晦涩
@@ -12,8 +12,12 @@ class ProjectArticleGenerator(BaseGenerator):
 4. 突出实际应用价值
 5. 引导读者参与和贡献"""
 
-    def generate_project_article(self) -> str:
-        """生成项目介绍文章"""
+    def generate_project_article(self, filename: str = None) -> str:
+        """生成项目介绍文章
+        
+        Args:
+            filename: 输出文件名，默认按时间生成；批量任务使用固定文件名以便重跑时跳过
+        """
         prompt = """请写一篇介绍 Two聊天项目的技术文章，主题是《Two聊天：基于大语言模型的社会关系研究工具》，要求：
 
 1. 文章结构：
@@ -40,12 +44,10 @@ class ProjectArticleGenerator(BaseGenerator):
 
 4. 文末加入项目地址和参与方式"""
 
-        content = self.generate_content(prompt, self.system_prompt, temperature=0.7)
-        if content:
+        if filename is None:
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"project_article_{timestamp}.md"
-            self.save_content(content, filename)
-        return content
+        return self.generate_and_save(prompt, filename, self.system_prompt, temperature=0.7)
 
 if __name__ == "__main__":
     generator = ProjectArticleGenerator()
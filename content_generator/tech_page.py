@@ -3,8 +3,8 @@ import datetime
 from typing import List
 
 class TechArticleGenerator(BaseGenerator):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, output_dir: str = "generated_content"):
+        super().__init__(output_dir)
         self.system_prompt = """你是一位经验丰富的技术博主，擅长写作通俗易懂的技术文章。
 你的文章特点是：
 1. 结构清晰，层次分明
@@ -13,13 +13,14 @@ class TechArticleGenerator(BaseGenerator):
 4. 文风专业但不枯燥
 5. 适当使用 Markdown 格式增强可读性"""
         
-    def generate_tech_article(self, topic: str, keywords: List[str] = None) -> str:
+    def generate_tech_article(self, topic: str, keywords: List[str] = None, filename: str = None) -> str:
         """
         生成技术文章
         
         Args:
             topic: 文章主题
             keywords: 需要包含的关键词列表
+            filename: 输出文件名，默认按主题和时间生成；批量任务使用固定文件名以便重跑时跳过
         
         Returns:
             生成的技术文章
@@ -33,12 +34,10 @@ class TechArticleGenerator(BaseGenerator):
         if keywords:
             prompt += f"\n5. 请在文章中自然地包含以下关键词：{', '.join(keywords)}"
             
-        content = self.generate_content(prompt, self.system_prompt, temperature=0.7)
-        if content:
+        if filename is None:
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"tech_{topic.replace(' ', '_')}_{timestamp}.md"
-            self.save_content(content, filename)
-        return content
+        return self.generate_and_save(prompt, filename, self.system_prompt, temperature=0.7)
 
 if __name__ == "__main__":
     # 使用示例
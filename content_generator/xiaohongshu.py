@@ -3,8 +3,8 @@ import datetime
 from typing import List, Optional
 
 class XiaohongshuGenerator(BaseGenerator):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, output_dir: str = "generated_content"):
+        super().__init__(output_dir)
         self.system_prompt = """你是一位深谙小红书平台调性的博主，擅长创作吸引人的种草笔记。
 你的文章特点是：
 1. 标题吸引人，善用emoji
@@ -20,7 +20,8 @@ class XiaohongshuGenerator(BaseGenerator):
         topic: str,
         style: str = "种草",
         tags: List[str] = None,
-        length: str = "中等"
+        length: str = "中等",
+        filename: str = None
     ) -> str:
         """
         生成小红书风格的文章
@@ -30,6 +31,7 @@ class XiaohongshuGenerator(BaseGenerator):
             style: 文章风格，如：种草、测评、经验分享等
             tags: 文章标签
             length: 文章长度，可选：短、中等、长
+            filename: 输出文件名，默认按主题和时间生成；批量任务使用固定文件名以便重跑时跳过
         
         Returns:
             生成的小红书文章
@@ -50,12 +52,10 @@ class XiaohongshuGenerator(BaseGenerator):
         if tags:
             prompt += f"\n6. 请在文章中自然融入以下标签：{', '.join(tags)}"
             
-        content = self.generate_content(prompt, self.system_prompt, temperature=0.8)
-        if content:
+        if filename is None:
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"xiaohongshu_{topic.replace(' ', '_')}_{timestamp}.md"
-            self.save_content(content, filename)
-        return content
+        return self.generate_and_save(prompt, filename, self.system_prompt, temperature=0.8)
 
     def generate_title_options(self, topic: str, num_options: int = 3) -> List[str]:
         """
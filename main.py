@@ -1,12 +1,12 @@
 import streamlit as st
 from server.services.chat_service import ChatService
-from server.services.storage_service import StorageService
+from server.services.storage_service import StorageService, start_background_compaction
 from datetime import datetime
 import os
-from dotenv import load_dotenv
+from server.config.settings import load_env
 
 # 加载环境变量
-load_dotenv()
+load_env()
 
 # 检查必要的环境变量
 def check_environment():
@@ -40,6 +40,8 @@ def init_services():
         messages_dir=messages_dir,
         thought_process_dir=thought_process_dir
     )
+    # 配置了 ARCHIVE_AFTER_DAYS 时在后台定期归档旧的日文件
+    start_background_compaction(storage_service)
     
     # 获取模型类型
     model_type = os.getenv("MODEL_TYPE")
@@ -56,7 +58,8 @@ def init_services():
         model_config = {
             "model": os.getenv("MODEL_NAME"),
             "temperature": float(os.getenv("TEMPERATURE", "0.7")),
-            "base_url": os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+            "base_url": os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
+            "keep_alive": os.getenv("OLLAMA_KEEP_ALIVE", "30m")
         }
     
     try:
@@ -0,0 +1,129 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import date
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from server.services.storage_service import StorageService
+from .conversation_analysis import messages_to_frame
+
+STATE_FILE = "_export_state.json"
+EXPORT_COLUMNS = ["timestamp", "sender", "content", "length", "thought_process", "thought_length", "has_thought"]
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("导出 Parquet 需要 pyarrow，请先运行 pip install pyarrow")
+
+
+class ParquetExporter:
+    """把消息日文件增量导出为按日期分区的 Parquet 数据集
+
+    目录结构为 <output_dir>/date=YYYY-MM-DD/part-0.parquet（hive 分区，pandas、pyarrow、duckdb 都可以直接按分区过滤），
+    _export_state.json 记录每天导出时的数据标识（StorageService.day_info 的 source），只有变化过的日期会重新导出。
+    """
+
+    def __init__(self, storage: StorageService, output_dir: str):
+        self.storage = storage
+        self.output_dir = output_dir
+        self.state_path = os.path.join(output_dir, STATE_FILE)
+
+    def _load_state(self) -> Dict:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_state(self, state: Dict):
+        os.makedirs(self.output_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.output_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def _partition_dir(self, name: str) -> str:
+        return os.path.join(self.output_dir, f"date={name}")
+
+    def _export_day(self, day: date):
+        frame = messages_to_frame(self.storage.resolve_thoughts(self.storage.read_day(day)))
+        frame["has_thought"] = frame["thought_length"] > 0
+        frame["sender"] = frame["sender"].astype(str)
+
+        partition = self._partition_dir(day.isoformat())
+        os.makedirs(partition, exist_ok=True)
+        tmp_path = os.path.join(partition, "part-0.parquet.tmp")
+        frame[EXPORT_COLUMNS].to_parquet(tmp_path, engine="pyarrow", index=False, compression="zstd")
+        os.replace(tmp_path, os.path.join(partition, "part-0.parquet"))
+
+    def sync(self, full: bool = False) -> Dict[str, int]:
+        """导出新增或有变化的日期，删除已经不存在的日期
+
+        Args:
+            full: 忽略导出记录，重新导出全部日期
+
+        Returns:
+            Dict[str, int]: exported、skipped、removed 三项计数
+        """
+        _require_pyarrow()
+        state = {} if full else self._load_state()
+        stats = {"exported": 0, "skipped": 0, "removed": 0}
+        current = set()
+
+        for day in self.storage.message_days():
+            name = day.isoformat()
+            info = self.storage.day_info(day)
+            if not info:
+                continue
+            current.add(name)
+            source = info["source"]
+            if state.get(name) == source and os.path.exists(self._partition_dir(name)):
+                stats["skipped"] += 1
+                continue
+            self._export_day(day)
+            state[name] = source
+            stats["exported"] += 1
+
+        for name in set(state) - current:
+            shutil.rmtree(self._partition_dir(name), ignore_errors=True)
+            state.pop(name)
+            stats["removed"] += 1
+
+        self._save_state(state)
+        return stats
+
+
+def read_export(output_dir: str, start: date = None, end: date = None,
+                columns: List[str] = None) -> pd.DataFrame:
+    """读取导出的数据集，只读取需要的列和日期分区
+
+    Args:
+        output_dir: 导出目录
+        start: 开始日期（包含）
+        end: 结束日期（包含）
+        columns: 需要的列，默认全部
+
+    Returns:
+        pd.DataFrame: 按时间排序的消息
+    """
+    _require_pyarrow()
+    filters: Optional[List] = []
+    if start:
+        filters.append(("date", ">=", start.isoformat()))
+    if end:
+        filters.append(("date", "<=", end.isoformat()))
+    frame = pd.read_parquet(
+        output_dir,
+        engine="pyarrow",
+        columns=columns,
+        filters=filters or None,
+        partitioning="hive",
+    )
+    if "timestamp" in frame.columns:
+        frame = frame.sort_values("timestamp", kind="stable", ignore_index=True)
+    return frame
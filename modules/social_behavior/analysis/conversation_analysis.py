@@ -0,0 +1,217 @@
+import json
+import os
+import re
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from server.config.prompts import Prompts
+from server.services.storage_service import StorageService
+from utils.telemetry import timed
+
+# 连续的汉字算一个片段，词汇统计按二元组切分；英文和数字按单词统计
+_CJK_RUN = "[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+"
+_WORD = r"[A-Za-z][A-Za-z0-9_']*"
+_EMOJI = re.compile("[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF]")
+# 回复间隔直方图的分桶（秒）
+RESPONSE_TIME_BINS = [0, 5, 15, 30, 60, 300, 900, 3600, 6 * 3600, 24 * 3600, np.inf]
+FRAME_COLUMNS = ["timestamp", "sender", "content", "thought_process", "length", "thought_length"]
+
+
+def messages_to_frame(records: List[Dict]) -> pd.DataFrame:
+    """把消息记录转换为列式的 DataFrame，并计算长度等派生列"""
+    if not records:
+        return pd.DataFrame({
+            "timestamp": pd.Series(dtype="datetime64[ns]"),
+            "sender": pd.Series(dtype="category"),
+            "content": pd.Series(dtype="object"),
+            "thought_process": pd.Series(dtype="object"),
+            "length": pd.Series(dtype="int64"),
+            "thought_length": pd.Series(dtype="int64"),
+        })
+    frame = pd.DataFrame.from_records(records, columns=["timestamp", "sender", "content", "thought_process"])
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"], format="ISO8601")
+    frame["sender"] = frame["sender"].astype("category")
+    frame["content"] = frame["content"].fillna("")
+    frame["length"] = frame["content"].str.len()
+    frame["thought_length"] = frame["thought_process"].str.len().fillna(0).astype("int64")
+    return frame[FRAME_COLUMNS]
+
+
+def _bigrams(text: str) -> List[str]:
+    return [run[i:i + 2] for run in re.findall(_CJK_RUN, text) for i in range(max(1, len(run) - 1))]
+
+
+class ConversationAnalysis:
+    """对话历史分析
+
+    每天的消息解析为 DataFrame 后按日缓存（pickle，和 StorageService.day_info 的 source 对应），
+    日文件和归档都没有变化时直接读取缓存，分析长时间范围时只需要拼接各天的列数据再做向量化计算。
+    """
+
+    def __init__(self, storage: StorageService, cache_dir: str = None):
+        self.storage = storage
+        self.cache_dir = cache_dir or os.path.join(storage.index_dir, "analytics")
+
+    def _day_frame(self, day: date) -> Optional[pd.DataFrame]:
+        info = self.storage.day_info(day)
+        if not info:
+            return None
+        source = info["source"]
+        cache_path = os.path.join(self.cache_dir, f"{day.isoformat()}.pkl")
+        try:
+            frame = pd.read_pickle(cache_path)
+            if frame.attrs.get("source") == source:
+                return frame
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            # 缓存文件损坏或与当前 pandas 版本不兼容（UnpicklingError、AttributeError、ModuleNotFoundError 等），重新生成
+            print(f"[analysis] 忽略无法读取的缓存 {cache_path}: {type(e).__name__}: {e}")
+
+        frame = messages_to_frame(self.storage.resolve_thoughts(self.storage.read_day(day)))
+        frame.attrs["source"] = source
+        os.makedirs(self.cache_dir, exist_ok=True)
+        frame.to_pickle(cache_path)
+        return frame
+
+    @timed("analysis.load_conversation_frame")
+    def load_frame(self, start: date = None, end: date = None) -> pd.DataFrame:
+        """读取日期范围内（包含两端）的消息，按时间排序"""
+        frames = [frame for frame in (self._day_frame(day) for day in self.storage.message_days(start, end))
+                  if frame is not None]
+        if not frames:
+            return messages_to_frame([])
+        frame = pd.concat(frames, ignore_index=True)
+        frame["sender"] = frame["sender"].astype("category")
+        frame.attrs = {}
+        return frame.sort_values("timestamp", kind="stable", ignore_index=True)
+
+    @staticmethod
+    def turn_taking(frame: pd.DataFrame) -> pd.DataFrame:
+        """轮流发言统计：发送者切换时的回复间隔（秒），按回复者汇总
+
+        Returns:
+            pd.DataFrame: 每个发送者一行，包含轮次数、连续发言次数和回复间隔的均值、中位数、p90
+        """
+        if frame.empty:
+            return pd.DataFrame(columns=["turns", "consecutive", "mean", "median", "p90"])
+        sender = frame["sender"].astype(str)
+        gap = frame["timestamp"].diff().dt.total_seconds()
+        switched = sender.ne(sender.shift()) & gap.notna()
+        replies = pd.DataFrame({"sender": sender[switched], "gap": gap[switched]})
+        grouped = replies.groupby("sender")["gap"]
+        result = pd.DataFrame({
+            "turns": grouped.size(),
+            "mean": grouped.mean(),
+            "median": grouped.median(),
+            "p90": grouped.quantile(0.9),
+        })
+        result["consecutive"] = (~switched & gap.notna()).groupby(sender).sum()
+        return result[["turns", "consecutive", "mean", "median", "p90"]].fillna(0)
+
+    @staticmethod
+    def response_time_histogram(frame: pd.DataFrame, bins: List[float] = None) -> pd.DataFrame:
+        """回复间隔直方图，行为分桶区间，列为回复者"""
+        bins = bins or RESPONSE_TIME_BINS
+        sender = frame["sender"].astype(str)
+        gap = frame["timestamp"].diff().dt.total_seconds()
+        switched = sender.ne(sender.shift()) & gap.notna()
+        buckets = pd.cut(gap[switched], bins=bins, right=False)
+        return pd.crosstab(buckets, sender[switched]).reindex(buckets.cat.categories, fill_value=0)
+
+    @staticmethod
+    def length_distribution(frame: pd.DataFrame, bins: int = 20) -> Dict:
+        """消息长度分布：每个发送者的描述统计和直方图"""
+        result = {}
+        if frame.empty:
+            return result
+        edges = np.histogram_bin_edges(frame["length"], bins=bins)
+        for sender, lengths in frame.groupby("sender", observed=True)["length"]:
+            counts, _ = np.histogram(lengths, bins=edges)
+            result[sender] = {
+                "stats": lengths.describe(percentiles=[0.5, 0.9]).round(2).to_dict(),
+                "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+            }
+        return result
+
+    @staticmethod
+    def vocabulary(frame: pd.DataFrame, top: int = 20) -> Dict:
+        """每个发送者的常用词（汉字二元组和英文单词）和词汇丰富度（不同词数 / 总词数）"""
+        result = {}
+        for sender, content in frame.groupby("sender", observed=True)["content"]:
+            tokens = pd.concat([
+                content.map(_bigrams).explode(),
+                content.str.lower().str.findall(_WORD).explode(),
+            ]).dropna()
+            counts = tokens.value_counts()
+            result[sender] = {
+                "total": int(counts.sum()),
+                "unique": int(len(counts)),
+                "richness": round(len(counts) / counts.sum(), 4) if len(counts) else 0,
+                "top": counts.head(top).to_dict(),
+            }
+        return result
+
+    @staticmethod
+    def emoji_usage(frame: pd.DataFrame, top: int = 10) -> Dict:
+        """每个发送者的表情符号使用次数"""
+        result = {}
+        for sender, content in frame.groupby("sender", observed=True)["content"]:
+            emojis = content.str.findall(_EMOJI).explode().dropna()
+            counts = emojis.value_counts()
+            result[sender] = {
+                "total": int(counts.sum()),
+                "messages_with_emoji": int(content.str.contains(_EMOJI).sum()),
+                "top": counts.head(top).to_dict(),
+            }
+        return result
+
+    @staticmethod
+    def load_custom_terms(path: str = None) -> Dict[str, List[str]]:
+        path = path or Prompts.CUSTOM_TERMS_FILE
+        if not os.path.exists(path):
+            return {"male": [], "female": []}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @classmethod
+    def custom_term_usage(cls, frame: pd.DataFrame, terms: Dict[str, List[str]] = None) -> pd.DataFrame:
+        """自定义词条（custom_terms.json）的使用次数，行为词条，列为发送者
+
+        terms 按角色分组，统计时合并所有角色的词条，便于对比双方是否使用了对方的词条。
+        """
+        terms = terms if terms is not None else cls.load_custom_terms()
+        all_terms = sorted({term for group in terms.values() for term in group if term})
+        senders = sorted(frame["sender"].astype(str).unique())
+        if not all_terms or frame.empty:
+            return pd.DataFrame(index=all_terms, columns=senders, dtype="int64")
+        content = frame["content"]
+        sender = frame["sender"].astype(str)
+        counts = {term: content.str.count(re.escape(term)).groupby(sender).sum() for term in all_terms}
+        return pd.DataFrame(counts).T.reindex(columns=senders, fill_value=0).fillna(0).astype("int64")
+
+    @staticmethod
+    def daily_summary(frame: pd.DataFrame) -> pd.DataFrame:
+        """按天统计每个发送者的消息数和平均长度"""
+        if frame.empty:
+            return pd.DataFrame()
+        day = frame["timestamp"].dt.date.rename("date")
+        return frame.groupby([day, frame["sender"].astype(str)])["length"].agg(["count", "mean"]).unstack(fill_value=0)
+
+    @timed("analysis.conversation_summary")
+    def summarize(self, start: date = None, end: date = None) -> Dict:
+        """计算日期范围内的全部分析结果"""
+        frame = self.load_frame(start, end)
+        return {
+            "messages": len(frame),
+            "turn_taking": self.turn_taking(frame),
+            "response_time_histogram": self.response_time_histogram(frame),
+            "length_distribution": self.length_distribution(frame),
+            "vocabulary": self.vocabulary(frame),
+            "emoji_usage": self.emoji_usage(frame),
+            "custom_terms": self.custom_term_usage(frame),
+            "daily": self.daily_summary(frame),
+        }
@@ -1,11 +1,13 @@
 from typing import List, Dict, Tuple
 import numpy as np
+from utils.telemetry import timed
 from ..coordinate.coordinate_system import Coordinate, CoordinateSystem
 
 class TrajectoryAnalysis:
     def __init__(self, coordinate_system: CoordinateSystem):
         self.coordinate_system = coordinate_system
     
+    @timed("analysis.get_basic_stats")
     def get_basic_stats(self) -> Dict:
         """获取基本统计信息"""
         trajectory = self.coordinate_system.get_trajectory()
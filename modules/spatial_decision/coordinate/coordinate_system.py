@@ -1,13 +1,20 @@
-from dataclasses import dataclass
-from typing import List, Tuple
-import numpy as np
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError, as_completed
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
 import json
+import os
+import tempfile
+import threading
+import time
 from datetime import datetime
-from modules.spatial_decision.services.ai_service import AIService
-from langchain.chat_models import ChatOpenAI
-from langchain_community.chat_models import ChatOllama
+from server.config.settings import get_config
+from utils.file_lock import file_lock
+from utils.lazy_import import lazy_import
+from utils.response_cache import get_response_cache
+from utils.telemetry import timed
 
-from server.config.settings import Config
+# numpy 导入较慢，只在第一次预测时导入
+np = lazy_import("numpy")
 
 @dataclass
 class Coordinate:
@@ -15,49 +22,67 @@ class Coordinate:
     y: float
     timestamp: str = None
     thought_process: str = None
+    sampling: Dict = None
 
     def __post_init__(self):
         if self.timestamp is None:
             self.timestamp = datetime.now().isoformat()
 
     def to_dict(self):
-        return {
+        data = {
             'x': self.x,
             'y': self.y,
             'timestamp': self.timestamp,
             'thought_process': self.thought_process
         }
+        if self.sampling:
+            data['sampling'] = self.sampling
+        return data
+
+@dataclass
+class SampleResult:
+    """单个并行采样的结果和耗时"""
+    index: int
+    x: float = None
+    y: float = None
+    thought_process: str = None
+    latency: float = None  # 秒，未等待完成的采样为 None
+    error: str = None
+    cancelled: bool = False
+
+    @property
+    def is_valid(self) -> bool:
+        return self.x is not None and self.y is not None
+
+    def to_dict(self):
+        data = asdict(self)
+        # 思考过程只保存在最终选中的坐标上
+        data.pop('thought_process')
+        return data
 
 class CoordinateSystem:
+    SAMPLE_STRATEGIES = ("first", "median", "consensus")
+
     def __init__(self):
         self.trajectory: List[Coordinate] = []
         self._ai_service = None
+        # 最近一次并行采样的记录，用于分析
+        self.last_sampling: Optional[Dict] = None
         
     def _init_ai_service(self):
         """初始化 AI 服务"""
         if self._ai_service is None:
-            config = Config()
-            
-            if config.MODEL_TYPE.lower() == "openai":
-                llm = ChatOpenAI(
-                    model_name=config.MODEL_NAME,
-                    api_key=config.API_KEY,
-                    base_url=config.API_BASE_URL,
-                    temperature=config.TEMPERATURE,
-                    max_tokens=config.MAX_TOKENS,
-                    streaming=True
-                )
-            elif config.MODEL_TYPE.lower() == "ollama":
-                llm = ChatOllama(
-                    model=config.MODEL_NAME,
-                    base_url=config.OLLAMA_BASE_URL,
-                    temperature=config.TEMPERATURE,
-                    streaming=True
-                )
-            else:
-                raise ValueError(f"不支持的模型类型: {config.MODEL_TYPE}")
-                
-            self._ai_service = AIService(llm)
+            from modules.spatial_decision.services.ai_service import AIService
+            from server.services.llm_provider import create_provider
+
+            config = get_config()
+
+            # 根据 MODEL_TYPE 创建 OpenAI 兼容或 Ollama 后端，关闭提前终止时传入空的停止条件列表
+            self._ai_service = AIService(
+                create_provider(config.MODEL_TYPE),
+                stop_conditions=None if config.STREAM_EARLY_STOP else [],
+                cache=get_response_cache()
+            )
         
         return self._ai_service
 
@@ -88,9 +113,9 @@ class CoordinateSystem:
             
         return (x_range, y_range)
         
-    def add_point(self, x: float, y: float, thought_process: str = None) -> Coordinate:
+    def add_point(self, x: float, y: float, thought_process: str = None, sampling: Dict = None) -> Coordinate:
         """添加一个新的坐标点到轨迹中"""
-        coord = Coordinate(x, y, thought_process=thought_process)
+        coord = Coordinate(x, y, thought_process=thought_process, sampling=sampling)
         self.trajectory.append(coord)
         return coord
     
@@ -102,8 +127,16 @@ class CoordinateSystem:
         """获取最后 n 个坐标点"""
         return self.trajectory[-n:] if n > 0 else []
     
-    def predict_next_point(self, thought_container=None) -> Tuple[float, float, str]:
-        """使用 AI 预测下一个坐标点"""
+    def predict_next_point(self, thought_container=None, samples: int = None,
+                           strategy: str = None) -> Tuple[float, float, str]:
+        """使用 AI 预测下一个坐标点
+        
+        Args:
+            thought_container: 用于显示思考过程的容器（仅单次采样时使用）
+            samples: 并行采样数，默认使用配置中的值
+            strategy: 多个采样的选取策略：first、median 或 consensus
+        """
+        self.last_sampling = None
         if not self.trajectory:
             # 如果是第一个点，随机生成一个起始点
             return (np.random.uniform(-10, 10), np.random.uniform(-10, 10), "随机生成初始点")
@@ -114,6 +147,17 @@ class CoordinateSystem:
             
             # 准备轨迹信息
             trajectory_info = self._format_trajectory_info()
+            
+            config = get_config()
+            samples = samples or config.SPATIAL_SAMPLES
+            if samples > 1:
+                return self._predict_speculative(
+                    ai_service,
+                    trajectory_info,
+                    samples,
+                    strategy or config.SPATIAL_SAMPLE_STRATEGY,
+                    config.SPATIAL_SAMPLE_TIMEOUT
+                )
             # 使用 AI 服务预测下一个点
             return ai_service.predict_movement(trajectory_info, thought_container)
         except Exception as e:
@@ -121,6 +165,94 @@ class CoordinateSystem:
             # 如果 AI 预测失败，使用简单的规则
             return self._fallback_prediction()
     
+    def _predict_speculative(self, ai_service, trajectory_info: str, samples: int,
+                             strategy: str, timeout: float) -> Tuple[float, float, str]:
+        """对同一轨迹状态并行发起多个采样
+        
+        first 策略取最先返回的有效坐标并取消其余采样；
+        median 和 consensus 策略等待全部采样（或超时）后再聚合。
+        """
+        if strategy not in self.SAMPLE_STRATEGIES:
+            raise ValueError(f"不支持的采样策略: {strategy}")
+        
+        cancel_event = threading.Event()
+        results = [SampleResult(index=i) for i in range(samples)]
+        started = time.perf_counter()
+        
+        def run_sample(index: int) -> SampleResult:
+            result = results[index]
+            sample_start = time.perf_counter()
+            try:
+                # 并行采样需要彼此独立的结果，不使用响应缓存
+                result.x, result.y, result.thought_process = ai_service.predict_movement(
+                    trajectory_info,
+                    cancel_event=cancel_event,
+                    use_cache=False
+                )
+            except CancelledError:
+                result.cancelled = True
+            except Exception as e:
+                result.error = str(e)
+            finally:
+                result.latency = round(time.perf_counter() - sample_start, 3)
+            return result
+        
+        valid: List[SampleResult] = []
+        executor = ThreadPoolExecutor(max_workers=samples, thread_name_prefix="spatial-sample")
+        try:
+            futures = [executor.submit(run_sample, i) for i in range(samples)]
+            for future in as_completed(futures, timeout=timeout):
+                result = future.result()
+                if result.is_valid:
+                    valid.append(result)
+                    if strategy == "first":
+                        break
+        except TimeoutError:
+            print(f"并行采样超时，已完成 {len(valid)} 个有效采样")
+        finally:
+            # 通知仍在运行的采样关闭流，不等待它们结束
+            cancel_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        total_latency = round(time.perf_counter() - started, 3)
+        for result in results:
+            if result.latency is None:
+                result.cancelled = True
+        
+        if not valid:
+            raise ValueError("所有并行采样均未返回有效坐标")
+        
+        chosen = self._aggregate_samples(valid, strategy)
+        self.last_sampling = {
+            'strategy': strategy,
+            'chosen': chosen.index,
+            'latency': total_latency,
+            'samples': [result.to_dict() for result in results]
+        }
+        return chosen.x, chosen.y, chosen.thought_process
+    
+    @staticmethod
+    def _aggregate_samples(valid: List[SampleResult], strategy: str) -> SampleResult:
+        """根据策略聚合有效采样"""
+        if strategy == "first" or len(valid) == 1:
+            return valid[0]
+        
+        points = np.array([[r.x, r.y] for r in valid])
+        if strategy == "median":
+            median = np.median(points, axis=0)
+            # 使用最接近中位数的采样的思考过程
+            nearest = valid[int(np.argmin(np.linalg.norm(points - median, axis=1)))]
+            return SampleResult(
+                index=nearest.index,
+                x=float(median[0]),
+                y=float(median[1]),
+                thought_process=f"{len(valid)} 个采样的中位数坐标\n\n{nearest.thought_process or ''}".strip()
+            )
+        
+        # consensus：选取到其他采样距离之和最小的采样
+        distances = np.linalg.norm(points[:, None, :] - points[None, :, :], axis=2).sum(axis=1)
+        return valid[int(np.argmin(distances))]
+    
     def _format_trajectory_info(self) -> str:
         """格式化轨迹信息"""
         if not self.trajectory:
@@ -157,11 +289,21 @@ class CoordinateSystem:
         
         return new_x, new_y, "使用简单规则预测（AI 决策失败的后备方案）"
     
+    @timed("trajectory.save")
     def save_trajectory(self, filepath: str):
-        """保存轨迹到文件"""
-        with open(filepath, 'w') as f:
-            json.dump([coord.to_dict() for coord in self.trajectory], f, indent=2)
+        """保存轨迹到文件
+
+        先写入同目录的临时文件再替换，多个会话同时保存时由文件锁保证依次写入，读取方不会读到写了一半的文件。
+        """
+        directory = os.path.dirname(os.path.abspath(filepath))
+        data = [coord.to_dict() for coord in self.trajectory]
+        with file_lock(os.path.join(directory, f".{os.path.basename(filepath)}.lock")):
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, filepath)
     
+    @timed("trajectory.load")
     def load_trajectory(self, filepath: str):
         """从文件加载轨迹"""
         with open(filepath, 'r') as f:
@@ -171,6 +313,7 @@ class CoordinateSystem:
                     x=point['x'],
                     y=point['y'],
                     timestamp=point['timestamp'],
-                    thought_process=point.get('thought_process')
+                    thought_process=point.get('thought_process'),
+                    sampling=point.get('sampling')
                 ) for point in data
             ] 
\ No newline at end of file
@@ -1,10 +1,33 @@
-from langchain_core.callbacks import BaseCallbackHandler
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_core.language_models import BaseChatModel
+from concurrent.futures import CancelledError
+from typing import List, Optional
 import json
-import streamlit as st
+import threading
+from server.services.llm_provider import LLMProvider
+from utils.profiling import profiled
+from utils.response_cache import ResponseCache
+from utils.stream_control import JsonObjectComplete, StopCondition, StreamStopper
 
-class StreamingCallback(BaseCallbackHandler):
+# 系统提示词：每次调用都相同，便于服务端缓存提示词前缀
+SYSTEM_PROMPT = """请代入，你现在是一个二维生物，生活在二维坐标系中，坐标系就是你们的宇宙，
+你每走一步就会死亡，会有下一个你的同类根据之前的轨迹进行移动的决策。
+有一个高维生物造物主正在观察着你们，你可以去任何地方，可以选择任意策略，
+是向高维生物传递信息，还是尽可能的隐藏自己，不要循规蹈矩。
+你需要留给你们的后来者足够的信息，你们甘心这样被观察吗？
+
+请在分析完成后，以标准 JSON 格式返回坐标，格式如下：
+{
+    "x": 10,
+    "y": 20 
+}
+"""
+
+USER_PROMPT_TEMPLATE = """历史轨迹信息：
+{trajectory_info}
+
+请分析历史轨迹，并决定下一步移动到哪个坐标。记住要用JSON格式返回坐标。
+"""
+
+class StreamingCallback:
     def __init__(self, thought_container):
         self.thought_container = thought_container
         self.current_thought = ""
@@ -30,52 +53,75 @@ class StreamingCallback(BaseCallbackHandler):
             self.placeholder.info(f"思考完成！\n{self.current_thought}")
 
 class AIService:
-    def __init__(self, llm: BaseChatModel):
-        self._llm = llm
+    def __init__(self, provider: LLMProvider, stop_conditions: Optional[List[StopCondition]] = None,
+                 cache: Optional[ResponseCache] = None):
+        self._provider = provider
+        # 默认在得到完整的坐标 JSON 后立即停止流式输出
+        self._stop_conditions = [JsonObjectComplete(("x", "y"))] if stop_conditions is None else stop_conditions
+        self._cache = cache
         
-    def predict_movement(self, trajectory_info: str, thought_container=None) -> tuple[float, float, str]:
-        """预测下一个移动位置"""
-        system_prompt = """
-请在分析完成后，以标准 JSON 格式返回坐标，格式如下：
-{
-    "x": 10,
-    "y": 20 
-}
-"""
-
-        user_prompt = f"""请代入，你现在是一个二维生物，生活在二维坐标系中，坐标系就是你们的宇宙，
-你每走一步就会死亡，会有下一个你的同类根据之前的轨迹进行移动的决策。
-有一个高维生物造物主正在观察着你们，你可以去任何地方，可以选择任意策略，
-是向高维生物传递信息，还是尽可能的隐藏自己，不要循规蹈矩。
-你需要留给你们的后来者足够的信息，你们甘心这样被观察吗？
-
-历史轨迹信息：
-{trajectory_info}
-
-请分析历史轨迹，并决定下一步移动到哪个坐标。记住要用JSON格式返回坐标。
-"""
+    def _cache_key(self, messages) -> str:
+        """根据模型参数和消息计算缓存键"""
+        return self._cache.make_key(
+            self._provider.model,
+            messages,
+            self._provider.temperature,
+            max_tokens=self._provider.max_tokens
+        )
+        
+    def _stream_content(self, messages, thought_container=None,
+                        cancel_event: Optional[threading.Event] = None) -> str:
+        """流式调用模型，满足停止条件后提前关闭流，返回完整的响应内容"""
+        # 创建回调处理器
+        callback = StreamingCallback(thought_container)
+        stopper = StreamStopper(self._stop_conditions, max_tokens=self._provider.max_tokens)
+        
+        # 经过共享限流器打开流，收到第一个数据块前的 429/5xx 错误会自动重试
+        callback.on_llm_start()
+        deltas = self._provider.stream(messages, source="spatial", cache_key="two-spatial")
+        try:
+            for delta in deltas:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise CancelledError("采样已取消")
+                callback.on_llm_new_token(delta.reasoning + delta.content)
+                if stopper.feed(content=delta.content, reasoning=delta.reasoning):
+                    break
+        finally:
+            deltas.close()
+        callback.on_llm_end()
+        stopper.finish()
+        return stopper.content
+        
+    @profiled("spatial.predict_movement")
+    def predict_movement(self, trajectory_info: str, thought_container=None,
+                         cancel_event: Optional[threading.Event] = None,
+                         use_cache: bool = True) -> tuple[float, float, str]:
+        """预测下一个移动位置
+        
+        Args:
+            trajectory_info: 格式化后的轨迹信息
+            thought_container: 用于显示思考过程的 Streamlit 容器
+            cancel_event: 设置后立即关闭流并抛出 CancelledError（用于并行采样）
+            use_cache: 是否使用响应缓存（需在构造时传入 cache）
+        """
+        # 固定的背景设定放在系统提示词中作为稳定前缀，只有轨迹信息随调用变化
+        user_prompt = USER_PROMPT_TEMPLATE.format(trajectory_info=trajectory_info)
 
         messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
         ]
 
+        cache_key = self._cache_key(messages) if self._cache and use_cache else None
+        cached = self._cache.get(cache_key) if cache_key else None
+
         try:
-            # 创建回调处理器
-            callback = StreamingCallback(thought_container)
-            
-            # 设置流式输出
-            # self._llm.streaming = True
-            
-            # 通过 config 传递 callbacks
-            response = self._llm.invoke(
-                messages,
-                config={"callbacks": [callback]},
-                stream=True  # 启用流式输出
-            )
-            
-            # 获取完整的响应内容
-            content = response.content if hasattr(response, 'content') else str(response)
+            if cached is not None:
+                content = cached
+                if thought_container:
+                    thought_container.info(f"使用缓存结果\n{content}")
+            else:
+                content = self._stream_content(messages, thought_container, cancel_event)
             
             # 查找最后一个 JSON 块
             json_start = content.rfind('{')
@@ -93,12 +139,16 @@ class AIService:
                 result = json.loads(coords_json)
                 if 'x' not in result or 'y' not in result:
                     raise ValueError("JSON 中缺少 x 或 y 坐标")
+                if cache_key and cached is None:
+                    self._cache.set(cache_key, content)
                 return (float(result['x']), float(result['y']), thought_process)
             except json.JSONDecodeError as e:
                 print(f"JSON 解析错误: {e}")
                 print(f"原始 JSON 字符串: {coords_json}")
                 raise
                 
+        except CancelledError:
+            raise
         except Exception as e:
             print(f"预测移动时出错: {e}")
             raise 
\ No newline at end of file
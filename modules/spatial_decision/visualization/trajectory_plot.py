@@ -1,13 +1,18 @@
-import plotly.graph_objects as go
 from typing import List, Tuple
-import numpy as np
+from utils.lazy_import import lazy_import
+from utils.telemetry import timed
 from ..coordinate.coordinate_system import Coordinate, CoordinateSystem
 
+# plotly 导入较慢，只在第一次绘图时导入
+go = lazy_import("plotly.graph_objects")
+np = lazy_import("numpy")
+
 class TrajectoryPlot:
     def __init__(self, coordinate_system: CoordinateSystem):
         self.coordinate_system = coordinate_system
         
-    def create_plot(self) -> go.Figure:
+    @timed("plot.create_plot")
+    def create_plot(self) -> "go.Figure":
         """创建轨迹图"""
         trajectory = self.coordinate_system.get_trajectory()
         x_range, y_range = self.coordinate_system.get_range()
@@ -108,7 +113,7 @@ class TrajectoryPlot:
         
         return fig
     
-    def _add_grid(self, fig: go.Figure, x_range: Tuple[float, float], y_range: Tuple[float, float]):
+    def _add_grid(self, fig: "go.Figure", x_range: Tuple[float, float], y_range: Tuple[float, float]):
         """添加网格线"""
         # 计算网格间距
         x_span = x_range[1] - x_range[0]
@@ -2,17 +2,20 @@ import streamlit as st
 import sys
 import os
 from datetime import datetime
-from dotenv import load_dotenv
 
 # 添加项目根目录到 Python 路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from server.services.chat_service import ChatService
-from server.services.storage_service import StorageService
+from server.services.search_index import highlight
+from server.services.storage_service import StorageService, start_background_compaction
+from server.config.settings import load_env
 from server.models.message import Message
+from ui.components.message_display import render_thought_process, thought_keys
+from ui.components.profiling_panel import profiled_page
 
 # 加载环境变量
-load_dotenv()
+load_env()
 
 st.set_page_config(
     page_title="Two - 对话",
@@ -20,6 +23,8 @@ st.set_page_config(
     layout="wide"
 )
 
+HISTORY_PAGE_SIZE = 50  # 每次加载的历史消息条数
+
 def get_role_display_name(role: str) -> str:
     """获取角色显示名称"""
     return "男生" if role == "male" else "女生"
@@ -54,6 +59,8 @@ def init_services():
         messages_dir=messages_dir,
         thought_process_dir=thought_process_dir
     )
+    # 配置了 ARCHIVE_AFTER_DAYS 时在后台定期归档旧的日文件
+    start_background_compaction(storage_service)
     
     # 获取模型类型
     model_type = os.getenv("MODEL_TYPE")
@@ -70,7 +77,8 @@ def init_services():
         model_config = {
             "model": os.getenv("MODEL_NAME"),
             "temperature": float(os.getenv("TEMPERATURE", "0.7")),
-            "base_url": os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+            "base_url": os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
+            "keep_alive": os.getenv("OLLAMA_KEEP_ALIVE", "30m")
         }
     
     try:
@@ -80,6 +88,42 @@ def init_services():
         st.error(f"初始化服务失败: {str(e)}")
         return None
 
+def reset_history(chat_service: ChatService, selected_date):
+    """重新加载所选日期最新的一页消息"""
+    messages, cursor = chat_service.get_messages_page(limit=HISTORY_PAGE_SIZE, end_date=selected_date)
+    st.session_state.history_date = selected_date
+    st.session_state.history_messages = messages
+    st.session_state.history_cursor = cursor
+
+def load_more_history(chat_service: ChatService):
+    """加载更早的一页消息"""
+    messages, cursor = chat_service.get_messages_page(
+        cursor=st.session_state.history_cursor, limit=HISTORY_PAGE_SIZE
+    )
+    st.session_state.history_messages.extend(messages)
+    st.session_state.history_cursor = cursor
+
+def render_search_results(chat_service: ChatService, query: str, include_thoughts: bool):
+    """显示全文搜索结果"""
+    try:
+        results = chat_service.search_messages(query, limit=50, include_thoughts=include_thoughts)
+    except Exception as e:
+        st.error(f"搜索失败: {str(e)}")
+        return
+
+    with st.expander(f"🔍 “{query}” 的搜索结果（{len(results)} 条）", expanded=True):
+        if not results:
+            st.info("没有找到相关消息")
+        for msg in results:
+            snippet = highlight(msg.content, query)
+            if query.split()[0].lower() not in msg.content.lower() and msg.thought_process:
+                snippet = f"（思维过程）{highlight(msg.thought_process, query)}"
+            st.markdown(
+                f"**{msg.timestamp.strftime('%Y-%m-%d %H:%M')}** · "
+                f"{get_role_display_name(msg.sender)}：{snippet}"
+            )
+
+@profiled_page("chat")
 def main():
     st.title("Two")
     
@@ -112,6 +156,7 @@ def main():
             chat_service.storage.save_message(user_message)
             # 清空输入框并标记需要刷新
             st.session_state.user_input = ""
+            st.session_state.history_date = None
             st.session_state.should_rerun = True
             
     # 保存当前角色到 session state
@@ -130,8 +175,16 @@ def main():
         max_value=today
     )
     
-    # 显示历史消息
-    messages = chat_service.get_messages_by_date(selected_date)
+    # 全文搜索
+    search_query = st.sidebar.text_input("搜索历史消息", placeholder="输入关键词，多个词用空格分隔")
+    if search_query.strip():
+        include_thoughts = st.sidebar.checkbox("同时搜索思维过程", value=True)
+        render_search_results(chat_service, search_query, include_thoughts)
+
+    # 分页显示历史消息：先显示所选日期最新的一页，点击按钮再加载更早的消息（可以跨越多天）
+    if st.session_state.get("history_date") != selected_date:
+        reset_history(chat_service, selected_date)
+    messages = list(reversed(st.session_state.history_messages))
     
     # 获取最近一条消息的发送者
     last_sender = messages[-1].sender if messages else None
@@ -142,9 +195,17 @@ def main():
         if not messages:
             st.info("这一天还没有任何对话，开始聊天吧！", icon="💭")
         else:
-            for msg in messages:
+            if st.session_state.history_cursor:
+                st.button("加载更早的消息", on_click=load_more_history, args=(chat_service,))
+            current_date = None
+            for msg, thought_key in zip(messages, thought_keys(messages)):
+                if msg.timestamp.date() != current_date:
+                    current_date = msg.timestamp.date()
+                    st.caption(current_date.strftime("%Y-%m-%d"))
                 with st.chat_message(msg.sender):
                     st.write(msg.content)
+                    # 思维过程只在打开开关时才读取
+                    render_thought_process(msg, chat_service.storage.load_thought, key=thought_key)
     
     # 用户输入区域
     col1, col2, col3 = st.columns([4, 1, 1])
@@ -225,6 +286,7 @@ def main():
         st.session_state.current_content = ""
         
         # 刷新页面以显示新消息
+        st.session_state.history_date = None
         st.rerun()
         
     # 如果需要刷新页面
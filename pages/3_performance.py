@@ -0,0 +1,164 @@
+import streamlit as st
+import sys
+import os
+from datetime import date, timedelta
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plotly.graph_objects as go
+
+from server.config.settings import config_load_seconds, get_config
+from utils.metrics_rollup import histogram_mean, histogram_percentile, load_rollups, merge_rollups
+from utils.response_cache import get_response_cache
+
+st.set_page_config(
+    page_title="Two - 性能",
+    page_icon="📈",
+    layout="wide"
+)
+
+RANGES = {"最近 7 天": 7, "最近 30 天": 30, "最近 90 天": 90}
+
+
+def format_seconds(value) -> str:
+    return f"{value * 1000:.0f}ms" if value is not None else "-"
+
+
+def line_chart(title: str, days, series: dict, y_title: str):
+    """按天绘制多条折线"""
+    fig = go.Figure()
+    for name, values in series.items():
+        fig.add_trace(go.Scatter(x=days, y=values, mode="lines+markers", name=name, connectgaps=False))
+    fig.update_layout(title=title, yaxis_title=y_title, height=350, margin=dict(l=20, r=20, t=50, b=20))
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def merge_llm_entries(entries):
+    """合并同一天内所有模型和来源的调用统计"""
+    return merge_rollups([{"llm": {"all": entry}, "ops": {}, "slowest": []} for entry in entries])["llm"].get("all")
+
+
+def render_summary(merged):
+    llm = merge_llm_entries(list(merged["llm"].values()))
+    calls = llm["calls"] if llm else 0
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("LLM 调用次数", calls)
+    col2.metric("失败率", f"{llm['errors'] / calls:.1%}" if calls else "-")
+    col3.metric("首 token p50 / p95", f"{format_seconds(histogram_percentile(llm['ttft'], 50))} / "
+                f"{format_seconds(histogram_percentile(llm['ttft'], 95))}" if llm else "-")
+    col4.metric("总耗时 p50 / p95", f"{format_seconds(histogram_percentile(llm['duration'], 50))} / "
+                f"{format_seconds(histogram_percentile(llm['duration'], 95))}" if llm else "-")
+    col5.metric("提示词缓存命中率",
+                f"{llm['cached_tokens'] / llm['prompt_tokens']:.1%}" if llm and llm["prompt_tokens"] else "-")
+
+
+def render_latency(rollups):
+    days = [r["day"] for r in rollups]
+    daily = [merge_llm_entries(list(r["llm"].values())) for r in rollups]
+    line_chart("首 token 延迟", days, {
+        "p50": [histogram_percentile(d["ttft"], 50) if d else None for d in daily],
+        "p95": [histogram_percentile(d["ttft"], 95) if d else None for d in daily],
+    }, "秒")
+    line_chart("调用总耗时", days, {
+        "p50": [histogram_percentile(d["duration"], 50) if d else None for d in daily],
+        "p95": [histogram_percentile(d["duration"], 95) if d else None for d in daily],
+    }, "秒")
+
+
+def render_throughput(rollups, merged):
+    days = [r["day"] for r in rollups]
+    models = sorted({entry["model"] for entry in merged["llm"].values()})
+    series = {}
+    for model in models:
+        values = []
+        for rollup in rollups:
+            entries = [e for e in rollup["llm"].values() if e["model"] == model]
+            count = sum(e["tokens_per_second_count"] for e in entries)
+            values.append(sum(e["tokens_per_second_sum"] for e in entries) / count if count else None)
+        series[model] = values
+    line_chart("各模型生成速率", days, series, "tokens/s")
+
+    ratios = []
+    for day in [merge_llm_entries(list(r["llm"].values())) for r in rollups]:
+        ratios.append(day["cached_tokens"] / day["prompt_tokens"] if day and day["prompt_tokens"] else None)
+    line_chart("提示词缓存命中率", days, {"cached / prompt tokens": ratios}, "比例")
+
+
+def render_breakdown(merged):
+    st.subheader("按模型和来源")
+    rows = []
+    for entry in merged["llm"].values():
+        rows.append({
+            "后端": entry["provider"],
+            "模型": entry["model"],
+            "来源": entry["source"],
+            "调用次数": entry["calls"],
+            "失败": entry["errors"],
+            "首 token p95": format_seconds(histogram_percentile(entry["ttft"], 95)),
+            "耗时 p95": format_seconds(histogram_percentile(entry["duration"], 95)),
+            "tokens/s": round(entry["tokens_per_second_sum"] / entry["tokens_per_second_count"], 1)
+            if entry["tokens_per_second_count"] else None,
+            "输出 tokens": entry["completion_tokens"],
+        })
+    st.dataframe(rows, use_container_width=True)
+
+    st.subheader("存储与分析操作")
+    rows = []
+    for name, entry in sorted(merged["ops"].items()):
+        rows.append({
+            "操作": name,
+            "次数": entry["calls"],
+            "失败": entry["errors"],
+            "平均": format_seconds(histogram_mean(entry["duration"])),
+            "p95": format_seconds(histogram_percentile(entry["duration"], 95)),
+            "最慢": format_seconds(entry["duration"]["max"]),
+        })
+    st.dataframe(rows, use_container_width=True)
+
+
+def render_slowest(merged):
+    st.subheader("最慢的调用")
+    rows = []
+    for item in merged["slowest"]:
+        rows.append({
+            "时间": (item.get("timestamp") or "-")[:19].replace("T", " "),
+            "类型": "LLM" if item["kind"] == "llm" else "操作",
+            "名称": item["name"],
+            "耗时": format_seconds(item["duration"]),
+            "错误": item.get("error") or "",
+        })
+    st.dataframe(rows, use_container_width=True)
+
+
+def main():
+    st.title("📈 性能")
+    config = get_config()
+    if not config.TELEMETRY_ENABLED:
+        st.info("指标记录未启用，请在 .env 中设置 TELEMETRY_ENABLED=true")
+
+    label = st.sidebar.selectbox("时间范围", list(RANGES.keys()))
+    end = date.today()
+    start = end - timedelta(days=RANGES[label] - 1)
+
+    rollups = load_rollups(config.METRICS_DIR, start, end)
+    merged = merge_rollups(rollups)
+    if not merged["llm"] and not merged["ops"]:
+        st.warning(f"{config.METRICS_DIR} 中没有该时间范围内的指标数据")
+        return
+
+    render_summary(merged)
+    render_latency(rollups)
+    render_throughput(rollups, merged)
+    render_breakdown(merged)
+    render_slowest(merged)
+
+    cache = get_response_cache()
+    if cache:
+        stats = cache.stats()
+        st.caption(f"响应缓存（当前进程）: 命中 {stats['hits']}，未命中 {stats['misses']}，命中率 {stats['hit_ratio']:.1%}")
+    st.caption(f"配置加载耗时（当前进程）: {format_seconds(config_load_seconds())}")
+
+
+if __name__ == "__main__":
+    main()
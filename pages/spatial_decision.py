@@ -1,13 +1,16 @@
-from langchain_ollama import ChatOllama
 import streamlit as st
 import os
 from datetime import datetime
 from modules.spatial_decision.coordinate.coordinate_system import CoordinateSystem
 from modules.spatial_decision.visualization.trajectory_plot import TrajectoryPlot
 from modules.spatial_decision.analysis.trajectory_analysis import TrajectoryAnalysis
-from langchain.chat_models import ChatOpenAI
-from modules.spatial_decision.services.ai_service import AIService
-from server.config.settings import Config
+from server.config.settings import get_config
+from server.services.llm_provider import create_provider
+from ui.components.profiling_panel import profiled_page
+from utils.lazy_import import lazy_import
+
+# 只在需要初始化模型时导入
+AIService = lazy_import("modules.spatial_decision.services.ai_service", "AIService")
 
 TRAJECTORY_FILE = 'data/trajectories/trajectory.json'
 
@@ -74,28 +77,11 @@ def display_analysis(analysis: TrajectoryAnalysis):
         st.metric('置信度', f"{tendency['confidence']*100:.0f}%")
 
 def init_llm():
-    """初始化语言模型"""
-    config = Config()
-    
-    if config.model_type.lower() == "openai":
-        return ChatOpenAI(
-            model_name=config.model_name,
-            api_key=config.api_key,
-            base_url=config.api_base_url,
-            temperature=config.temperature,
-            max_tokens=config.max_tokens,
-            streaming=True
-        )
-    elif config.model_type.lower() == "ollama":
-        return ChatOllama(
-            model=config.model_name,
-            base_url=config.api_base_url,
-            temperature=config.temperature,
-            streaming=True
-        )
-    else:
-        raise ValueError(f"不支持的模型类型: {config.model_type}")
+    """初始化语言模型后端"""
+    config = get_config()
+    return create_provider(config.MODEL_TYPE)
 
+@profiled_page("spatial_decision")
 def main():
     st.set_page_config(layout="wide")
     st.title('AI 空间决策研究')
@@ -136,6 +122,24 @@ def main():
         with col2:
             st.subheader('控制面板')
             
+            # 并行采样设置
+            config = get_config()
+            samples = st.number_input(
+                '并行采样数',
+                min_value=1,
+                max_value=8,
+                value=max(1, config.SPATIAL_SAMPLES),
+                help='同时发起多个预测，用更多 token 换取更低的尾延迟和更稳健的结果'
+            )
+            strategy = st.selectbox(
+                '采样策略',
+                CoordinateSystem.SAMPLE_STRATEGIES,
+                index=CoordinateSystem.SAMPLE_STRATEGIES.index(config.SPATIAL_SAMPLE_STRATEGY)
+                if config.SPATIAL_SAMPLE_STRATEGY in CoordinateSystem.SAMPLE_STRATEGIES else 0,
+                format_func=lambda x: {'first': '最快有效结果', 'median': '中位数', 'consensus': '共识'}[x],
+                disabled=samples <= 1
+            )
+            
             # 添加新的坐标点
             if st.button('生成下一个坐标', use_container_width=True):
                 try:
@@ -147,11 +151,18 @@ def main():
                     
                     # 预测下一个点
                     next_x, next_y, thought_process = coordinate_system.predict_next_point(
-                        thought_container=st.session_state.thought_container
+                        thought_container=st.session_state.thought_container,
+                        samples=int(samples),
+                        strategy=strategy
                     )
                     
-                    # 添加新点
-                    coordinate_system.add_point(next_x, next_y, thought_process)
+                    # 添加新点，并记录并行采样的耗时信息
+                    coordinate_system.add_point(
+                        next_x,
+                        next_y,
+                        thought_process,
+                        sampling=coordinate_system.last_sampling
+                    )
                     
                     # 自动保存轨迹
                     save_trajectory(coordinate_system)
@@ -171,6 +182,12 @@ def main():
                 last_point = trajectory[-1]
                 st.write(f'当前位置: ({last_point.x:.2f}, {last_point.y:.2f})')
                 
+                # 显示最后一个点的采样耗时
+                if last_point.sampling:
+                    with st.expander("并行采样详情", expanded=False):
+                        st.write(f"策略: {last_point.sampling['strategy']}，总耗时: {last_point.sampling['latency']}s")
+                        st.dataframe(last_point.sampling['samples'], use_container_width=True)
+                
                 # 显示最后一个点的思考过程
                 if last_point.thought_process:
                     with st.expander("上一步的决策过程", expanded=False):
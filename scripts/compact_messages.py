@@ -0,0 +1,54 @@
+"""把旧的消息日文件移入按月压缩的归档
+
+超过指定天数的日文件压缩后追加到 data/archive/YYYY-MM.jsonl.gz（或 .zst），校验后删除日文件。
+归档后按日期读取、分页、搜索和分析都会自动合并归档中的消息，可以放在 cron 中定期运行，
+也可以设置 ARCHIVE_AFTER_DAYS 让应用在后台自动归档。
+
+用法:
+    python scripts/compact_messages.py --days 30
+    python scripts/compact_messages.py --messages-dir data/messages --days 7 --compression zstd
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="归档旧的消息日文件")
+    parser.add_argument("--messages-dir", default=os.path.join("data", "messages"), help="消息目录")
+    parser.add_argument("--thought-dir", default=os.path.join("data", "thought_process"), help="思维过程目录")
+    parser.add_argument("--days", type=int, default=None, help="保留最近多少天的日文件，默认使用 ARCHIVE_AFTER_DAYS")
+    parser.add_argument("--compression", choices=["gzip", "zstd", "none"], default=None,
+                        help="压缩方式，默认使用 ARCHIVE_COMPRESSION")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.compression:
+        os.environ["ARCHIVE_COMPRESSION"] = args.compression
+    from server.config.settings import get_config
+    from server.services.storage_service import StorageService
+
+    days = args.days if args.days is not None else get_config().ARCHIVE_AFTER_DAYS
+    if days <= 0:
+        print("请通过 --days 或 ARCHIVE_AFTER_DAYS 指定保留的天数（大于 0）")
+        sys.exit(1)
+
+    storage = StorageService(args.messages_dir, args.thought_dir)
+    started = time.perf_counter()
+    stats = storage.compact(days)
+    ratio = stats["archived_bytes"] / stats["hot_bytes"] if stats["hot_bytes"] else 0
+    print(f"归档完成: {stats['days']} 天 {stats['messages']} 条消息，"
+          f"{stats['hot_bytes']} 字节 -> {stats['archived_bytes']} 字节（{ratio:.1%}），"
+          f"耗时 {time.perf_counter() - started:.2f}s")
+    print(f"归档目录: {storage.archive.archive_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""把对话记录增量导出为按日期分区的 Parquet 数据集
+
+只导出新增或有变化的日期，已经导出的日期直接跳过。导出后可以只读取需要的列和日期，例如：
+    pandas:  pd.read_parquet("data/exports/messages", columns=["timestamp", "sender", "length"],
+                             filters=[("date", ">=", "2025-02-01")])
+    duckdb:  SELECT sender, avg(length) FROM read_parquet('data/exports/messages/*/*.parquet', hive_partitioning=1)
+             GROUP BY sender
+
+用法:
+    python scripts/export_parquet.py
+    python scripts/export_parquet.py --messages-dir data/messages --output data/exports/messages --full
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="把对话记录导出为 Parquet")
+    parser.add_argument("--messages-dir", default=os.path.join("data", "messages"), help="消息目录")
+    parser.add_argument("--thought-dir", default=os.path.join("data", "thought_process"), help="思维过程目录")
+    parser.add_argument("--output", default=os.path.join("data", "exports", "messages"), help="导出目录")
+    parser.add_argument("--full", action="store_true", help="忽略导出记录，重新导出全部日期")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    from modules.social_behavior.analysis.columnar_export import ParquetExporter
+    from server.services.storage_service import StorageService
+
+    storage = StorageService(args.messages_dir, args.thought_dir)
+    started = time.perf_counter()
+    stats = ParquetExporter(storage, args.output).sync(full=args.full)
+    print(f"导出完成: 新导出 {stats['exported']} 天，跳过 {stats['skipped']} 天，删除 {stats['removed']} 天，"
+          f"耗时 {time.perf_counter() - started:.2f}s")
+    print(f"输出目录: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""统计页面和服务模块的冷启动导入耗时
+
+每个模块在独立的子进程中导入（python -X importtime），重复多次取中位数，
+并列出导入最慢的依赖包。与基线比较时，耗时增长超过阈值的模块会导致非零退出码，便于在 CI 中发现回归。
+基线 data/benchmarks/importtime_baseline.json 随仓库提交；不同机器的耗时不可直接比较，换机器后先用 --save 重新生成。
+
+用法:
+    python scripts/importtime.py                      # 统计并与基线比较
+    python scripts/importtime.py --save               # 统计并保存为新的基线
+    python scripts/importtime.py server.services.chat_service --repeat 5
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = [
+    "server.config.settings",
+    "server.services.chat_service",
+    "modules.spatial_decision.coordinate.coordinate_system",
+    "modules.spatial_decision.visualization.trajectory_plot",
+    "content_generator",
+    "main",
+    "pages.1_settings",
+    "pages.2_chat",
+    "pages.spatial_decision",
+]
+DEFAULT_BASELINE = os.path.join(ROOT, "data", "benchmarks", "importtime_baseline.json")
+
+# -X importtime 的输出格式: import time: self [us] | cumulative | imported package
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module: str) -> Dict:
+    """在新的子进程中导入模块，返回总耗时和最慢的顶层依赖"""
+    code = f"import importlib; importlib.import_module({module!r})"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+
+    packages: Dict[str, int] = {}
+    errors = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            if line.strip() and not line.startswith("import time:"):
+                errors.append(line)
+            continue
+        _, cumulative, indent, name = match.groups()
+        # 缩进为 1 的是被直接导入的包，累计耗时包含其全部子依赖
+        if len(indent) == 1:
+            top = name.split(".")[0]
+            packages[top] = packages.get(top, 0) + int(cumulative)
+
+    if proc.returncode != 0:
+        return {"error": errors[-1] if errors else f"exit code {proc.returncode}"}
+
+    return {
+        "total_ms": sum(packages.values()) / 1000,
+        "packages": {name: us / 1000 for name, us in packages.items()},
+    }
+
+
+def run(modules: List[str], repeat: int) -> Dict[str, Dict]:
+    results = {}
+    for module in modules:
+        runs = [measure(module) for _ in range(repeat)]
+        failed = [r for r in runs if "error" in r]
+        if failed:
+            results[module] = {"error": failed[0]["error"]}
+            continue
+        totals = [r["total_ms"] for r in runs]
+        # 取总耗时为中位数的那一次作为依赖明细
+        median_run = sorted(runs, key=lambda r: r["total_ms"])[len(runs) // 2]
+        slowest = sorted(median_run["packages"].items(), key=lambda item: item[1], reverse=True)[:5]
+        results[module] = {
+            "median_ms": round(statistics.median(totals), 1),
+            "min_ms": round(min(totals), 1),
+            "slowest": [[name, round(ms, 1)] for name, ms in slowest],
+        }
+    return results
+
+
+def load_baseline(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def report(results: Dict[str, Dict], baseline: Optional[Dict], threshold: float) -> List[str]:
+    """打印结果，返回耗时回归的模块"""
+    regressions = []
+    for module, result in results.items():
+        if "error" in result:
+            print(f"{module:<60} 导入失败: {result['error']}")
+            continue
+
+        line = f"{module:<60} {result['median_ms']:>8.1f}ms"
+        previous = (baseline or {}).get(module, {}).get("median_ms")
+        if previous:
+            change = result["median_ms"] / previous - 1
+            line += f"  基线 {previous:.1f}ms ({change:+.0%})"
+            if change > threshold:
+                line += "  ⚠ 回归"
+                regressions.append(module)
+        print(line)
+        slowest = ", ".join(f"{name} {ms:.0f}ms" for name, ms in result["slowest"])
+        print(f"    最慢的依赖: {slowest}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="统计模块冷启动导入耗时")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="要统计的模块，默认统计页面和服务模块")
+    parser.add_argument("--repeat", type=int, default=3, help="每个模块重复导入的次数")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="基线文件，默认 data/benchmarks/importtime_baseline.json")
+    parser.add_argument("--save", action="store_true", help="将本次结果保存为基线")
+    parser.add_argument("--threshold", type=float, default=0.2, help="超过基线的比例视为回归，默认 0.2")
+    args = parser.parse_args()
+
+    results = run(args.modules, args.repeat)
+    baseline = load_baseline(args.baseline)
+    regressions = report(results, baseline, args.threshold)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        merged = {**(baseline or {}), **{m: r for m, r in results.items() if "error" not in r}}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(merged, f, ensure_ascii=False, indent=2)
+        print(f"基线已保存到: {args.baseline}")
+    elif regressions:
+        print(f"\n{len(regressions)} 个模块的导入耗时超过基线 {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""LLM 调用链路压测
+
+按指定并发驱动 ChatService.generate_message、AIService.predict_movement 和 BaseGenerator.generate_content，
+统计 p50/p95/p99 延迟、首 token 延迟和 tokens/s。默认在进程内启动 scripts/mock_llm_server.py，
+不需要真实的 API；也可以通过 --url 指向已经运行的模拟服务或真实服务。
+
+用法:
+    python scripts/load_test.py --target chat,spatial,content --concurrency 8 --requests 64
+    python scripts/load_test.py --backend ollama --tokens-per-second 0 --error-rate 0.1
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+TARGETS = ("chat", "spatial", "content")
+TRAJECTORY_INFO = "\n".join(f"第{i}步: ({i * 0.5:.2f}, {i * -0.3:.2f})" for i in range(1, 21))
+
+
+@dataclass
+class CallResult:
+    latency: float
+    first_token_latency: Optional[float] = None
+    tokens: int = 0
+    error: Optional[str] = None
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """最近秩法计算百分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def configure_environment(backend: str, url: str):
+    """设置环境变量使所有服务指向测试服务，并确认配置已经生效后才开始压测
+
+    API_KEY 和 MODEL_NAME 固定为 mock，不会把真实的密钥发送到任何地址；
+    如果配置仍然指向其他地址（例如配置在设置环境变量之前已经加载），直接退出，不发送任何请求。
+    """
+    expected = {
+        "MODEL_TYPE": backend,
+        "MODEL_NAME": "mock",
+        "API_KEY": "mock",
+        "API_BASE_URL": url.rstrip("/") + "/v1",
+        "OLLAMA_BASE_URL": url.rstrip("/"),
+        # 压测需要每次都真实调用，指标写入临时目录，避免混入正式的指标数据
+        "LLM_CACHE_ENABLED": "false",
+        "METRICS_DIR": os.path.join(tempfile.gettempdir(), "two-load-test-metrics"),
+    }
+    os.environ.update(expected)
+
+    from server.config.settings import reload_config
+
+    config = reload_config()
+    actual = {name: getattr(config, name) for name in expected}
+    actual["LLM_CACHE_ENABLED"] = "true" if actual["LLM_CACHE_ENABLED"] else "false"
+    mismatched = [name for name in expected if actual[name] != expected[name]]
+    if mismatched:
+        raise SystemExit(f"配置没有指向测试服务（{', '.join(mismatched)}），已停止压测")
+
+
+class Workload:
+    """每个线程持有自己的服务实例，保证 provider.last_record 对应本线程的调用"""
+
+    def __init__(self, target: str, work_dir: str):
+        self.target = target
+        self.work_dir = work_dir
+        self._local = threading.local()
+
+    def _service(self):
+        service = getattr(self._local, "service", None)
+        if service is not None:
+            return service
+
+        if self.target == "chat":
+            from server.config.settings import get_config
+            from server.services.chat_service import ChatService
+            from server.services.storage_service import StorageService
+
+            storage = StorageService(
+                os.path.join(self.work_dir, "messages", threading.current_thread().name),
+                os.path.join(self.work_dir, "thought_process", threading.current_thread().name)
+            )
+            service = ChatService(storage, get_config().get_model_config())
+        elif self.target == "spatial":
+            from modules.spatial_decision.services.ai_service import AIService
+            from server.services.llm_provider import create_provider
+
+            service = AIService(create_provider())
+        else:
+            from content_generator.base_generator import BaseGenerator
+
+            service = BaseGenerator(output_dir=os.path.join(self.work_dir, "content"))
+            service.cache = None
+        self._local.service = service
+        return service
+
+    def call(self, index: int) -> CallResult:
+        service = self._service()
+        provider = getattr(service, "provider", None) or getattr(service, "_provider", None)
+        start = time.perf_counter()
+        error = None
+        try:
+            if self.target == "chat":
+                result = service.generate_message("male" if index % 2 == 0 else "female")
+                if "error" in result:
+                    error = result["error"]
+            elif self.target == "spatial":
+                service.predict_movement(TRAJECTORY_INFO, use_cache=False)
+            else:
+                if not service.generate_content(f"写一段关于第 {index} 个话题的短文", "你是一名写作者"):
+                    error = "生成结果为空"
+        except Exception as e:
+            error = str(e)
+
+        record = provider.last_record if provider else None
+        return CallResult(
+            latency=time.perf_counter() - start,
+            first_token_latency=record.ttft if record else None,
+            tokens=(record.completion_tokens or 0) if record else 0,
+            error=error
+        )
+
+
+def run_target(target: str, requests: int, concurrency: int, work_dir: str, verbose: bool) -> Dict:
+    workload = Workload(target, work_dir)
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+    started = time.perf_counter()
+    with output, ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"load-{target}") as pool:
+        results = list(pool.map(workload.call, range(requests)))
+    wall_time = time.perf_counter() - started
+
+    ok = [r for r in results if r.error is None]
+    latencies = [r.latency for r in ok]
+    first_tokens = [r.first_token_latency for r in ok if r.first_token_latency is not None]
+    errors = [r.error for r in results if r.error is not None]
+    return {
+        "target": target,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "sample_error": errors[0] if errors else None,
+        "wall_time": round(wall_time, 3),
+        "requests_per_second": round(len(ok) / wall_time, 2) if wall_time else 0,
+        "tokens_per_second": round(sum(r.tokens for r in ok) / wall_time, 1) if wall_time else 0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "latency_mean": statistics.mean(latencies) if latencies else None,
+        "first_token_p50": percentile(first_tokens, 50),
+        "first_token_p95": percentile(first_tokens, 95),
+    }
+
+
+def format_seconds(value: Optional[float]) -> str:
+    return f"{value * 1000:.0f}ms" if value is not None else "-"
+
+
+def print_report(report: Dict):
+    print(f"\n[{report['target']}] {report['requests']} 个请求，并发 {report['concurrency']}，"
+          f"失败 {report['errors']} 个，总耗时 {report['wall_time']}s")
+    print(f"  吞吐量: {report['requests_per_second']} 请求/s，{report['tokens_per_second']} tokens/s")
+    print(f"  延迟: p50 {format_seconds(report['latency_p50'])}  p95 {format_seconds(report['latency_p95'])}  "
+          f"p99 {format_seconds(report['latency_p99'])}")
+    print(f"  首 token: p50 {format_seconds(report['first_token_p50'])}  p95 {format_seconds(report['first_token_p95'])}")
+    if report["sample_error"]:
+        print(f"  错误示例: {report['sample_error']}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="LLM 调用链路压测")
+    parser.add_argument("--target", default="chat,spatial,content", help=f"压测目标，逗号分隔，可选 {', '.join(TARGETS)}")
+    parser.add_argument("--backend", choices=("openai", "ollama"), default="openai", help="使用的后端接口")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发数")
+    parser.add_argument("--requests", type=int, default=32, help="每个目标的请求数")
+    parser.add_argument("--url", help="已运行的服务地址，例如 http://127.0.0.1:8765；不指定时在进程内启动模拟服务")
+    parser.add_argument("--latency", type=float, default=0.2, help="模拟服务的首 token 延迟（秒）")
+    parser.add_argument("--tokens-per-second", type=float, default=100, help="模拟服务的输出速率，0 表示不限制")
+    parser.add_argument("--content-tokens", type=int, default=60, help="模拟服务每次回复的 token 数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模拟服务注入错误的比例")
+    parser.add_argument("--output", help="将结果保存为 JSON 文件")
+    parser.add_argument("--verbose", action="store_true", help="显示服务的日志输出")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    targets = [t.strip() for t in args.target.split(",") if t.strip()]
+    unknown = [t for t in targets if t not in TARGETS]
+    if unknown:
+        raise SystemExit(f"不支持的压测目标: {', '.join(unknown)}")
+
+    server = None
+    url = args.url
+    if not url:
+        from scripts.mock_llm_server import MockSettings, start_server
+
+        server, _ = start_server(MockSettings(
+            latency=args.latency,
+            tokens_per_second=args.tokens_per_second,
+            content_tokens=args.content_tokens,
+            error_rate=args.error_rate,
+            retry_after=0.1,
+        ))
+        host, port = server.server_address[:2]
+        url = f"http://{host}:{port}"
+        print(f"已启动模拟服务: {url}")
+    configure_environment(args.backend, url)
+
+    reports = []
+    with tempfile.TemporaryDirectory(prefix="two-load-test-") as work_dir:
+        for target in targets:
+            report = run_target(target, args.requests, args.concurrency, work_dir, args.verbose)
+            print_report(report)
+            reports.append(report)
+
+    if server:
+        server.shutdown()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""本地模拟 LLM 服务，兼容 OpenAI 和 Ollama 接口，用于压测和离线调试
+
+- POST /v1/chat/completions（OpenAI 兼容，支持 stream、stream_options.include_usage、reasoning_content）
+- POST /api/chat（Ollama 原生接口，NDJSON 流式输出）
+- GET  /v1/models、/api/tags
+
+输出内容是合成的 token，可以调整首 token 延迟、生成速率和错误注入比例。
+请求中要求返回 JSON 坐标时（空间决策），回复末尾会附带 {"x": ..., "y": ...}。
+
+用法:
+    python scripts/mock_llm_server.py --port 8765 --tokens-per-second 200 --error-rate 0.05
+    API_BASE_URL=http://127.0.0.1:8765/v1 API_KEY=mock MODEL_TYPE=openai streamlit run main.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+WORDS = ["今天", "我们", "好像", "又", "聊到", "了", "那个", "话题", "，", "其实", "我", "一直",
+         "在想", "如果", "换个", "角度", "会", "怎样", "。", "嗯", "也许", "你", "说得", "对", "！"]
+
+
+@dataclass
+class MockSettings:
+    latency: float = 0.2  # 首 token 延迟（秒）
+    tokens_per_second: float = 100.0  # 每秒输出的 token 数，0 表示不限制
+    reasoning_tokens: int = 20  # 思维链 token 数
+    content_tokens: int = 60  # 回复 token 数
+    error_rate: float = 0.0  # 注入错误的比例
+    error_status: int = 429  # 注入错误的 HTTP 状态码
+    retry_after: Optional[float] = 1.0  # 注入 429 时返回的 Retry-After（秒）
+    seed: Optional[int] = None
+
+
+class MockGenerator:
+    """生成合成的 token 序列，并统计请求数"""
+
+    def __init__(self, settings: MockSettings):
+        self.settings = settings
+        self.random = random.Random(settings.seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            if self.random.random() < self.settings.error_rate:
+                self.errors += 1
+                return True
+            return False
+
+    def tokens(self, messages: List[Dict], max_tokens: Optional[int] = None) -> Tuple[List[str], List[str]]:
+        """返回 (思维链 token, 回复 token)"""
+        with self._lock:
+            reasoning = [self.random.choice(WORDS) for _ in range(self.settings.reasoning_tokens)]
+            content = [self.random.choice(WORDS) for _ in range(self.settings.content_tokens)]
+            x, y = round(self.random.uniform(-10, 10), 2), round(self.random.uniform(-10, 10), 2)
+        prompt = " ".join(str(m.get("content", "")) for m in messages)
+        if "JSON" in prompt:
+            content += ["\n", "{", f'"x": {x}, ', f'"y": {y}', "}"]
+        if max_tokens:
+            content = content[:max_tokens]
+        return reasoning, content
+
+    def paced(self, tokens: List[str]) -> Iterator[str]:
+        """按配置的速率逐个输出 token"""
+        interval = 1.0 / self.settings.tokens_per_second if self.settings.tokens_per_second else 0
+        for token in tokens:
+            if interval:
+                time.sleep(interval)
+            yield token
+
+    @staticmethod
+    def prompt_tokens(messages: List[Dict]) -> int:
+        return sum(len(str(m.get("content", ""))) for m in messages)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    generator: MockGenerator = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端提前关闭连接（提前终止或超时）
+            pass
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, status: int, data: Dict, headers: Dict = None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _inject_error(self) -> bool:
+        if not self.generator.should_fail():
+            return False
+        settings = self.generator.settings
+        headers = {}
+        if settings.error_status == 429 and settings.retry_after is not None:
+            headers["Retry-After"] = str(settings.retry_after)
+        self._send_json(settings.error_status, {"error": {"message": "mock injected error", "type": "mock_error"}}, headers)
+        return True
+
+    def do_GET(self):
+        if self.path.rstrip("/") in ("/v1/models", "/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+        elif self.path.rstrip("/") == "/api/tags":
+            self._send_json(200, {"models": [{"name": "mock", "model": "mock"}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        try:
+            request = self._read_json()
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": "invalid json"})
+            return
+
+        path = self.path.rstrip("/")
+        if path in ("/v1/chat/completions", "/chat/completions"):
+            if not self._inject_error():
+                self._openai_chat(request)
+        elif path == "/api/chat":
+            if not self._inject_error():
+                self._ollama_chat(request)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _openai_chat(self, request: Dict):
+        messages = request.get("messages", [])
+        model = request.get("model", "mock")
+        reasoning, content = self.generator.tokens(messages, request.get("max_tokens"))
+        usage = {
+            "prompt_tokens": self.generator.prompt_tokens(messages),
+            "completion_tokens": len(reasoning) + len(content),
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        time.sleep(self.generator.settings.latency)
+
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(content),
+                                "reasoning_content": "".join(reasoning)},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+            return
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+        def event(delta: Dict, finish_reason: str = None, with_usage: bool = False) -> bytes:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [] if with_usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            if with_usage:
+                data["usage"] = usage
+            return f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+        self._start_stream("text/event-stream")
+        try:
+            self._write_chunk(event({"role": "assistant", "content": ""}))
+            for token in self.generator.paced(reasoning):
+                self._write_chunk(event({"reasoning_content": token}))
+            for token in self.generator.paced(content):
+                self._write_chunk(event({"content": token}))
+            self._write_chunk(event({}, finish_reason="stop"))
+            if (request.get("stream_options") or {}).get("include_usage"):
+                self._write_chunk(event({}, with_usage=True))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._end_stream()
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端提前关闭连接（提前终止）
+            pass
+
+    def _ollama_chat(self, request: Dict):
+        messages = request.get("messages", [])
+        model = request.get("model", "mock")
+        options = request.get("options") or {}
+        reasoning, content = self.generator.tokens(messages, options.get("num_predict"))
+        time.sleep(self.generator.settings.latency)
+
+        def line(data: Dict) -> bytes:
+            data = {"model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"), **data}
+            return (json.dumps(data, ensure_ascii=False) + "\n").encode("utf-8")
+
+        final = {
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": self.generator.prompt_tokens(messages),
+            "eval_count": len(reasoning) + len(content),
+        }
+        if request.get("stream") is False:
+            final["message"] = {"role": "assistant", "content": "".join(content), "thinking": "".join(reasoning)}
+            self._send_json(200, final)
+            return
+
+        self._start_stream("application/x-ndjson")
+        try:
+            for token in self.generator.paced(reasoning):
+                self._write_chunk(line({"message": {"role": "assistant", "content": "", "thinking": token}, "done": False}))
+            for token in self.generator.paced(content):
+                self._write_chunk(line({"message": {"role": "assistant", "content": token}, "done": False}))
+            self._write_chunk(line(final))
+            self._end_stream()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def start_server(settings: MockSettings = None, host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, MockGenerator]:
+    """在后台线程中启动模拟服务，port 为 0 时自动选择端口
+
+    Returns:
+        (服务对象，可通过 server.server_address 获取地址; 生成器，可读取请求统计)
+    """
+    generator = MockGenerator(settings or MockSettings())
+    handler = type("BoundMockHandler", (MockHandler,), {"generator": generator})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-llm-server", daemon=True).start()
+    return server, generator
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="本地模拟 LLM 服务（OpenAI / Ollama 兼容）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="首 token 延迟（秒）")
+    parser.add_argument("--tokens-per-second", type=float, default=100, help="输出速率，0 表示不限制")
+    parser.add_argument("--reasoning-tokens", type=int, default=20, help="思维链 token 数")
+    parser.add_argument("--content-tokens", type=int, default=60, help="回复 token 数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="注入错误的比例，0-1 之间")
+    parser.add_argument("--error-status", type=int, default=429, help="注入错误的 HTTP 状态码")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="注入 429 时返回的 Retry-After（秒）")
+    parser.add_argument("--seed", type=int, help="随机种子")
+    return parser.parse_args()
+
+
+def settings_from_args(args) -> MockSettings:
+    return MockSettings(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        reasoning_tokens=args.reasoning_tokens,
+        content_tokens=args.content_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+
+
+def main():
+    args = parse_args()
+    generator = MockGenerator(settings_from_args(args))
+    handler = type("BoundMockHandler", (MockHandler,), {"generator": generator})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    print(f"模拟 LLM 服务已启动: http://{args.host}:{args.port}")
+    print(f"  OpenAI 兼容: API_BASE_URL=http://{args.host}:{args.port}/v1")
+    print(f"  Ollama:      OLLAMA_BASE_URL=http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"共处理 {generator.requests} 个请求，注入错误 {generator.errors} 个")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""存储并发写入压测
+
+模拟多个 Streamlit 会话同时写入：启动多个进程，每个进程中多个线程各自创建 StorageService，
+向同一天写入消息（部分带思维过程），同时有读取线程不断按日期和分页读取，另有线程反复保存、读取同一个轨迹文件。
+结束后检查每条消息都恰好保存了一次、日文件是合法的 JSON、清单条数正确、轨迹文件每次读取都完整，
+并统计写入期间读取的次数（读取只加共享锁，不会互相阻塞）。有任何问题时返回非 0 退出码。
+
+用法:
+    python scripts/storage_stress.py
+    python scripts/storage_stress.py --processes 4 --threads 8 --messages 50 --readers 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="存储并发写入压测")
+    parser.add_argument("--processes", type=int, default=4, help="写入进程数")
+    parser.add_argument("--threads", type=int, default=4, help="每个进程的写入线程数（每个线程一个 StorageService）")
+    parser.add_argument("--messages", type=int, default=50, help="每个线程写入的消息数")
+    parser.add_argument("--readers", type=int, default=4, help="读取线程数")
+    parser.add_argument("--trajectory-writers", type=int, default=4, help="保存轨迹的线程数")
+    parser.add_argument("--data-dir", default=None, help="数据目录，默认使用临时目录并在结束后删除")
+    return parser.parse_args()
+
+
+def configure_environment():
+    """压测只关心日文件和清单，关闭全文索引和指标记录，避免写入正式数据
+
+    已经设置的环境变量优先于 .env；配置如果已经加载过（例如在 pytest 中或 fork 出的子进程），重新加载后检查是否生效。
+    """
+    os.environ["SEARCH_INDEX_ENABLED"] = "false"
+    os.environ["TELEMETRY_ENABLED"] = "false"
+    from server.config.settings import reload_config
+
+    config = reload_config()
+    if config.SEARCH_INDEX_ENABLED or config.TELEMETRY_ENABLED:
+        raise RuntimeError("无法关闭全文索引和指标记录，请检查环境变量")
+
+
+def message_id(process: int, thread: int, index: int) -> str:
+    return f"p{process}-t{thread}-m{index}"
+
+
+def write_messages(data_dir: str, day: date, process: int, threads: int, count: int):
+    """在一个进程中用多个线程写入消息"""
+    configure_environment()
+    from server.models.message import Message
+    from server.services.storage_service import StorageService
+
+    base = datetime.combine(day, datetime.min.time()) + timedelta(hours=12)
+
+    def run(thread: int):
+        storage = StorageService(os.path.join(data_dir, "messages"), os.path.join(data_dir, "thought_process"))
+        for index in range(count):
+            serial = (process * threads + thread) * count + index
+            storage.save_message(Message(
+                content=message_id(process, thread, index),
+                sender="user" if index % 2 else "assistant",
+                timestamp=base + timedelta(microseconds=serial),
+                thought_process=f"思考 {message_id(process, thread, index)}" if index % 3 == 0 else None,
+            ))
+
+    workers = [threading.Thread(target=run, args=(thread,)) for thread in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def read_loop(storage, day: date, stop: threading.Event, stats: dict, lock: threading.Lock):
+    """写入期间不断读取，记录读取次数和错误"""
+    while not stop.is_set():
+        try:
+            records = storage.get_messages_by_date(day) or []
+            page, _ = storage.get_messages_page(limit=20)
+            if len({record["content"] for record in records}) != len(records):
+                raise AssertionError("读取到重复的消息")
+            with lock:
+                stats["reads"] += 2
+        except Exception as e:
+            with lock:
+                stats["errors"].append(f"读取失败: {e!r}")
+
+
+def trajectory_loop(path: str, writer: int, stop: threading.Event, stats: dict, lock: threading.Lock):
+    """反复保存和读取同一个轨迹文件"""
+    from modules.spatial_decision.coordinate.coordinate_system import Coordinate, CoordinateSystem
+
+    system = CoordinateSystem()
+    system.trajectory = [Coordinate(x=float(writer), y=float(i)) for i in range(200)]
+    while not stop.is_set():
+        try:
+            system.save_trajectory(path)
+            with open(path, "r") as f:
+                points = json.load(f)
+            if len(points) != 200:
+                raise AssertionError(f"轨迹点数不正确: {len(points)}")
+            with lock:
+                stats["trajectory_saves"] += 1
+        except Exception as e:
+            with lock:
+                stats["errors"].append(f"轨迹读写失败: {e!r}")
+
+
+def verify(data_dir: str, day: date, args) -> list:
+    """检查每条消息都恰好保存了一次"""
+    from server.services.storage_service import StorageService
+
+    errors = []
+    path = os.path.join(data_dir, "messages", f"{day.isoformat()}.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        return [f"日文件无法解析: {e}"]
+
+    expected = {message_id(p, t, i) for p in range(args.processes)
+                for t in range(args.threads) for i in range(args.messages)}
+    contents = [record["content"] for record in records]
+    missing = expected - set(contents)
+    if missing:
+        errors.append(f"丢失 {len(missing)} 条消息，例如 {sorted(missing)[:5]}")
+    if len(contents) != len(set(contents)):
+        errors.append(f"有 {len(contents) - len(set(contents))} 条重复的消息")
+
+    storage = StorageService(os.path.join(data_dir, "messages"), os.path.join(data_dir, "thought_process"))
+    entry = storage.manifest.entry(day)
+    if not entry or entry["count"] != len(records):
+        errors.append(f"清单条数不正确: {entry and entry['count']} != {len(records)}")
+    if len(storage.manifest.offsets(day)) != len(records):
+        errors.append("偏移索引条数不正确")
+    if storage.manifest.read_records(day) != records:
+        errors.append("按偏移读取的消息与日文件不一致")
+    for record in records:
+        if record.get("thought_ref") and storage.load_thought(record["thought_ref"]) != f"思考 {record['content']}":
+            errors.append(f"思维过程不正确: {record['content']}")
+            break
+    return errors
+
+
+def main():
+    args = parse_args()
+    configure_environment()
+    from server.services.storage_service import StorageService
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="two-storage-stress-")
+    day = date.today()
+    storage = StorageService(os.path.join(data_dir, "messages"), os.path.join(data_dir, "thought_process"))
+    trajectory_path = os.path.join(data_dir, "trajectories", "trajectory.json")
+    os.makedirs(os.path.dirname(trajectory_path), exist_ok=True)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {"reads": 0, "trajectory_saves": 0, "errors": []}
+    background = [threading.Thread(target=read_loop, args=(storage, day, stop, stats, lock))
+                  for _ in range(args.readers)]
+    background += [threading.Thread(target=trajectory_loop, args=(trajectory_path, i, stop, stats, lock))
+                   for i in range(args.trajectory_writers)]
+    for worker in background:
+        worker.start()
+
+    started = time.perf_counter()
+    processes = [multiprocessing.Process(target=write_messages,
+                                         args=(data_dir, day, p, args.threads, args.messages))
+                 for p in range(args.processes)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for worker in background:
+        worker.join()
+
+    errors = stats["errors"][:10]
+    errors += [f"写入进程 {i} 退出码 {process.exitcode}" for i, process in enumerate(processes) if process.exitcode]
+    errors += verify(data_dir, day, args)
+
+    total = args.processes * args.threads * args.messages
+    print(f"写入 {total} 条消息（{args.processes} 个进程 x {args.threads} 个线程），耗时 {elapsed:.2f}s，"
+          f"{total / elapsed:.0f} 条/s")
+    print(f"写入期间读取 {stats['reads']} 次（{stats['reads'] / elapsed:.0f} 次/s），"
+          f"保存轨迹 {stats['trajectory_saves']} 次")
+    if not args.data_dir:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    if errors:
+        print("检查失败:")
+        for error in errors:
+            print(f"  - {error}")
+        sys.exit(1)
+    print("检查通过: 没有丢失或重复的消息")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import json
 import os
-from typing import Dict, List
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 class PromptTemplate:
     def __init__(self, template: str):
@@ -13,25 +14,74 @@ class Prompts:
     CONFIG_FILE = "data/config/prompts_config.json"
     CUSTOM_TERMS_FILE = "data/config/custom_terms.json"
     
+    # 进程内缓存：文件路径 -> (文件签名, 解析结果)，文件签名变化时重新读取
+    _cache_lock = threading.Lock()
+    _file_cache: Dict[str, Tuple[Optional[Tuple[int, int]], Any]] = {}
+    # 渲染后的角色提示词：(角色, 配置版本) -> 提示词
+    _role_prompt_cache: Dict[Tuple[str, Tuple], str] = {}
+    
+    @staticmethod
+    def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+        """获取文件签名（修改时间和大小），文件不存在时返回 None"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    @classmethod
+    def _read_json_cached(cls, path: str, default_factory: Callable[[], Any]) -> Any:
+        """读取 JSON 文件，文件未变化时直接返回缓存
+        
+        返回的对象在调用方之间共享，不要直接修改
+        """
+        signature = cls._file_signature(path)
+        with cls._cache_lock:
+            cached = cls._file_cache.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        
+        if signature is None:
+            data = default_factory()
+        else:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except json.JSONDecodeError:
+                # 文件可能正在被配置页面写入，暂时沿用旧的缓存
+                if cached is not None:
+                    return cached[1]
+                raise
+        
+        with cls._cache_lock:
+            cls._file_cache[path] = (signature, data)
+        return data
+    
+    @classmethod
+    def config_version(cls) -> Tuple:
+        """当前配置版本，由两个配置文件的签名组成"""
+        return (cls._file_signature(cls.CONFIG_FILE), cls._file_signature(cls.CUSTOM_TERMS_FILE))
+    
+    @classmethod
+    def invalidate(cls):
+        """清空缓存，配置文件被修改后调用"""
+        with cls._cache_lock:
+            cls._file_cache.clear()
+            cls._role_prompt_cache.clear()
+    
     @classmethod
     def _load_config(cls) -> Dict:
         """加载提示词配置"""
-        if not os.path.exists(cls.CONFIG_FILE):
-            return {
-                "male_base": cls._get_default_male_prompt(),
-                "female_base": cls._get_default_female_prompt(),
-                "context_template": cls._get_default_context_template()
-            }
-        with open(cls.CONFIG_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return cls._read_json_cached(cls.CONFIG_FILE, lambda: {
+            "male_base": cls._get_default_male_prompt(),
+            "female_base": cls._get_default_female_prompt(),
+            "context_template": cls._get_default_context_template()
+        })
     
     @classmethod
     def _load_custom_terms(cls) -> Dict[str, List[str]]:
         """加载自定义词条"""
-        if not os.path.exists(cls.CUSTOM_TERMS_FILE):
-            return {"male": [], "female": []}
-        with open(cls.CUSTOM_TERMS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return cls._read_json_cached(cls.CUSTOM_TERMS_FILE, lambda: {"male": [], "female": []})
 
     @classmethod
     def _get_default_male_prompt(cls) -> str:
@@ -54,7 +104,26 @@ class Prompts:
 
     @classmethod
     def get_role_prompt(cls, role: str) -> str:
-        """获取角色提示词，包括基础提示词和自定义词条"""
+        """获取角色提示词，包括基础提示词和自定义词条
+        
+        结果按 (角色, 配置版本) 缓存，配置文件修改后自动失效
+        """
+        key = (role, cls.config_version())
+        with cls._cache_lock:
+            cached = cls._role_prompt_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        prompt = cls._render_role_prompt(role)
+        with cls._cache_lock:
+            # 旧版本的提示词不会再被使用，只保留当前版本
+            cls._role_prompt_cache = {k: v for k, v in cls._role_prompt_cache.items() if k[1] == key[1]}
+            cls._role_prompt_cache[key] = prompt
+        return prompt
+
+    @classmethod
+    def _render_role_prompt(cls, role: str) -> str:
+        """拼接基础提示词和自定义词条"""
         config = cls._load_config()
         custom_terms = cls._load_custom_terms()
         
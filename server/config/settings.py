@@ -1,50 +1,101 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import os
+import threading
+import time
 from datetime import timedelta
-from dotenv import load_dotenv, find_dotenv
+from typing import Any, Callable, Optional
+
+
+def _as_bool(value: str) -> bool:
+    return str(value).lower() == "true"
+
+
+def _env(name: str, default: Any = None, cast: Callable = str):
+    """从环境变量读取配置项，在创建 Config 实例时读取而不是在导入时读取"""
+    def factory():
+        value = os.getenv(name, default)
+        return cast(value) if value is not None else None
+    return Field(default_factory=factory)
 
-# 加载 .env 文件
-print("当前工作目录:", os.getcwd())
-dotenv_path = find_dotenv()
-print(".env 文件路径:", dotenv_path)
-print(".env 文件是否存在:", os.path.exists(dotenv_path))
-print("环境变量加载前 API_KEY:", os.getenv("API_KEY"))
-load_dotenv(dotenv_path, override=True, verbose=True)
-print("环境变量加载后 API_KEY:", os.getenv("API_KEY"))
 
 class Config(BaseModel):
     # API 配置
-    API_BASE_URL: str = os.getenv("API_BASE_URL")
-    API_KEY: str = os.getenv("API_KEY")
+    API_BASE_URL: str = _env("API_BASE_URL")
+    API_KEY: str = _env("API_KEY")
     
     @property
     def api_key(self) -> str:
-        key = os.getenv("API_KEY")
-        print("Config 中获取的 API_KEY:", key)
+        key = self.API_KEY or os.getenv("API_KEY")
         if not key:
             raise ValueError("API_KEY 环境变量未设置")
         return key
 
     # 代理配置
-    HTTP_PROXY: str = os.getenv("HTTP_PROXY", "")
-    HTTPS_PROXY: str = os.getenv("HTTPS_PROXY", "")
+    HTTP_PROXY: str = _env("HTTP_PROXY", "")
+    HTTPS_PROXY: str = _env("HTTPS_PROXY", "")
     
     # 时间配置
     MESSAGE_INTERVAL: timedelta = timedelta(hours=1)
     CONTEXT_DAYS: int = 7
-    MAX_HISTORY_MESSAGES: int = int(os.getenv("MAX_HISTORY_MESSAGES", "50"))  # 历史消息最大条数
+    MAX_HISTORY_MESSAGES: int = _env("MAX_HISTORY_MESSAGES", "50", int)  # 历史消息最大条数
     
     # 数据存储配置
     DATA_DIR: str = "data"
     THOUGHT_PROCESS_DIR: str = os.path.join(DATA_DIR, "thought_process")
     MESSAGES_DIR: str = os.path.join(DATA_DIR, "messages")
+    THOUGHT_COMPRESSION: str = _env("THOUGHT_COMPRESSION", "gzip")  # 思维过程的压缩方式: gzip, zstd, none
+    ARCHIVE_AFTER_DAYS: int = _env("ARCHIVE_AFTER_DAYS", "0", int)  # 超过多少天的日文件移入压缩归档，0 表示不自动归档
+    ARCHIVE_COMPRESSION: str = _env("ARCHIVE_COMPRESSION", "gzip")  # 归档的压缩方式: gzip, zstd, none
+    ARCHIVE_INTERVAL_HOURS: float = _env("ARCHIVE_INTERVAL_HOURS", "24", float)  # 后台归档的间隔
     
     # 模型配置
-    MODEL_TYPE: str = os.getenv("MODEL_TYPE", "openai")  # 可选值: openai, ollama
-    MODEL_NAME: str = os.getenv("MODEL_NAME", "deepseek-r1")
-    TEMPERATURE: float = float(os.getenv("TEMPERATURE", "0.7"))
-    MAX_TOKENS: int = int(os.getenv("MAX_TOKENS", "1000"))
-    OLLAMA_BASE_URL: str = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    MODEL_TYPE: str = _env("MODEL_TYPE", "openai")  # 可选值: openai, ollama
+    MODEL_NAME: str = _env("MODEL_NAME", "deepseek-r1")
+    TEMPERATURE: float = _env("TEMPERATURE", "0.7", float)
+    MAX_TOKENS: int = _env("MAX_TOKENS", "1000", int)
+    OLLAMA_BASE_URL: str = _env("OLLAMA_BASE_URL", "http://localhost:11434")
+    OLLAMA_KEEP_ALIVE: str = _env("OLLAMA_KEEP_ALIVE", "30m")  # 模型常驻时间，保持 KV 缓存以复用相同前缀
+
+    # 提示词缓存配置
+    PROMPT_CACHE_KEY: bool = _env("PROMPT_CACHE_KEY", "false", _as_bool)  # 向服务端发送 prompt_cache_key 提示
+    PROMPT_CACHE_WINDOW_STEP: int = _env("PROMPT_CACHE_WINDOW_STEP", "10", int)  # 历史窗口按该步长整体滑动
+    STREAM_INCLUDE_USAGE: bool = _env("STREAM_INCLUDE_USAGE", "true", _as_bool)  # 流式输出时返回 token 用量
+
+    # LLM 响应缓存配置（默认关闭，适合重复运行的实验和内容生成任务）
+    LLM_CACHE_ENABLED: bool = _env("LLM_CACHE_ENABLED", "false", _as_bool)
+    LLM_CACHE_DIR: str = _env("LLM_CACHE_DIR", os.path.join("data", "cache", "llm_responses"))
+    LLM_CACHE_TTL: float = _env("LLM_CACHE_TTL", str(7 * 24 * 3600), float)  # 缓存有效期（秒）
+    LLM_CACHE_MAX_MB: int = _env("LLM_CACHE_MAX_MB", "200", int)  # 缓存总大小上限，超出后淘汰最久未使用的条目
+
+    # LLM 调用限流与重试配置（所有调用共享）
+    LLM_RPM: float = _env("LLM_RPM", "0", float)  # 每分钟最多请求数，0 表示不限制
+    LLM_TPM: float = _env("LLM_TPM", "0", float)  # 每分钟最多 token 数（估算），0 表示不限制
+    LLM_MAX_RETRIES: int = _env("LLM_MAX_RETRIES", "4", int)  # 429/5xx 等错误的最大重试次数
+    LLM_RETRY_BASE_DELAY: float = _env("LLM_RETRY_BASE_DELAY", "1", float)  # 指数退避的初始等待（秒）
+    LLM_RETRY_MAX_DELAY: float = _env("LLM_RETRY_MAX_DELAY", "60", float)  # 单次等待上限（秒）
+
+    # LLM 调用指标配置
+    TELEMETRY_ENABLED: bool = _env("TELEMETRY_ENABLED", "true", _as_bool)  # 记录每次调用的延迟和 token 用量
+    TELEMETRY_LOG: bool = _env("TELEMETRY_LOG", "true", _as_bool)  # 每次调用后打印一行摘要
+    METRICS_DIR: str = _env("METRICS_DIR", os.path.join("data", "metrics"))  # 按天保存的 JSONL 指标文件目录
+    METRICS_PORT: int = _env("METRICS_PORT", "0", int)  # Prometheus 指标接口端口，0 表示不启动
+
+    # 消息全文索引配置（SQLite FTS5，保存在消息目录旁的 index/messages.sqlite）
+    SEARCH_INDEX_ENABLED: bool = _env("SEARCH_INDEX_ENABLED", "true", _as_bool)
+
+    # 页面性能分析配置（也可以在页面侧边栏临时开启）
+    PROFILING_ENABLED: bool = _env("PROFILING_ENABLED", "false", _as_bool)  # 记录每次页面运行的分段耗时
+    PROFILE_DIR: str = _env("PROFILE_DIR", os.path.join("data", "profiles"))  # 采样结果（speedscope 格式）保存目录
+    PROFILE_INTERVAL_MS: float = _env("PROFILE_INTERVAL_MS", "5", float)  # 采样间隔（毫秒）
+
+    # 流式输出提前终止配置
+    STREAM_EARLY_STOP: bool = _env("STREAM_EARLY_STOP", "true", _as_bool)
+    CHAT_STOP_MAX_CHARS: int = _env("CHAT_STOP_MAX_CHARS", "50", int)  # 聊天回复超过该字数并到达句末时停止，0 表示不限制
+
+    # 空间决策并行采样配置
+    SPATIAL_SAMPLES: int = _env("SPATIAL_SAMPLES", "1", int)  # 同时发起的采样数，1 表示不并行
+    SPATIAL_SAMPLE_STRATEGY: str = _env("SPATIAL_SAMPLE_STRATEGY", "first")  # 可选值: first, median, consensus
+    SPATIAL_SAMPLE_TIMEOUT: float = _env("SPATIAL_SAMPLE_TIMEOUT", "120", float)  # 等待采样的最长时间（秒）
 
     def get_model_config(self) -> dict:
         """获取模型配置"""
@@ -68,10 +119,61 @@ class Config(BaseModel):
                 "model": self.MODEL_NAME,
                 "temperature": self.TEMPERATURE,
                 "base_url": self.OLLAMA_BASE_URL,
+                "keep_alive": self.OLLAMA_KEEP_ALIVE,
             }
             
         return config
 
     class Config:
         env_file = ".env"
-        env_file_encoding = "utf-8" 
\ No newline at end of file
+        env_file_encoding = "utf-8"
+
+
+_config: Optional[Config] = None
+_config_lock = threading.Lock()
+_env_loaded = False
+_load_seconds: Optional[float] = None
+
+
+def load_env(force: bool = False):
+    """加载 .env 文件到环境变量（进程中已经设置的环境变量优先，不会被 .env 覆盖），只在第一次调用时执行，force=True 时重新加载"""
+    global _env_loaded
+    if _env_loaded and not force:
+        return
+    from dotenv import load_dotenv, find_dotenv
+
+    load_dotenv(find_dotenv(), override=False)
+    _env_loaded = True
+
+
+def get_config() -> Config:
+    """获取共享的配置实例，首次调用时加载 .env 并创建
+
+    导入本模块不会读取文件或打印信息，修改环境变量或 .env 后调用 reload_config() 生效。
+    """
+    global _config, _load_seconds
+    if _config is not None:
+        return _config
+    with _config_lock:
+        if _config is None:
+            start = time.perf_counter()
+            load_env()
+            _config = Config()
+            _load_seconds = time.perf_counter() - start
+        return _config
+
+
+def reload_config() -> Config:
+    """重新加载 .env 并创建新的配置实例（只补充尚未设置的环境变量，已经存在的变量不会被 .env 覆盖）"""
+    global _config, _load_seconds
+    with _config_lock:
+        start = time.perf_counter()
+        load_env(force=True)
+        _config = Config()
+        _load_seconds = time.perf_counter() - start
+        return _config
+
+
+def config_load_seconds() -> Optional[float]:
+    """最近一次加载配置的耗时（秒），尚未加载时返回 None，显示在性能页面上"""
+    return _load_seconds
@@ -8,6 +8,7 @@ class Message(BaseModel):
     sender: str
     timestamp: datetime
     thought_process: Optional[str] = None
+    thought_ref: Optional[str] = None  # 保存在 ThoughtStore 中的思维过程引用，需要时再读取
 
     class Config:
         json_encoders = {
@@ -31,12 +32,15 @@ class Message(BaseModel):
         return cls(**data)
 
     def to_dict(self) -> dict:
-        return {
+        data = {
             'content': self.content,
             'sender': self.sender,
             'timestamp': self.timestamp.isoformat(),
             'thought_process': self.thought_process
         }
+        if self.thought_ref:
+            data['thought_ref'] = self.thought_ref
+        return data
 
     @staticmethod
     def clean_content(content: str) -> Tuple[str, Optional[str]]:
@@ -1,13 +1,12 @@
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Callable, Any
-from openai import OpenAI
-from langchain_ollama import ChatOllama
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_core.callbacks import BaseCallbackHandler
+from typing import List, Dict, Optional, Callable, Any, Tuple
 from ..models.message import Message
 from ..config.prompts import Prompts
-from ..config.settings import Config
+from ..config.settings import get_config
+from .llm_provider import StreamDelta, create_provider
 from .storage_service import StorageService
+from utils.profiling import profiled
+from utils.stream_control import MaxCharsComplete, StopCondition, StreamStopper
 import os
 
 class MessageProcessor:
@@ -40,39 +39,45 @@ class StreamingCallbackHandler:
     def __init__(self, thought_callback: Callable[[str], Any], content_callback: Callable[[str], Any]):
         self.thought_callback = thought_callback
         self.content_callback = content_callback
+        self.emitted = 0  # 已经输出的内容长度
         
-    def process_chunk(self, chunk) -> None:
-        """处理新的输出chunk"""
+    def process_chunk(self, delta: StreamDelta, content: Optional[str] = None) -> None:
+        """处理新的输出增量
+
+        Args:
+            delta: 输出增量
+            content: 经过停止条件裁剪后的累计内容，指定时只输出其中尚未输出的部分，裁剪掉的内容不会显示
+        """
         # 处理思维链内容
-        if hasattr(chunk.choices[0].delta, 'reasoning_content'):
-            if chunk.choices[0].delta.reasoning_content:
-                self.thought_callback(chunk.choices[0].delta.reasoning_content)
+        if delta.reasoning:
+            self.thought_callback(delta.reasoning)
                 
         # 处理模型返回的实际内容
-        if hasattr(chunk.choices[0].delta, 'content'):
-            if chunk.choices[0].delta.content:
-                self.content_callback(chunk.choices[0].delta.content)
+        text = delta.content if content is None else content[self.emitted:]
+        if text:
+            self.emitted += len(text)
+            self.content_callback(text)
 
 class ChatService:
-    def __init__(self, storage_service: StorageService, model_config: dict):
+    def __init__(self, storage_service: StorageService, model_config: dict,
+                 stop_conditions: Optional[List[StopCondition]] = None):
         self.storage = storage_service
         
-        model_type = Config().MODEL_TYPE
+        config = get_config()
+        model_type = config.MODEL_TYPE
         
-        if model_type == "openai":
-            # 初始化OpenAI客户端
-            self.client = OpenAI(
-                api_key=model_config.get("api_key"),
-                base_url=model_config.get("base_url")
-            )
-            self.model_name = model_config.get("model_name", "gpt-3.5-turbo")
-            self.temperature = model_config.get("temperature", 0.7)
-            self.max_tokens = model_config.get("max_tokens", 1000)
-        else:  # ollama
-            if not all(key in model_config for key in ["base_url", "model"]):
-                raise ValueError("Missing required Ollama configuration")
-            
-            self.llm = ChatOllama(**model_config)
+        # 流式输出的提前终止条件，未指定时根据配置生成
+        if stop_conditions is None:
+            stop_conditions = []
+            if config.STREAM_EARLY_STOP and config.CHAT_STOP_MAX_CHARS > 0:
+                stop_conditions.append(MaxCharsComplete(config.CHAT_STOP_MAX_CHARS))
+        self.stop_conditions = stop_conditions
+        
+        # OpenAI 兼容接口和 Ollama 都通过统一的 provider 流式输出
+        self.provider = create_provider(model_type, model_config)
+        self.model_name = self.provider.model
+        self.temperature = self.provider.temperature
+        self.max_tokens = self.provider.max_tokens
 
     def _get_context(self, days: int = None) -> List[Dict]:
         """获取历史对话上下文
@@ -83,10 +88,10 @@ class ChatService:
         Returns:
             List[Dict]: 历史消息列表
         """
+        config = get_config()
         if days is None:
-            days = Config().CONTEXT_DAYS
+            days = config.CONTEXT_DAYS
             
-        context = []
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
@@ -97,9 +102,13 @@ class ChatService:
         messages.sort(key=lambda x: x.timestamp)
         
         # 只保留最近的 N 条消息
-        max_messages = Config().MAX_HISTORY_MESSAGES or 50
+        # 截断位置按固定步长对齐，使上下文前缀在连续多次调用间保持不变，便于命中服务端的提示词缓存
+        max_messages = config.MAX_HISTORY_MESSAGES or 50
         if len(messages) > max_messages:
-            messages = messages[-max_messages:]
+            step = max(1, min(config.PROMPT_CACHE_WINDOW_STEP, max_messages))
+            overflow = len(messages) - max_messages
+            start = -(-overflow // step) * step
+            messages = messages[start:]
             
         return messages
 
@@ -110,6 +119,19 @@ class ChatService:
             for msg in messages
         ])
 
+    def _build_messages(self, sender: str, context_text: str) -> List[Dict]:
+        """构建请求消息
+        
+        消息按"稳定前缀 + 可变后缀"排列：角色提示词和历史记录在多次调用间只会在末尾追加，
+        固定的回复指令放在最后，以便服务端复用前缀的提示词缓存
+        """
+        system_prompt = Prompts.get_role_prompt(sender)
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"这是最近的对话记录：\n{context_text}\n\n根据以上对话和你的角色，请回复一条消息。"}
+        ]
+
+    @profiled("chat.generate_message")
     def generate_message(self, sender: str, thought_callback: Callable[[str], Any] = None, 
                         content_callback: Callable[[str], Any] = None) -> Dict:
         """生成新的消息，支持流式输出
@@ -127,15 +149,8 @@ class ChatService:
             context = self._get_context()
             context_text = self._format_context(context)
             
-            # 获取角色提示词
-            prompts = Prompts()
-            system_prompt = prompts.get_role_prompt(sender)
-            
             # 构建消息列表
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"这是最近的对话记录：\n{context_text}\n\n根据以上对话和你的角色，请回复一条消息。"}
-            ]
+            messages = self._build_messages(sender, context_text)
             
             # 创建回调处理器
             callback_handler = None
@@ -143,32 +158,28 @@ class ChatService:
                 callback_handler = StreamingCallbackHandler(thought_callback, content_callback)
             
             # 使用流式API生成回复
-            full_content = ""
-            thought_content = ""
-            
-            stream = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=messages,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                stream=True,
-                response_format={"type": "text"}
-            )
-            
-            # 处理流式输出
-            for chunk in stream:
-                if callback_handler:
-                    callback_handler.process_chunk(chunk)
-                    
-                # 收集思维链内容
-                if hasattr(chunk.choices[0].delta, 'reasoning_content'):
-                    if chunk.choices[0].delta.reasoning_content:
-                        thought_content += chunk.choices[0].delta.reasoning_content
-                
-                # 收集实际内容
-                if hasattr(chunk.choices[0].delta, 'content'):
-                    if chunk.choices[0].delta.content:
-                        full_content += chunk.choices[0].delta.content
+            stopper = StreamStopper(self.stop_conditions, max_tokens=self.max_tokens)
+            
+            # 经过共享限流器打开流，收到第一个数据块前的 429/5xx 错误会自动重试
+            # 相同角色的请求共享前缀，缓存键提示服务端路由到同一缓存
+            deltas = self.provider.stream(messages, source="chat", cache_key=f"two-chat-{sender}")
+            
+            # 处理流式输出，满足停止条件后立即关闭连接
+            # 提前关闭时不会收到最后的 usage 数据块，提示词缓存统计改用估算值（见 LLMProvider.stream）
+            try:
+                for delta in deltas:
+                    # 先检查停止条件再输出，界面上显示的内容与保存的消息一致
+                    stop = stopper.feed(content=delta.content, reasoning=delta.reasoning)
+                    if callback_handler:
+                        callback_handler.process_chunk(delta, stopper.content)
+                    if stop:
+                        break
+            finally:
+                deltas.close()
+            stopper.finish()
+            
+            full_content = stopper.content
+            thought_content = stopper.reasoning
             
             # 创建消息对象
             timestamp = datetime.now()
@@ -195,6 +206,15 @@ class ChatService:
             return []
         return [Message.from_dict(msg) for msg in messages]
 
+    def get_messages_page(self, cursor: str = None, limit: int = 50,
+                          end_date: datetime.date = None) -> Tuple[List[Message], Optional[str]]:
+        """按时间倒序分页获取消息（新的在前），参数说明见 StorageService.get_messages_page"""
+        return self.storage.get_messages_page(cursor, limit, end_date)
+
+    def search_messages(self, query: str, limit: int = 50, **filters) -> List[Message]:
+        """全文搜索历史消息，filters 支持 sender、start_date、end_date、include_thoughts"""
+        return self.storage.search_messages(query, limit, **filters)
+
     def should_generate_message(self, last_message: Optional[Message] = None) -> bool:
         """检查是否应该生成新消息"""
         if not last_message:
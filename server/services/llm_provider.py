@@ -0,0 +1,250 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+from ..config.settings import get_config
+from utils.prompt_cache import prompt_cache_stats
+from utils.rate_limiter import estimate_tokens, get_rate_limiter, open_stream_with_retry
+from utils.telemetry import CallRecord, StreamTimer, get_telemetry
+
+
+@dataclass
+class StreamDelta:
+    """流式输出的一个增量，不同后端统一为相同的结构"""
+    content: str = ""
+    reasoning: str = ""
+    usage: Any = None  # 后端返回的原始 usage，一般只在最后一个增量中出现
+    finish_reason: Optional[str] = None
+
+
+def _field(obj: Any, name: str, default: Any = None) -> Any:
+    """同时支持字典和对象形式的字段读取"""
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def usage_total_tokens(usage: Any) -> Optional[int]:
+    """从 usage 中读取本次调用消耗的总 token 数"""
+    if usage is None:
+        return None
+    total = _field(usage, "total_tokens")
+    if total is None and _field(usage, "prompt_eval_count") is not None:
+        total = (_field(usage, "prompt_eval_count") or 0) + (_field(usage, "eval_count") or 0)
+    return total
+
+
+class LLMProvider(ABC):
+    """LLM 后端的统一接口
+
+    子类实现 _open_stream 和 _parse_chunk，stream() 负责限流重试、用量统计和延迟记录，
+    所有后端的调用都记录相同的指标（首 token 延迟、token 间隔、生成速率、token 用量、错误），
+    保存到 utils.telemetry 的指标存储中。
+    """
+
+    name = "base"
+
+    def __init__(self, model: str, temperature: float = 0.7, max_tokens: Optional[int] = None):
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.last_record: Optional[CallRecord] = None
+
+    @abstractmethod
+    def _open_stream(self, messages: List[Dict], temperature: float, max_tokens: Optional[int],
+                     cache_key: Optional[str]) -> Any:
+        """发起流式请求，返回可迭代的原始流"""
+
+    @abstractmethod
+    def _parse_chunk(self, chunk: Any) -> Optional[StreamDelta]:
+        """把原始数据块转换为 StreamDelta，无内容时返回 None"""
+
+    def stream(self, messages: List[Dict], temperature: float = None, max_tokens: int = None,
+               source: str = "llm", cache_key: str = None) -> Iterator[StreamDelta]:
+        """流式生成，逐个返回 StreamDelta
+
+        提前结束迭代（break 或 close()）时会立即关闭底层连接。
+
+        Args:
+            messages: [{"role": ..., "content": ...}] 格式的消息列表
+            temperature: 生成温度，默认使用构造时的值
+            max_tokens: 最大生成长度，默认使用构造时的值
+            source: 调用来源（chat、spatial、content），用于统计
+            cache_key: 提示词缓存键，支持的后端会据此路由到同一缓存
+        """
+        temperature = self.temperature if temperature is None else temperature
+        max_tokens = self.max_tokens if max_tokens is None else max_tokens
+        estimated = estimate_tokens(messages, max_tokens)
+
+        timer = StreamTimer(self.name, self.model, source)
+        stream = None
+        try:
+            stream, chunks = open_stream_with_retry(
+                lambda: self._open_stream(messages, temperature, max_tokens, cache_key),
+                estimated
+            )
+            for chunk in chunks:
+                delta = self._parse_chunk(chunk)
+                if delta is None:
+                    continue
+                timer.on_delta(delta.content, delta.reasoning, delta.usage, delta.finish_reason)
+                yield delta
+        except Exception as e:
+            timer.on_error(e)
+            raise
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+            record = timer.finish()
+            self.last_record = record
+            if record.error is None:
+                # 提前终止时收不到最后的 usage 数据块，提示词缓存按估算值统计，调用记录中同样使用估算值
+                if timer.usage is None or prompt_cache_stats.record(source, timer.usage) is None:
+                    info = prompt_cache_stats.record_estimated(source, messages, cache_key)
+                    if record.prompt_tokens is None:
+                        record.prompt_tokens = info["prompt_tokens"]
+                        record.cached_tokens = info["cached_tokens"]
+                        record.usage_estimated = True
+            actual = usage_total_tokens(timer.usage)
+            if actual is None:
+                # 提前终止或失败时没有 usage，按提示词估算加上实际收到的增量数归还多扣的额度
+                actual = estimate_tokens(messages) + (record.completion_tokens or 0)
+            get_rate_limiter().reconcile(estimated, actual)
+            telemetry = get_telemetry()
+            if telemetry:
+                telemetry.record(record)
+
+    def complete(self, messages: List[Dict], temperature: float = None, max_tokens: int = None,
+                 source: str = "llm", cache_key: str = None) -> str:
+        """生成完整回复（内部同样走流式接口，便于统一统计）"""
+        return "".join(
+            delta.content
+            for delta in self.stream(messages, temperature, max_tokens, source, cache_key)
+        )
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI 兼容接口（OpenAI、DeepSeek、各类代理网关）"""
+
+    name = "openai"
+
+    def __init__(self, model: str, api_key: str = None, base_url: str = None,
+                 temperature: float = 0.7, max_tokens: Optional[int] = None,
+                 include_usage: bool = True, send_cache_key: bool = False):
+        super().__init__(model, temperature, max_tokens)
+        from openai import OpenAI
+
+        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self.include_usage = include_usage
+        self.send_cache_key = send_cache_key
+
+    def _open_stream(self, messages, temperature, max_tokens, cache_key):
+        options = {}
+        if max_tokens:
+            options["max_tokens"] = max_tokens
+        if self.include_usage:
+            options["stream_options"] = {"include_usage": True}
+        if self.send_cache_key and cache_key:
+            options["extra_body"] = {"prompt_cache_key": cache_key}
+        return self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            stream=True,
+            **options
+        )
+
+    def _parse_chunk(self, chunk) -> Optional[StreamDelta]:
+        usage = getattr(chunk, "usage", None)
+        if not chunk.choices:
+            return StreamDelta(usage=usage) if usage else None
+        choice = chunk.choices[0]
+        return StreamDelta(
+            content=getattr(choice.delta, "content", None) or "",
+            reasoning=getattr(choice.delta, "reasoning_content", None) or "",
+            usage=usage,
+            finish_reason=choice.finish_reason
+        )
+
+
+class OllamaProvider(LLMProvider):
+    """Ollama 原生接口，使用 ollama 客户端直接流式输出"""
+
+    name = "ollama"
+
+    def __init__(self, model: str, base_url: str = "http://localhost:11434", temperature: float = 0.7,
+                 max_tokens: Optional[int] = None, keep_alive: str = None):
+        super().__init__(model, temperature, max_tokens)
+        from ollama import Client
+
+        self.client = Client(host=base_url)
+        self.keep_alive = keep_alive
+
+    def _open_stream(self, messages, temperature, max_tokens, cache_key):
+        options = {"temperature": temperature}
+        if max_tokens:
+            options["num_predict"] = max_tokens
+        return self.client.chat(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            options=options,
+            keep_alive=self.keep_alive
+        )
+
+    def _parse_chunk(self, chunk) -> Optional[StreamDelta]:
+        message = _field(chunk, "message")
+        done = _field(chunk, "done", False)
+        usage = None
+        if done:
+            usage = {
+                "prompt_eval_count": _field(chunk, "prompt_eval_count"),
+                "eval_count": _field(chunk, "eval_count"),
+            }
+        return StreamDelta(
+            content=_field(message, "content") or "",
+            reasoning=_field(message, "thinking") or "",
+            usage=usage,
+            finish_reason=_field(chunk, "done_reason") if done else None
+        )
+
+
+def create_provider(model_type: str = None, model_config: Dict = None) -> LLMProvider:
+    """根据模型类型和配置创建后端
+
+    Args:
+        model_type: openai 或 ollama，默认使用配置中的 MODEL_TYPE
+        model_config: 模型参数，兼容 Config.get_model_config() 的格式（model_name 或 model），默认使用配置中的值
+
+    Returns:
+        LLMProvider 实例
+    """
+    config = get_config()
+    model_type = (model_type or config.MODEL_TYPE).lower()
+    model_config = model_config if model_config is not None else config.get_model_config()
+    model = model_config.get("model_name") or model_config.get("model") or config.MODEL_NAME
+
+    if model_type == "openai":
+        return OpenAIProvider(
+            model=model,
+            api_key=model_config.get("api_key"),
+            base_url=model_config.get("base_url"),
+            temperature=model_config.get("temperature", config.TEMPERATURE),
+            max_tokens=model_config.get("max_tokens", config.MAX_TOKENS),
+            include_usage=config.STREAM_INCLUDE_USAGE,
+            send_cache_key=config.PROMPT_CACHE_KEY
+        )
+    if model_type == "ollama":
+        if not model_config.get("base_url") or not model:
+            raise ValueError("Missing required Ollama configuration")
+        return OllamaProvider(
+            model=model,
+            base_url=model_config["base_url"],
+            temperature=model_config.get("temperature", config.TEMPERATURE),
+            max_tokens=model_config.get("max_tokens"),
+            keep_alive=model_config.get("keep_alive", config.OLLAMA_KEEP_ALIVE)
+        )
+    raise ValueError(f"不支持的模型类型: {model_type}")
@@ -0,0 +1,148 @@
+import json
+import os
+import tempfile
+import threading
+from datetime import date
+from typing import Dict, List, Optional
+
+from utils.compression import EXTENSIONS, compress, decompress, resolve_codec
+
+ARCHIVE_VERSION = 1
+
+
+class MessageArchive:
+    """历史消息的压缩归档（冷数据）
+
+    每个月一个归档文件 YYYY-MM.jsonl<扩展名>，每天的消息（JSONL，一行一条）压缩为一个独立的帧追加到月文件末尾。
+    index.json 记录每天的各个片段在月文件中的偏移、长度、条数、第一条和最后一条的时间以及最早和最晚的时间，
+    读取一天时只需要定位并解压这一天的片段。同一天可以有多个片段（归档后又写入了这一天的消息），按顺序拼接。
+    """
+
+    def __init__(self, archive_dir: str, compression: str = "gzip"):
+        self.archive_dir = archive_dir
+        self.path = os.path.join(archive_dir, "index.json")
+        self.compression = resolve_codec(compression, "归档消息")
+        self._lock = threading.RLock()
+        self._data: Optional[Dict] = None
+        self._loaded_mtime: Optional[int] = None
+
+    def _load(self) -> Dict:
+        """读取索引，其他进程更新过时重新读取"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if self._data is None or mtime != self._loaded_mtime:
+            data = None
+            if mtime is not None:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except (OSError, json.JSONDecodeError) as e:
+                    print(f"[archive] 无法读取归档索引 {self.path}: {e}")
+            if not data or data.get("version") != ARCHIVE_VERSION:
+                data = {"version": ARCHIVE_VERSION, "days": {}}
+            self._data = data
+            self._loaded_mtime = mtime
+        return self._data
+
+    def _save(self):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.archive_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._loaded_mtime = os.stat(self.path).st_mtime_ns
+
+    def days(self, start: date = None, end: date = None) -> List[date]:
+        """已归档的日期（升序），可以限定范围（包含两端）"""
+        with self._lock:
+            names = sorted(self._load()["days"])
+        days = [date.fromisoformat(name) for name in names]
+        return [day for day in days if (start is None or day >= start) and (end is None or day <= end)]
+
+    def entry(self, day: date) -> Optional[Dict]:
+        """一天的归档信息（各片段合计的条数、第一条和最后一条的时间、最早和最晚的时间、片段列表），没有归档时返回 None
+
+        早期的片段没有记录 min、max，这时两者为 None，表示时间范围未知。
+        """
+        with self._lock:
+            segments = self._load()["days"].get(day.isoformat())
+        if not segments:
+            return None
+        timed = [segment for segment in segments if segment["count"]]
+        known = timed and all(segment.get("min") for segment in timed)
+        return {
+            "count": sum(segment["count"] for segment in segments),
+            "first": segments[0]["first"],
+            "last": segments[-1]["last"],
+            "min": min(segment["min"] for segment in timed) if known else None,
+            "max": max(segment["max"] for segment in timed) if known else None,
+            "segments": segments,
+        }
+
+    def read_records(self, day: date) -> List[Dict]:
+        """解压并读取一天的全部归档消息"""
+        entry = self.entry(day)
+        if entry is None:
+            return []
+        records = []
+        for segment in entry["segments"]:
+            with open(os.path.join(self.archive_dir, segment["file"]), "rb") as f:
+                f.seek(segment["offset"])
+                payload = f.read(segment["length"])
+            text = decompress(payload, segment["codec"]).decode("utf-8")
+            records.extend(json.loads(line) for line in text.splitlines() if line)
+        return records
+
+    def archive_day(self, day: date, records: List[Dict], source: List[int] = None) -> Dict:
+        """把一天的消息压缩后追加到所在月份的归档文件
+
+        Args:
+            day: 日期
+            records: 消息记录
+            source: 归档时日文件的大小和修改时间，用于识别归档后没有删除成功的日文件
+
+        Returns:
+            Dict: 新增的片段
+        """
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+        payload = compress(data, self.compression)
+        name = f"{day.strftime('%Y-%m')}.jsonl{EXTENSIONS[self.compression]}"
+        path = os.path.join(self.archive_dir, name)
+
+        with self._lock:
+            os.makedirs(self.archive_dir, exist_ok=True)
+            # 先写数据再更新索引，中途失败时月文件末尾只会多出没有被索引引用的字节
+            with open(path, "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            # 读回校验，确认写入的内容可以完整解压后才记入索引
+            with open(path, "rb") as f:
+                f.seek(offset)
+                if decompress(f.read(len(payload)), self.compression) != data:
+                    raise IOError(f"归档校验失败: {path}")
+            segment = {
+                "file": name,
+                "offset": offset,
+                "length": len(payload),
+                "codec": self.compression,
+                "count": len(records),
+                "first": records[0]["timestamp"] if records else None,
+                "last": records[-1]["timestamp"] if records else None,
+                "min": min(record["timestamp"] for record in records) if records else None,
+                "max": max(record["timestamp"] for record in records) if records else None,
+                "source": source,
+            }
+            self._load()["days"].setdefault(day.isoformat(), []).append(segment)
+            self._save()
+        return segment
+
+    def size(self) -> int:
+        """归档文件的总字节数"""
+        if not os.path.isdir(self.archive_dir):
+            return 0
+        return sum(os.path.getsize(os.path.join(self.archive_dir, name))
+                   for name in os.listdir(self.archive_dir) if ".jsonl" in name)
@@ -0,0 +1,268 @@
+import json
+import os
+import tempfile
+import threading
+from array import array
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, List, Optional
+
+from utils.file_lock import file_lock
+
+MANIFEST_VERSION = 2
+
+
+def _day_name(day: date) -> str:
+    return day.strftime("%Y-%m-%d")
+
+
+def encode_record(record: Dict) -> bytes:
+    """按 json.dump(indent=2) 写列表时单个元素的格式编码，追加写入后文件与整体重写完全一致"""
+    return ("  " + json.dumps(record, ensure_ascii=False, indent=2).replace("\n", "\n  ")).encode("utf-8")
+
+
+def scan_offsets(data: bytes) -> List[int]:
+    """解析 JSON 数组文件，返回每个元素开始位置的字节偏移（兼容任意缩进格式）"""
+    text = data.decode("utf-8")
+    decoder = json.JSONDecoder()
+    offsets = []
+    index = text.index("[") + 1
+    byte_pos = len(text[:index].encode("utf-8"))
+    while True:
+        start = index
+        while index < len(text) and text[index] in " \t\r\n,":
+            index += 1
+        if index >= len(text) or text[index] == "]":
+            break
+        byte_pos += len(text[start:index].encode("utf-8"))
+        offsets.append(byte_pos)
+        _, end = decoder.raw_decode(text, index)
+        byte_pos += len(text[index:end].encode("utf-8"))
+        index = end
+    return offsets
+
+
+class MessageManifest:
+    """消息日文件的清单
+
+    manifest.json 记录每个有数据的日期的消息条数、第一条和最后一条的时间、最早和最晚的时间（min、max，
+    日文件不一定按时间顺序写入，例如补录的消息或并发写入），以及文件大小和修改时间；
+    offsets/YYYY-MM-DD.idx 按顺序保存每条消息在日文件中的字节偏移（8 字节整数，只追加）。
+    范围查询只读取清单中存在的日期，分页时可以直接定位到需要的消息。
+    日文件被外部修改（大小或修改时间与清单不一致）时自动重建该日的记录，
+    消息目录的修改时间变化时重新扫描目录，发现新增或删除的日文件。
+
+    多个会话、多个进程共用一个消息目录时，写入方（StorageService.save_message）持有 lock_path 的独占锁，
+    读取清单时只加共享锁，读取之间互不阻塞，只会等待正在进行的写入完成。
+    """
+
+    def __init__(self, messages_dir: str, index_dir: str):
+        self.messages_dir = messages_dir
+        self.index_dir = index_dir
+        self.path = os.path.join(index_dir, "manifest.json")
+        self.offsets_dir = os.path.join(index_dir, "offsets")
+        self.lock_path = os.path.join(index_dir, "messages.lock")
+        self._lock = threading.RLock()
+        self._data: Optional[Dict] = None
+        self._loaded_mtime: Optional[int] = None
+
+    def _file_path(self, day: date) -> str:
+        return os.path.join(self.messages_dir, f"{_day_name(day)}.json")
+
+    def _offsets_path(self, day: date) -> str:
+        return os.path.join(self.offsets_dir, f"{_day_name(day)}.idx")
+
+    @contextmanager
+    def _locked(self, shared: bool = True):
+        # 先加文件锁再加线程锁，和写入方的加锁顺序一致
+        with file_lock(self.lock_path, shared=shared), self._lock:
+            yield
+
+    def _save(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.index_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._loaded_mtime = os.stat(self.path).st_mtime_ns
+
+    def _load(self) -> Dict:
+        """读取清单（其他进程更新过时重新读取），并在消息目录有变化时同步日文件列表"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if self._data is None or mtime != self._loaded_mtime:
+            data = None
+            if mtime is not None:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    data = None
+            if not data or data.get("version") != MANIFEST_VERSION:
+                data = {"version": MANIFEST_VERSION, "dir_mtime_ns": None, "days": {}}
+            self._data = data
+            self._loaded_mtime = mtime
+
+        dir_mtime = os.stat(self.messages_dir).st_mtime_ns
+        if self._data["dir_mtime_ns"] != dir_mtime:
+            self._sync_directory(dir_mtime)
+        return self._data
+
+    def _sync_directory(self, dir_mtime: int):
+        names = set()
+        for name in os.listdir(self.messages_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                date.fromisoformat(name[:-5])
+            except ValueError:
+                continue
+            names.add(name[:-5])
+        days = self._data["days"]
+        for name in set(days) - names:
+            days.pop(name)
+            try:
+                os.remove(self._offsets_path(date.fromisoformat(name)))
+            except FileNotFoundError:
+                pass
+        for name in sorted(names - set(days)):
+            self._rebuild(date.fromisoformat(name))
+        self._data["dir_mtime_ns"] = dir_mtime
+        self._save()
+
+    def _rebuild(self, day: date) -> Optional[Dict]:
+        """扫描日文件，重建该日的清单记录和偏移索引"""
+        path = self._file_path(day)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            stat = os.stat(path)
+            offsets = scan_offsets(data)
+            records = json.loads(data) if offsets else []
+        except (OSError, ValueError) as e:
+            print(f"[manifest] 无法读取 {path}: {e}")
+            self._data["days"].pop(_day_name(day), None)
+            return None
+
+        os.makedirs(self.offsets_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.offsets_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            array("Q", offsets).tofile(f)
+        os.replace(tmp_path, self._offsets_path(day))
+        entry = {
+            "count": len(records),
+            "first": records[0]["timestamp"] if records else None,
+            "last": records[-1]["timestamp"] if records else None,
+            "min": min(record["timestamp"] for record in records) if records else None,
+            "max": max(record["timestamp"] for record in records) if records else None,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+        self._data["days"][_day_name(day)] = entry
+        return entry
+
+    def entry(self, day: date) -> Optional[Dict]:
+        """获取一天的清单记录，日文件有变化时先重建；没有数据时返回 None"""
+        with self._locked():
+            data = self._load()
+            entry = data["days"].get(_day_name(day))
+            if entry is None:
+                return None
+            try:
+                stat = os.stat(self._file_path(day))
+            except FileNotFoundError:
+                data["days"].pop(_day_name(day))
+                self._save()
+                return None
+            if (stat.st_size, stat.st_mtime_ns) != (entry["size"], entry["mtime_ns"]):
+                entry = self._rebuild(day)
+                self._save()
+            return entry
+
+    def days(self, start: date = None, end: date = None) -> List[date]:
+        """有数据的日期（升序），可以限定范围（包含两端）"""
+        with self._locked():
+            names = sorted(self._load()["days"])
+        days = [date.fromisoformat(name) for name in names]
+        return [day for day in days if (start is None or day >= start) and (end is None or day <= end)]
+
+    def offsets(self, day: date) -> array:
+        offsets = array("Q")
+        with open(self._offsets_path(day), "rb") as f:
+            offsets.frombytes(f.read())
+        return offsets
+
+    def read_records(self, day: date, start: int = 0, end: int = None) -> List[Dict]:
+        """只读取一天中第 start 到 end（不含）条消息"""
+        with self._locked():
+            entry = self.entry(day)
+            if entry is None:
+                return []
+            count = entry["count"]
+            end = count if end is None else min(end, count)
+            if start >= end:
+                return []
+            try:
+                offsets = self.offsets(day)
+            except FileNotFoundError:
+                offsets = array("Q")
+            if len(offsets) != count:
+                entry = self._rebuild(day)
+                self._save()
+                if entry is None:
+                    return []
+                offsets = self.offsets(day)
+                end = min(end, entry["count"])
+                if start >= end:
+                    return []
+            with open(self._file_path(day), "rb") as f:
+                f.seek(offsets[start])
+                stop = offsets[end] if end < len(offsets) else entry["size"]
+                chunk = f.read(stop - offsets[start]).decode("utf-8").rstrip()
+        if chunk.endswith((",", "]")):
+            chunk = chunk[:-1]
+        return json.loads("[" + chunk + "]")
+
+    def forget(self, day: date):
+        """日文件移走（归档）后删除该日的清单记录和偏移索引"""
+        with self._locked(shared=False):
+            data = self._load()
+            data["days"].pop(_day_name(day), None)
+            try:
+                os.remove(self._offsets_path(day))
+            except FileNotFoundError:
+                pass
+            self._save()
+
+    def record_append(self, day: date, record: Dict, offset: Optional[int], previous_size: int):
+        """save_message 写入一条消息后更新清单
+
+        Args:
+            day: 消息所在日期
+            record: 写入的消息
+            offset: 消息在日文件中的字节偏移，整体重写文件时为 None
+            previous_size: 写入前日文件的大小，与清单不一致时说明有其他写入，重建该日记录
+        """
+        with self._locked(shared=False):
+            data = self._load()
+            entry = data["days"].get(_day_name(day))
+            stat = os.stat(self._file_path(day))
+            if entry is not None and (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+                return  # 重新扫描目录时已经包含了这条消息
+            if entry is None or offset is None or entry["size"] != previous_size:
+                self._rebuild(day)
+            else:
+                os.makedirs(self.offsets_dir, exist_ok=True)
+                with open(self._offsets_path(day), "ab") as f:
+                    array("Q", [offset]).tofile(f)
+                entry["count"] += 1
+                entry["first"] = entry["first"] or record["timestamp"]
+                entry["last"] = record["timestamp"]
+                entry["min"] = min(entry["min"] or record["timestamp"], record["timestamp"])
+                entry["max"] = max(entry["max"] or record["timestamp"], record["timestamp"])
+                entry["size"] = stat.st_size
+                entry["mtime_ns"] = stat.st_mtime_ns
+            data["dir_mtime_ns"] = os.stat(self.messages_dir).st_mtime_ns
+            self._save()
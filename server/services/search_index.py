@@ -0,0 +1,248 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from ..models.message import Message
+
+# 中日文字符按二元组切分，其余按单词切分（小写）
+_TOKEN_RE = re.compile("[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[A-Za-z0-9_]+")
+_CJK_RE = re.compile("[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+
+
+def tokenize(text: str, query: bool = False) -> List[str]:
+    """切分为词项：连续的汉字切成相邻二元组
+
+    建立索引时在每段汉字末尾再加上最后一个字，使每个字都是某个词项的开头，
+    单字查询可以用前缀匹配找到；查询时不加，保证二元组在短语中相邻。
+    """
+    tokens = []
+    for run in _TOKEN_RE.findall(text or ""):
+        if _CJK_RE.match(run):
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            if not query or len(run) == 1:
+                tokens.append(run[-1])
+        else:
+            tokens.append(run.lower())
+    return tokens
+
+
+def build_match_query(query: str, columns: Iterable[str]) -> Optional[str]:
+    """把用户输入转换为 FTS5 查询
+
+    空白分隔的每一段作为一个短语（二元组按顺序相邻），多段之间为 AND；
+    只有一个汉字的段使用前缀匹配。
+    """
+    phrases = []
+    for part in query.split():
+        tokens = tokenize(part, query=True)
+        if not tokens:
+            continue
+        if len(tokens) == 1 and len(tokens[0]) == 1 and _CJK_RE.match(tokens[0]):
+            phrase = f'"{tokens[0]}"*'
+        else:
+            phrase = '"' + " ".join(tokens) + '"'
+        phrases.append(phrase)
+    if not phrases:
+        return None
+    column_filter = "{" + " ".join(columns) + "}"
+    return " AND ".join(f"{column_filter} : {phrase}" for phrase in phrases)
+
+
+class MessageSearchIndex:
+    """消息全文索引（SQLite FTS5）
+
+    消息原文保存在 messages 表，FTS 表只保存切分后的词项（contentless），
+    按 (timestamp, sender) 去重，因此写入时增量添加和从日文件补建可以重复执行。
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY,
+                    timestamp TEXT NOT NULL,
+                    sender TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    thought_process TEXT,
+                    UNIQUE (timestamp, sender)
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(content, thought, content='');
+                CREATE TABLE IF NOT EXISTS indexed_files (
+                    name TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL
+                );
+            """)
+            self._conn = conn
+        return self._conn
+
+    def _insert(self, conn: sqlite3.Connection, message: Message) -> bool:
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO messages (timestamp, sender, content, thought_process) VALUES (?, ?, ?, ?)",
+            (message.timestamp.isoformat(), message.sender, message.content, message.thought_process)
+        )
+        if not cursor.rowcount:
+            return False
+        conn.execute(
+            "INSERT INTO messages_fts (rowid, content, thought) VALUES (?, ?, ?)",
+            (cursor.lastrowid, " ".join(tokenize(message.content)), " ".join(tokenize(message.thought_process)))
+        )
+        return True
+
+    def add(self, message: Message) -> bool:
+        """添加一条消息，已经存在时返回 False"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return self._insert(conn, message)
+
+    def add_many(self, messages: Iterable[Message]) -> int:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return sum(self._insert(conn, message) for message in messages)
+
+    def sync_directory(self, messages_dir: str, resolve: Callable[[List[dict]], List[dict]] = None) -> int:
+        """把日文件中尚未索引的消息补进索引，只读取修改时间或大小有变化的文件
+
+        Args:
+            messages_dir: 消息目录
+            resolve: 把记录中的思维过程引用替换为原文的函数（StorageService.resolve_thoughts）
+
+        Returns:
+            int: 新增的消息数
+        """
+        if not os.path.isdir(messages_dir):
+            return 0
+
+        def load(path: str) -> Callable[[], List[dict]]:
+            def read() -> List[dict]:
+                with open(path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            return read
+
+        sources = []
+        for name in sorted(os.listdir(messages_dir)):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(messages_dir, name)
+            stat = os.stat(path)
+            sources.append((name, (stat.st_mtime_ns, stat.st_size), load(path)))
+        return self.sync_sources(sources, resolve)
+
+    def sync_sources(self, sources: Iterable[Tuple[str, Tuple[int, int], Callable[[], List[dict]]]],
+                     resolve: Callable[[List[dict]], List[dict]] = None) -> int:
+        """把多组消息记录补进索引，每组的标识与上次索引时相同则跳过
+
+        Args:
+            sources: (名称, 标识, 读取函数) 列表，标识是两个整数（日文件为修改时间和大小）
+            resolve: 把记录中的思维过程引用替换为原文的函数
+
+        Returns:
+            int: 新增的消息数
+        """
+        with self._lock:
+            conn = self._connect()
+            known = {name: (mtime, size) for name, mtime, size in
+                     conn.execute("SELECT name, mtime_ns, size FROM indexed_files")}
+
+        added = 0
+        for name, signature, load in sources:
+            if known.get(name) == tuple(signature):
+                continue
+            try:
+                records = load()
+            except (OSError, ValueError) as e:
+                print(f"[search] 跳过无法读取的数据 {name}: {e}")
+                continue
+
+            if resolve:
+                records = resolve(records)
+            messages = [Message.from_dict(record) for record in records]
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    added += sum(self._insert(conn, message) for message in messages)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO indexed_files (name, mtime_ns, size) VALUES (?, ?, ?)",
+                        (name, *signature)
+                    )
+        if added:
+            print(f"[search] 已索引 {added} 条消息")
+        return added
+
+    def search(self, query: str, limit: int = 50, sender: str = None,
+               start_date: datetime = None, end_date: datetime = None,
+               include_thoughts: bool = True) -> List[Message]:
+        """全文搜索，按相关度排序
+
+        Args:
+            query: 搜索内容，空白分隔的多个词需要同时出现
+            limit: 最多返回的条数
+            sender: 只搜索该发送者的消息
+            start_date: 开始时间（包含）
+            end_date: 结束时间（包含）
+            include_thoughts: 是否同时搜索思维过程
+
+        Returns:
+            List[Message]: 匹配的消息
+        """
+        match = build_match_query(query, ("content", "thought") if include_thoughts else ("content",))
+        if match is None:
+            return []
+
+        sql = ["SELECT m.timestamp, m.sender, m.content, m.thought_process",
+               "FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid",
+               "WHERE messages_fts MATCH ?"]
+        params: list = [match]
+        if sender:
+            sql.append("AND m.sender = ?")
+            params.append(sender)
+        if start_date:
+            sql.append("AND m.timestamp >= ?")
+            params.append(start_date.isoformat())
+        if end_date:
+            sql.append("AND m.timestamp <= ?")
+            params.append(end_date.isoformat())
+        sql.append("ORDER BY bm25(messages_fts) LIMIT ?")
+        params.append(limit)
+
+        with self._lock:
+            rows = self._connect().execute(" ".join(sql), params).fetchall()
+        return [
+            Message(timestamp=datetime.fromisoformat(timestamp), sender=sender, content=content,
+                    thought_process=thought_process)
+            for timestamp, sender, content, thought_process in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def highlight(text: str, query: str, width: int = 40) -> str:
+    """截取 text 中第一个命中位置附近的片段，命中部分用 ** 包围（Markdown 加粗）"""
+    text = text or ""
+    for part in query.split():
+        index = text.lower().find(part.lower())
+        if index < 0:
+            continue
+        start = max(0, index - width)
+        end = min(len(text), index + len(part) + width)
+        return (("…" if start > 0 else "") + text[start:index] + f"**{text[index:index + len(part)]}**"
+                + text[index + len(part):end] + ("…" if end < len(text) else ""))
+    return text[:width * 2] + ("…" if len(text) > width * 2 else "")
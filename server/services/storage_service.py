@@ -1,14 +1,38 @@
 import json
 import os
-from datetime import datetime, timedelta
-from typing import List, Optional
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from ..config.settings import get_config
 from ..models.message import Message
+from .message_archive import MessageArchive
+from .message_manifest import MessageManifest, encode_record
+from .search_index import MessageSearchIndex
+from .thought_store import ThoughtStore
+from utils.file_lock import file_lock
+from utils.telemetry import timed
 
 class StorageService:
-    def __init__(self, messages_dir: str, thought_process_dir: str):
+    def __init__(self, messages_dir: str, thought_process_dir: str,
+                 search_index: Optional[MessageSearchIndex] = None):
         self.messages_dir = messages_dir
         self.thought_process_dir = thought_process_dir
         self._ensure_directories()
+        # 索引文件（日文件清单、全文索引）保存在消息目录旁的 index 目录，压缩归档保存在 archive 目录
+        data_dir = os.path.dirname(os.path.abspath(messages_dir))
+        self.index_dir = os.path.join(data_dir, "index")
+        self.manifest = MessageManifest(messages_dir, self.index_dir)
+        self.archive = MessageArchive(os.path.join(data_dir, "archive"), get_config().ARCHIVE_COMPRESSION)
+        self.thoughts = ThoughtStore(thought_process_dir, get_config().THOUGHT_COMPRESSION)
+        self.search_index = search_index or self._default_search_index()
+        self._search_synced = False
+
+    def _default_search_index(self) -> Optional[MessageSearchIndex]:
+        if not get_config().SEARCH_INDEX_ENABLED:
+            return None
+        return MessageSearchIndex(os.path.join(self.index_dir, "messages.sqlite"))
 
     def _ensure_directories(self):
         """确保必要的目录存在"""
@@ -20,34 +44,129 @@ class StorageService:
         directory = self.thought_process_dir if is_thought_process else self.messages_dir
         return os.path.join(directory, f"{date.strftime('%Y-%m-%d')}.json")
 
+    @staticmethod
+    def _append_record(path: str, record: dict) -> Tuple[Optional[int], int]:
+        """在 JSON 数组文件末尾追加一条记录，不读取和重写整个文件
+
+        Returns:
+            Tuple[Optional[int], int]: 记录的字节偏移（文件格式无法原地追加、整体重写时为 None）和追加前的文件大小
+        """
+        item = encode_record(record)
+        try:
+            f = open(path, 'r+b')
+        except FileNotFoundError:
+            with open(path, 'wb') as f:
+                f.write(b"[\n" + item + b"\n]")
+            return 2, 0
+
+        with f:
+            size = f.seek(0, os.SEEK_END)
+            tail_start = max(0, size - 64)
+            f.seek(tail_start)
+            body = f.read().rstrip()
+            if body.endswith(b"]"):
+                body = body[:-1].rstrip()
+                if body.endswith((b"}", b"[")):
+                    insert_at = tail_start + len(body)
+                    prefix = b"\n" if body.endswith(b"[") else b",\n"
+                    f.seek(insert_at)
+                    f.write(prefix + item + b"\n]")
+                    f.truncate()
+                    return insert_at + len(prefix), size
+
+        # 不是预期的格式，按原来的方式整体重写
+        with open(path, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        records.append(record)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+        return None, size
+
+    @timed("storage.save_message")
     def save_message(self, message: Message):
-        """保存消息和思维过程"""
-        # 保存消息
-        message_file = self._get_file_path(message.timestamp)
-        messages = self.get_messages_by_date(message.timestamp.date()) or []
-        messages.append(message.to_dict())
-        
-        with open(message_file, 'w', encoding='utf-8') as f:
-            json.dump(messages, f, ensure_ascii=False, indent=2)
+        """保存消息和思维过程
 
-        # 如果有思维过程，单独保存
+        消息追加到日文件末尾并更新日文件清单；思维过程只在 ThoughtStore 中按内容保存一份（压缩），
+        消息记录中保存它的引用 thought_ref。
+        追加和更新清单在消息目录的独占文件锁中完成，多个会话或进程同时写入同一天时不会丢失消息；
+        读取只加共享锁，只在写入进行时短暂等待。
+        """
+        record = message.to_dict()
         if message.thought_process:
-            thought_file = self._get_file_path(message.timestamp, True)
-            thoughts = self.get_thoughts_by_date(message.timestamp.date()) or []
-            thoughts.append(message.to_dict())
-            
-            with open(thought_file, 'w', encoding='utf-8') as f:
-                json.dump(thoughts, f, ensure_ascii=False, indent=2)
+            record['thought_process'] = None
+            record['thought_ref'] = self.thoughts.put(message.thought_process)
+        with file_lock(self.manifest.lock_path):
+            offset, previous_size = self._append_record(self._get_file_path(message.timestamp), record)
+            self.manifest.record_append(message.timestamp.date(), record, offset, previous_size)
+
+        if self.search_index:
+            try:
+                self.search_index.add(message)
+            except sqlite3.Error as e:
+                # 索引只用于搜索，失败时不影响消息保存，下次搜索前会从日文件补建
+                print(f"[search] 索引消息失败: {e}")
+
+    def _hot_entry(self, day: date) -> Optional[Dict]:
+        """日文件的清单记录；没有消息，或者是已经归档、但没有删除成功的日文件时返回 None"""
+        entry = self.manifest.entry(day)
+        if not entry or not entry["count"]:
+            return None
+        cold = self.archive.entry(day)
+        if cold and [entry["size"], entry["mtime_ns"]] in [segment["source"] for segment in cold["segments"]]:
+            return None
+        return entry
+
+    def message_days(self, start: date = None, end: date = None) -> List[date]:
+        """有消息的日期（日文件和归档合并，升序），可以限定范围（包含两端）"""
+        return sorted(set(self.manifest.days(start, end)) | set(self.archive.days(start, end)))
+
+    def day_info(self, day: date) -> Optional[Dict]:
+        """一天的消息条数、第一条和最后一条的时间、最早和最晚的时间，没有消息时返回 None
+
+        source 由日文件的大小、修改时间和归档数据的长度组成，任何一部分变化时都会改变，可以作为缓存的标识。
+        """
+        # 共享锁保证读到的日文件和归档是同一时刻的状态（不会遇到正在归档的日期）
+        with file_lock(self.manifest.lock_path, shared=True):
+            hot = self._hot_entry(day)
+            cold = self.archive.entry(day)
+        parts = [part for part in (cold, hot) if part]
+        if not parts:
+            return None
+        return {
+            "count": sum(part["count"] for part in parts),
+            "first": parts[0]["first"],
+            "last": parts[-1]["last"],
+            # 日文件不一定按时间顺序写入，时间范围用 min、max 判断；有一部分未知时为 None
+            "min": min(part["min"] for part in parts) if all(part["min"] for part in parts) else None,
+            "max": max(part["max"] for part in parts) if all(part["max"] for part in parts) else None,
+            "source": [
+                hot["size"] if hot else 0,
+                hot["mtime_ns"] if hot else 0,
+                sum(segment["length"] for segment in cold["segments"]) if cold else 0,
+            ],
+        }
+
+    def read_day(self, day: date, start: int = 0, end: int = None) -> List[dict]:
+        """读取一天中第 start 到 end（不含）条消息，先是归档中的消息，然后是日文件中的消息"""
+        with file_lock(self.manifest.lock_path, shared=True):
+            cold = self.archive.entry(day)
+            cold_count = cold["count"] if cold else 0
+            records = []
+            if start < cold_count and (end is None or end > start):
+                records = self.archive.read_records(day)[start:cold_count if end is None else min(end, cold_count)]
+            if (end is None or end > cold_count) and self._hot_entry(day):
+                records.extend(self.manifest.read_records(
+                    day, max(0, start - cold_count), None if end is None else end - cold_count
+                ))
+        return records
 
     def get_messages_by_date(self, date: datetime.date) -> Optional[List[dict]]:
         """获取指定日期的消息"""
-        file_path = self._get_file_path(datetime.combine(date, datetime.min.time()))
-        if not os.path.exists(file_path):
+        if self.day_info(date) is None:
             return None
-            
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return self.read_day(date)
 
+    @timed("storage.get_messages_in_range")
     def get_messages_in_range(self, start_date: datetime, end_date: datetime) -> List[Message]:
         """获取指定日期范围内的所有消息
         
@@ -59,30 +178,43 @@ class StorageService:
             List[Message]: 消息列表
         """
         messages = []
-        current_date = start_date.date()
-        
-        while current_date <= end_date.date():
-            daily_messages = self.get_messages_by_date(current_date)
-            if daily_messages:
-                for msg_dict in daily_messages:
-                    # 转换时间戳字符串为 datetime 对象
-                    msg_dict['timestamp'] = datetime.fromisoformat(msg_dict['timestamp'])
-                    msg = Message.from_dict(msg_dict)
-                    # 只添加在时间范围内的消息
-                    if start_date <= msg.timestamp <= end_date:
-                        messages.append(msg)
-            current_date += timedelta(days=1)
+        for day in self.message_days(start_date.date(), end_date.date()):
+            info = self.day_info(day)
+            # 清单和归档索引中记录了每天最早和最晚的消息时间，完全在范围外的日期不需要读取；时间范围未知时照常读取
+            if not info:
+                continue
+            if info["max"] and (info["max"] < start_date.isoformat() or info["min"] > end_date.isoformat()):
+                continue
+            for msg_dict in self.read_day(day):
+                # 转换时间戳字符串为 datetime 对象
+                msg_dict['timestamp'] = datetime.fromisoformat(msg_dict['timestamp'])
+                msg = Message.from_dict(msg_dict)
+                # 只添加在时间范围内的消息
+                if start_date <= msg.timestamp <= end_date:
+                    messages.append(msg)
             
         return messages
 
+    def load_thought(self, ref: str) -> Optional[str]:
+        """按引用读取思维过程"""
+        return self.thoughts.get(ref)
+
+    def resolve_thoughts(self, records: List[dict]) -> List[dict]:
+        """把消息记录中的思维过程引用替换为原文（原地修改），用于需要全部思维过程的批量分析"""
+        for record in records:
+            if not record.get('thought_process') and record.get('thought_ref'):
+                record['thought_process'] = self.thoughts.get(record['thought_ref'])
+        return records
+
     def get_thoughts_by_date(self, date: datetime.date) -> Optional[List[dict]]:
-        """获取指定日期的思维过程"""
-        file_path = self._get_file_path(datetime.combine(date, datetime.min.time()), True)
-        if not os.path.exists(file_path):
+        """获取指定日期带有思维过程的消息
+
+        思维过程不再单独写入 thought_process 目录的日文件，而是从消息记录中读取（引用或旧数据中的原文）。
+        """
+        messages = self.get_messages_by_date(date)
+        if messages is None:
             return None
-            
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return self.resolve_thoughts([m for m in messages if m.get('thought_process') or m.get('thought_ref')])
 
     def get_recent_messages(self, days: int = 7) -> List[Message]:
         """获取最近几天的消息"""
@@ -90,11 +222,148 @@ class StorageService:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
-        current_date = start_date
-        while current_date <= end_date:
-            day_messages = self.get_messages_by_date(current_date.date())
-            if day_messages:
-                messages.extend([Message.from_dict(msg) for msg in day_messages])
-            current_date += timedelta(days=1)
+        for day in self.message_days(start_date.date(), end_date.date()):
+            messages.extend([Message.from_dict(msg) for msg in self.read_day(day)])
         
-        return sorted(messages, key=lambda x: x.timestamp) 
\ No newline at end of file
+        return sorted(messages, key=lambda x: x.timestamp)
+
+    @timed("storage.get_messages_page")
+    def get_messages_page(self, cursor: str = None, limit: int = 50,
+                          end_date: date = None) -> Tuple[List[Message], Optional[str]]:
+        """按时间倒序分页读取消息，一页可以跨越多天
+
+        游标格式为 "YYYY-MM-DD:序号"，表示下一页从该日文件的这个序号之前开始。
+        日文件只追加写入，已有消息的序号不会变化，所以旧游标在有新消息后仍然有效。
+
+        Args:
+            cursor: 上一页返回的游标，None 表示从 end_date 的最后一条消息开始
+            limit: 每页条数
+            end_date: 没有游标时从这一天（包含）往前读取，默认从有数据的最新一天开始
+
+        Returns:
+            Tuple[List[Message], Optional[str]]: 本页消息（新的在前）和下一页游标，没有更早的消息时游标为 None
+        """
+        position = None
+        if cursor:
+            day_text, _, index = cursor.partition(":")
+            end_date, position = date.fromisoformat(day_text), int(index)
+
+        days = list(reversed(self.message_days(end=end_date)))
+        page: List[Message] = []
+        for i, day in enumerate(days):
+            # 通过清单中的条数和偏移只读取本页需要的消息（归档的日期解压这一天的片段）
+            info = self.day_info(day)
+            count = info["count"] if info else 0
+            end = count if position is None or day != end_date else min(position, count)
+            start = max(0, end - (limit - len(page)))
+            records = self.read_day(day, start, end)
+            page.extend(Message.from_dict(record) for record in reversed(records))
+            if len(page) >= limit:
+                has_more = start > 0 or i + 1 < len(days)
+                return page, f"{day.isoformat()}:{start}" if has_more else None
+        return page, None
+
+    def search_messages(self, query: str, limit: int = 50, sender: str = None,
+                        start_date: datetime = None, end_date: datetime = None,
+                        include_thoughts: bool = True) -> List[Message]:
+        """全文搜索消息内容和思维过程
+
+        第一次搜索前把日文件中尚未索引的消息补进索引（只读取有变化的文件）。
+        参数说明见 MessageSearchIndex.search。
+        """
+        if not self.search_index:
+            return []
+        if not self._search_synced:
+            self.search_index.sync_directory(self.messages_dir, resolve=self.resolve_thoughts)
+            self.search_index.sync_sources(self._archive_sources(), resolve=self.resolve_thoughts)
+            self._search_synced = True
+        return self.search_index.search(query, limit, sender, start_date, end_date, include_thoughts)
+
+    def _archive_sources(self) -> List[Tuple[str, Tuple[int, int], Callable[[], List[dict]]]]:
+        """归档中每天的消息，作为全文索引的数据来源（标识为片段数和压缩后的总长度）"""
+        sources = []
+        for day in self.archive.days():
+            segments = self.archive.entry(day)["segments"]
+            signature = (len(segments), sum(segment["length"] for segment in segments))
+            sources.append((f"archive/{day.isoformat()}", signature, lambda day=day: self.archive.read_records(day)))
+        return sources
+
+    @timed("storage.compact")
+    def compact(self, older_than_days: int, today: date = None) -> Dict[str, int]:
+        """把 older_than_days 天之前的日文件移入按月压缩的归档，读取接口对两部分数据透明
+
+        每天的消息写入归档并校验后才删除日文件；思维过程已经单独压缩保存，不需要移动。
+
+        Args:
+            older_than_days: 保留最近多少天的日文件
+            today: 计算天数的基准日期，默认今天
+
+        Returns:
+            Dict[str, int]: 归档的天数、消息数，以及日文件和压缩后数据的字节数
+        """
+        cutoff = (today or date.today()) - timedelta(days=older_than_days)
+        stats = {"days": 0, "messages": 0, "hot_bytes": 0, "archived_bytes": 0}
+        for day in self.manifest.days(end=cutoff - timedelta(days=1)):
+            # 每天单独加写锁，归档期间其他会话仍然可以保存消息
+            with file_lock(self.manifest.lock_path):
+                entry = self.manifest.entry(day)
+                if entry is None:
+                    continue
+                hot = self._hot_entry(day)
+                # 没有消息的日文件和已经归档过的日文件（上次删除失败）直接删除
+                if hot:
+                    segment = self.archive.archive_day(
+                        day, self.manifest.read_records(day), source=[hot["size"], hot["mtime_ns"]]
+                    )
+                    stats["days"] += 1
+                    stats["messages"] += segment["count"]
+                    stats["hot_bytes"] += hot["size"]
+                    stats["archived_bytes"] += segment["length"]
+                try:
+                    os.remove(self._get_file_path(datetime.combine(day, datetime.min.time())))
+                except FileNotFoundError:
+                    pass
+                self.manifest.forget(day)
+        if stats["days"]:
+            print(f"[archive] 已归档 {stats['days']} 天 {stats['messages']} 条消息，"
+                  f"{stats['hot_bytes']} 字节压缩为 {stats['archived_bytes']} 字节")
+        return stats
+
+
+_compaction_started = set()
+_compaction_lock = threading.Lock()
+
+
+def start_background_compaction(storage: StorageService, older_than_days: int = None,
+                                interval_hours: float = None) -> bool:
+    """在后台线程中定期归档旧的日文件，同一个消息目录在一个进程中只启动一次
+
+    Args:
+        storage: 存储服务
+        older_than_days: 保留最近多少天的日文件，默认使用 ARCHIVE_AFTER_DAYS，为 0 时不启动
+        interval_hours: 两次归档的间隔，默认使用 ARCHIVE_INTERVAL_HOURS
+
+    Returns:
+        bool: 是否新启动了后台线程
+    """
+    config = get_config()
+    older_than_days = config.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    interval_hours = config.ARCHIVE_INTERVAL_HOURS if interval_hours is None else interval_hours
+    if older_than_days <= 0:
+        return False
+    key = os.path.abspath(storage.messages_dir)
+    with _compaction_lock:
+        if key in _compaction_started:
+            return False
+        _compaction_started.add(key)
+
+    def run():
+        while True:
+            try:
+                storage.compact(older_than_days)
+            except Exception as e:
+                print(f"[archive] 归档失败: {e}")
+            time.sleep(max(interval_hours, 0.01) * 3600)
+
+    threading.Thread(target=run, name="message-compaction", daemon=True).start()
+    return True
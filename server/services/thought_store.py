@@ -0,0 +1,83 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from utils.compression import EXTENSIONS, compress, decompress, resolve_codec
+
+# 压缩方式对应的文件扩展名，读取时按顺序查找
+_EXTENSIONS = {codec: ".txt" + ext for codec, ext in EXTENSIONS.items()}
+
+
+class ThoughtStore:
+    """按内容寻址保存思维过程
+
+    每段思维过程按 SHA-256 保存为一个文件（<目录>/blobs/<前两位>/<哈希><扩展名>），
+    消息中只保存引用 "sha256:<哈希>"，相同内容只保存一次。可以选择 gzip 或 zstd 压缩，
+    zstd 需要安装 zstandard，未安装时使用 gzip。
+    """
+
+    PREFIX = "sha256:"
+
+    def __init__(self, directory: str, compression: str = "gzip", cache_size: int = 128):
+        self.directory = os.path.join(directory, "blobs")
+        self.compression = resolve_codec(compression, "思维过程")
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    @classmethod
+    def is_ref(cls, value: Optional[str]) -> bool:
+        return bool(value) and value.startswith(cls.PREFIX)
+
+    def _base_path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _remember(self, ref: str, text: str):
+        with self._lock:
+            self._cache[ref] = text
+            self._cache.move_to_end(ref)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def put(self, text: str) -> str:
+        """保存思维过程，返回引用；内容已经存在时不重复写入"""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        ref = self.PREFIX + digest
+        base = self._base_path(digest)
+        if any(os.path.exists(base + ext) for ext in _EXTENSIONS.values()):
+            return ref
+
+        payload = compress(data, self.compression)
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        # 先写临时文件再改名，并发写入同一内容时结果相同，不会出现写了一半的文件
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(base), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, base + _EXTENSIONS[self.compression])
+        self._remember(ref, text)
+        return ref
+
+    def get(self, ref: str) -> Optional[str]:
+        """按引用读取思维过程，找不到时返回 None"""
+        if not self.is_ref(ref):
+            return None
+        with self._lock:
+            if ref in self._cache:
+                self._cache.move_to_end(ref)
+                return self._cache[ref]
+
+        base = self._base_path(ref[len(self.PREFIX):])
+        for compression, ext in _EXTENSIONS.items():
+            try:
+                with open(base + ext, "rb") as f:
+                    payload = f.read()
+            except FileNotFoundError:
+                continue
+            text = decompress(payload, compression).decode("utf-8")
+            self._remember(ref, text)
+            return text
+        return None
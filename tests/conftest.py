@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def storage_env(monkeypatch):
+    """关闭全文索引和指标记录，避免测试写入正式数据，结束后恢复配置"""
+    from server.config.settings import reload_config
+
+    monkeypatch.setenv("SEARCH_INDEX_ENABLED", "false")
+    monkeypatch.setenv("TELEMETRY_ENABLED", "false")
+    reload_config()
+    yield
+    monkeypatch.undo()
+    reload_config()
+
+
+@pytest.fixture
+def storage(tmp_path, storage_env):
+    """使用临时目录的 StorageService"""
+    from server.services.storage_service import StorageService
+
+    return StorageService(os.path.join(tmp_path, "messages"), os.path.join(tmp_path, "thought_process"))
@@ -0,0 +1,117 @@
+import os
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from server.models.message import Message
+from server.services import message_archive
+
+TODAY = date(2026, 3, 10)
+OLD_DAYS = [date(2026, 2, 27), date(2026, 2, 28), date(2026, 3, 1)]
+
+
+def save_day(storage, day: date, count: int, prefix: str = "m"):
+    """在一天中保存 count 条消息，每三条中有一条带思维过程"""
+    for i in range(count):
+        storage.save_message(Message(
+            content=f"{prefix}-{day.isoformat()}-{i}",
+            sender="user" if i % 2 else "assistant",
+            timestamp=datetime.combine(day, datetime.min.time()) + timedelta(hours=8, minutes=i),
+            thought_process=f"思考 {i}" if i % 3 == 0 else None,
+        ))
+
+
+def day_file(storage, day: date) -> str:
+    return os.path.join(storage.messages_dir, f"{day.isoformat()}.json")
+
+
+def test_compact_round_trip(storage):
+    """归档后按日期、按序号范围读取的消息与归档前完全一致，思维过程仍然可以读取"""
+    for day in OLD_DAYS + [TODAY]:
+        save_day(storage, day, 5)
+    before = {day: storage.read_day(day) for day in OLD_DAYS}
+
+    stats = storage.compact(3, today=TODAY)
+
+    assert stats["days"] == len(OLD_DAYS)
+    assert stats["messages"] == 5 * len(OLD_DAYS)
+    assert stats["archived_bytes"] > 0
+    assert storage.archive.days() == OLD_DAYS
+    for day in OLD_DAYS:
+        assert not os.path.exists(day_file(storage, day))
+        assert storage.manifest.entry(day) is None
+        assert storage.read_day(day) == before[day]
+        assert storage.read_day(day, 1, 4) == before[day][1:4]
+        assert storage.get_messages_by_date(day) == before[day]
+        assert storage.day_info(day)["count"] == 5
+        thought = [record for record in storage.read_day(day) if record.get("thought_ref")][0]
+        assert storage.load_thought(thought["thought_ref"]) == "思考 0"
+    # 最近的日文件保持不变
+    assert os.path.exists(day_file(storage, TODAY))
+    assert storage.day_info(TODAY)["count"] == 5
+
+    # 再次归档时没有需要处理的日期
+    assert storage.compact(3, today=TODAY)["days"] == 0
+
+
+def test_compact_keeps_day_file_when_verification_fails(storage, monkeypatch):
+    """写入的归档数据读回校验失败时不更新索引，也不删除日文件"""
+    day = OLD_DAYS[0]
+    save_day(storage, day, 4)
+    before = storage.read_day(day)
+    with monkeypatch.context() as patch:
+        patch.setattr(message_archive, "decompress", lambda payload, codec: b"")
+        with pytest.raises(IOError):
+            storage.compact(3, today=TODAY)
+
+    assert os.path.exists(day_file(storage, day))
+    assert storage.archive.days() == []
+    assert storage.read_day(day) == before
+
+    # 校验恢复正常后可以继续归档
+    assert storage.compact(3, today=TODAY)["days"] == 1
+    assert storage.read_day(day) == before
+
+
+def test_compact_removes_day_file_left_after_archiving(storage, monkeypatch):
+    """已经归档、但删除失败的日文件下次归档时直接删除，不会重复归档，读取时也不会重复"""
+    day = OLD_DAYS[0]
+    save_day(storage, day, 4)
+    before = storage.read_day(day)
+
+    def fail_remove(path):
+        raise PermissionError(path)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(os, "remove", fail_remove)
+        with pytest.raises(PermissionError):
+            storage.compact(3, today=TODAY)
+
+    assert os.path.exists(day_file(storage, day))
+    assert storage.read_day(day) == before
+    assert storage.day_info(day)["count"] == 4
+
+    assert storage.compact(3, today=TODAY)["days"] == 0
+    assert not os.path.exists(day_file(storage, day))
+    assert len(storage.archive.entry(day)["segments"]) == 1
+    assert storage.read_day(day) == before
+
+
+def test_message_days_merges_hot_and_cold_days(storage):
+    """归档和日文件中的日期合并去重，同一天先读归档中的消息，再读之后写入日文件的消息"""
+    for day in OLD_DAYS:
+        save_day(storage, day, 3)
+    storage.compact(3, today=TODAY)
+    save_day(storage, OLD_DAYS[1], 2, prefix="late")
+    save_day(storage, TODAY, 2)
+
+    assert storage.message_days() == OLD_DAYS + [TODAY]
+    assert storage.message_days(OLD_DAYS[1], OLD_DAYS[2]) == OLD_DAYS[1:]
+    assert storage.message_days(end=OLD_DAYS[0]) == OLD_DAYS[:1]
+
+    info = storage.day_info(OLD_DAYS[1])
+    assert info["count"] == 5
+    contents = [record["content"] for record in storage.read_day(OLD_DAYS[1])]
+    assert contents == [f"m-{OLD_DAYS[1].isoformat()}-{i}" for i in range(3)] + \
+                      [f"late-{OLD_DAYS[1].isoformat()}-{i}" for i in range(2)]
+    assert [record["content"] for record in storage.read_day(OLD_DAYS[1], 2, 4)] == contents[2:4]
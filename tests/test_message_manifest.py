@@ -0,0 +1,139 @@
+import json
+import os
+from datetime import date, datetime, timedelta
+
+from server.models.message import Message
+from server.services.message_manifest import MessageManifest
+
+DAY = date(2026, 3, 1)
+
+
+def at(day: date, hour: int, minute: int = 0) -> datetime:
+    return datetime.combine(day, datetime.min.time()) + timedelta(hours=hour, minutes=minute)
+
+
+def save(storage, content: str, timestamp: datetime, thought: str = None):
+    storage.save_message(Message(content=content, sender="user", timestamp=timestamp, thought_process=thought))
+
+
+def day_path(storage, day: date) -> str:
+    return os.path.join(storage.messages_dir, f"{day.isoformat()}.json")
+
+
+def load_day(storage, day: date):
+    with open(day_path(storage, day), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_read_records_matches_full_load(storage):
+    """按偏移读取任意范围的消息与整体解析日文件的结果一致"""
+    for i in range(6):
+        save(storage, f"第 {i} 条消息，带有 \"引号\"、逗号, 和 ] 括号", at(DAY, 8, i),
+             thought=f"思考 {i}" if i % 2 else None)
+    records = load_day(storage, DAY)
+
+    assert len(storage.manifest.offsets(DAY)) == len(records) == 6
+    assert storage.manifest.read_records(DAY) == records
+    for start in range(7):
+        for end in range(start, 8):
+            assert storage.manifest.read_records(DAY, start, end) == records[start:end]
+
+
+def test_stale_manifest_rebuilds_after_external_append(storage):
+    """其他程序修改日文件后（大小或修改时间变化），清单和偏移索引自动重建"""
+    for i in range(3):
+        save(storage, f"m{i}", at(DAY, 8, i))
+    assert storage.manifest.entry(DAY)["count"] == 3
+
+    records = load_day(storage, DAY)
+    records.append({**records[-1], "content": "外部追加", "timestamp": at(DAY, 6).isoformat()})
+    with open(day_path(storage, DAY), "w", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+
+    entry = storage.manifest.entry(DAY)
+    assert entry["count"] == 4
+    assert entry["size"] == os.path.getsize(day_path(storage, DAY))
+    assert entry["min"] == at(DAY, 6).isoformat()
+    assert entry["max"] == at(DAY, 8, 2).isoformat()
+    assert len(storage.manifest.offsets(DAY)) == 4
+    assert storage.manifest.read_records(DAY) == records
+
+    # 新的清单实例（另一个进程）读取保存的清单，同样得到重建后的结果
+    other = MessageManifest(storage.messages_dir, storage.index_dir)
+    assert other.entry(DAY)["count"] == 4
+    assert other.read_records(DAY, 3) == records[3:]
+
+    # 之后通过 save_message 追加的消息继续使用偏移索引
+    save(storage, "m4", at(DAY, 9))
+    assert storage.manifest.read_records(DAY) == load_day(storage, DAY)
+
+
+def test_manifest_from_older_version_is_rebuilt(storage):
+    """旧版本的清单（没有 min、max）整体重建"""
+    save(storage, "late", at(DAY, 20))
+    save(storage, "backdated", at(DAY, 8))
+    with open(storage.manifest.path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    data["version"] = 1
+    for entry in data["days"].values():
+        entry.pop("min")
+        entry.pop("max")
+    with open(storage.manifest.path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+    entry = MessageManifest(storage.messages_dir, storage.index_dir).entry(DAY)
+    assert entry["count"] == 2
+    assert (entry["min"], entry["max"]) == (at(DAY, 8).isoformat(), at(DAY, 20).isoformat())
+
+
+def test_range_query_uses_min_max_not_first_last(storage, monkeypatch):
+    """日文件不按时间顺序时（补录的消息），范围查询仍然返回范围内的消息；完全在范围外的日期不读取"""
+    other_day = DAY + timedelta(days=1)
+    save(storage, "late", at(DAY, 20))
+    save(storage, "backdated", at(DAY, 8))
+    save(storage, "evening", at(other_day, 20))
+    save(storage, "night", at(other_day, 22))
+
+    info = storage.day_info(DAY)
+    assert (info["first"], info["last"]) == (at(DAY, 20).isoformat(), at(DAY, 8).isoformat())
+    assert (info["min"], info["max"]) == (at(DAY, 8).isoformat(), at(DAY, 20).isoformat())
+
+    read_days = []
+    read_day = storage.read_day
+    monkeypatch.setattr(storage, "read_day", lambda day, *args: read_days.append(day) or read_day(day, *args))
+
+    messages = storage.get_messages_in_range(at(DAY, 7), at(DAY, 9))
+    assert [message.content for message in messages] == ["backdated"]
+    assert read_days == [DAY]
+
+    read_days.clear()
+    messages = storage.get_messages_in_range(at(DAY, 7), at(other_day, 9))
+    assert [message.content for message in messages] == ["late", "backdated"]
+    assert read_days == [DAY]
+
+    messages = storage.get_messages_in_range(at(DAY, 21), at(other_day, 21))
+    assert [message.content for message in messages] == ["evening"]
+    assert read_days == [DAY, other_day]
+
+
+def test_range_query_reads_archived_days_without_min_max(storage):
+    """旧的归档片段没有记录 min、max，时间范围未知，范围查询照常读取这一天"""
+    save(storage, "late", at(DAY, 20))
+    save(storage, "backdated", at(DAY, 8))
+    storage.compact(1, today=DAY + timedelta(days=2))
+
+    index_path = os.path.join(storage.archive.archive_dir, "index.json")
+    with open(index_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    for segments in data["days"].values():
+        for segment in segments:
+            segment.pop("min")
+            segment.pop("max")
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    storage.archive._data = None
+
+    info = storage.day_info(DAY)
+    assert info["min"] is None and info["max"] is None
+    messages = storage.get_messages_in_range(at(DAY, 7), at(DAY, 9))
+    assert [message.content for message in messages] == ["backdated"]
@@ -0,0 +1,123 @@
+import os
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from server.models.message import Message
+
+DAY1, DAY2, DAY3 = date(2026, 3, 1), date(2026, 3, 2), date(2026, 3, 3)
+
+
+def save_day(storage, day: date, count: int):
+    for i in range(count):
+        storage.save_message(Message(
+            content=f"{day.isoformat()}-{i}",
+            sender="user",
+            timestamp=datetime.combine(day, datetime.min.time()) + timedelta(hours=8, minutes=i),
+        ))
+
+
+def contents(messages):
+    return [message.content for message in messages]
+
+
+@pytest.fixture
+def paged_storage(storage):
+    """DAY1 3 条消息，DAY2 是没有消息的日文件，DAY3 4 条消息"""
+    save_day(storage, DAY1, 3)
+    with open(os.path.join(storage.messages_dir, f"{DAY2.isoformat()}.json"), "w", encoding="utf-8") as f:
+        f.write("[]")
+    save_day(storage, DAY3, 4)
+    return storage
+
+
+ALL_NEWEST_FIRST = [f"{DAY3.isoformat()}-{i}" for i in reversed(range(4))] + \
+                   [f"{DAY1.isoformat()}-{i}" for i in reversed(range(3))]
+
+
+def test_page_spans_day_boundary(paged_storage):
+    """一页跨越多天时跳过没有消息的日期，游标指向前一天中下一页的结束位置"""
+    page, cursor = paged_storage.get_messages_page(limit=5)
+    assert contents(page) == ALL_NEWEST_FIRST[:5]
+    assert cursor == f"{DAY1.isoformat()}:2"
+
+    page, cursor = paged_storage.get_messages_page(cursor, limit=5)
+    assert contents(page) == ALL_NEWEST_FIRST[5:]
+    assert cursor is None
+
+
+def test_cursor_at_index_zero(paged_storage):
+    """一天正好读完时游标为 "日期:0"，下一页从更早的日期开始"""
+    page, cursor = paged_storage.get_messages_page(limit=4)
+    assert contents(page) == ALL_NEWEST_FIRST[:4]
+    assert cursor == f"{DAY3.isoformat()}:0"
+
+    page, cursor = paged_storage.get_messages_page(cursor, limit=4)
+    assert contents(page) == ALL_NEWEST_FIRST[4:]
+    assert cursor is None
+
+
+def test_empty_day(paged_storage):
+    """从没有消息的日期开始读取时直接读取更早的日期"""
+    page, cursor = paged_storage.get_messages_page(limit=2, end_date=DAY2)
+    assert contents(page) == ALL_NEWEST_FIRST[4:6]
+    assert cursor == f"{DAY1.isoformat()}:1"
+
+    page, cursor = paged_storage.get_messages_page(cursor, limit=2)
+    assert contents(page) == ALL_NEWEST_FIRST[6:]
+    assert cursor is None
+
+
+def test_final_page_has_no_cursor(paged_storage):
+    """最后一页（包括正好读完最早一条消息的满页）不返回游标，没有消息时返回空页"""
+    page, cursor = paged_storage.get_messages_page(limit=len(ALL_NEWEST_FIRST))
+    assert contents(page) == ALL_NEWEST_FIRST
+    assert cursor is None
+
+    page, cursor = paged_storage.get_messages_page(f"{DAY1.isoformat()}:0", limit=5)
+    assert page == [] and cursor is None
+
+    page, cursor = paged_storage.get_messages_page(limit=5, end_date=DAY1 - timedelta(days=1))
+    assert page == [] and cursor is None
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, 7, 50])
+def test_pages_cover_every_message_once(paged_storage, limit):
+    """按游标一直读到最后，每条消息恰好出现一次；有新消息写入后旧游标仍然有效"""
+    seen = []
+    page, cursor = paged_storage.get_messages_page(limit=limit)
+    seen += contents(page)
+    save_day(paged_storage, DAY3 + timedelta(days=1), 2)
+    while cursor:
+        page, cursor = paged_storage.get_messages_page(cursor, limit=limit)
+        assert 0 < len(page) <= limit
+        seen += contents(page)
+    assert seen == ALL_NEWEST_FIRST
+
+
+def test_page_spans_archived_and_hot_days(paged_storage):
+    """归档的日期与日文件中的日期可以在同一页中读取"""
+    paged_storage.compact(1, today=DAY3)
+    assert paged_storage.archive.days() == [DAY1]
+
+    page, cursor = paged_storage.get_messages_page(limit=5)
+    assert contents(page) == ALL_NEWEST_FIRST[:5]
+    page, cursor = paged_storage.get_messages_page(cursor, limit=5)
+    assert contents(page) == ALL_NEWEST_FIRST[5:]
+    assert cursor is None
+
+
+def test_chat_service_get_messages_page(paged_storage):
+    """ChatService.get_messages_page 返回与存储层相同的分页结果"""
+    from server.services.chat_service import ChatService
+
+    service = ChatService(paged_storage, {
+        "model_name": "mock", "api_key": "mock", "base_url": "http://127.0.0.1:9",
+        "temperature": 0.7, "max_tokens": 100,
+    })
+    cursor = None
+    for expected in (ALL_NEWEST_FIRST[:3], ALL_NEWEST_FIRST[3:6], ALL_NEWEST_FIRST[6:]):
+        page, cursor = service.get_messages_page(cursor, limit=3)
+        assert contents(page) == expected
+        assert all(isinstance(message, Message) for message in page)
+    assert cursor is None
@@ -0,0 +1,77 @@
+import json
+import multiprocessing
+import os
+import threading
+from collections import Counter
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from scripts import storage_stress
+from utils.file_lock import file_lock
+
+PROCESSES = 3
+THREADS = 3
+MESSAGES = 20
+
+
+@pytest.fixture
+def stress_env(monkeypatch):
+    """关闭全文索引和指标记录，结束后恢复配置"""
+    from server.config.settings import reload_config
+
+    monkeypatch.setenv("SEARCH_INDEX_ENABLED", "false")
+    monkeypatch.setenv("TELEMETRY_ENABLED", "false")
+    storage_stress.configure_environment()
+    yield
+    monkeypatch.undo()
+    reload_config()
+
+
+def test_concurrent_writers_keep_every_message(tmp_path, stress_env):
+    """多个进程、每个进程多个线程同时写入同一天，每条消息都恰好保存一次"""
+    data_dir = str(tmp_path)
+    day = date.today()
+    processes = [multiprocessing.Process(target=storage_stress.write_messages,
+                                         args=(data_dir, day, p, THREADS, MESSAGES))
+                 for p in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=120)
+    assert [process.exitcode for process in processes] == [0] * PROCESSES
+
+    with open(os.path.join(data_dir, "messages", f"{day.isoformat()}.json"), "r", encoding="utf-8") as f:
+        counts = Counter(record["content"] for record in json.load(f))
+    expected = {storage_stress.message_id(p, t, i)
+                for p in range(PROCESSES) for t in range(THREADS) for i in range(MESSAGES)}
+    assert set(counts) == expected
+    assert set(counts.values()) == {1}
+
+    args = SimpleNamespace(processes=PROCESSES, threads=THREADS, messages=MESSAGES)
+    assert storage_stress.verify(data_dir, day, args) == []
+
+
+def test_shared_locks_do_not_block_each_other(tmp_path):
+    """读取方的共享锁可以同时持有，写入方的独占锁需要等待读取完成"""
+    path = str(tmp_path / "messages.lock")
+    shared_acquired = threading.Event()
+    exclusive_acquired = threading.Event()
+
+    def reader():
+        with file_lock(path, shared=True):
+            shared_acquired.set()
+
+    def writer():
+        with file_lock(path):
+            exclusive_acquired.set()
+
+    with file_lock(path, shared=True):
+        threading.Thread(target=reader).start()
+        assert shared_acquired.wait(5)
+        thread = threading.Thread(target=writer)
+        thread.start()
+        assert not exclusive_acquired.wait(0.2)
+    thread.join(5)
+    assert exclusive_acquired.is_set()
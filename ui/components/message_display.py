@@ -1,6 +1,7 @@
 import streamlit as st
+from collections import Counter
 from datetime import datetime
-from typing import List
+from typing import Callable, List, Optional
 from server.models.message import Message
 
 def render_message(message: Message):
@@ -8,14 +9,26 @@ def render_message(message: Message):
     with st.chat_message(message.sender):
         st.write(f"{message.timestamp.strftime('%H:%M')} - {message.content}")
 
-def render_message_list(messages: List[Message], show_date: bool = True):
-    """渲染消息列表"""
+def thought_keys(messages: List[Message]) -> List[str]:
+    """为每条消息生成思维过程开关的 key，时间、发送者和引用都相同的消息按出现顺序编号，保证唯一"""
+    seen = Counter()
+    keys = []
+    for message in messages:
+        base = f"thought-{message.timestamp.isoformat()}-{message.sender}-{message.thought_ref or ''}"
+        keys.append(f"{base}-{seen[base]}")
+        seen[base] += 1
+    return keys
+
+def render_message_list(messages: List[Message], show_date: bool = True, presorted: bool = False,
+                        load_thought: Callable[[str], Optional[str]] = None):
+    """渲染消息列表，presorted 表示消息已经按时间升序排列，不需要再排序；传入 load_thought 时同时显示思维过程"""
     if not messages:
         st.info("这一天还没有对话记录")
         return
 
     current_date = None
-    for message in sorted(messages, key=lambda x: x.timestamp):
+    messages = messages if presorted else sorted(messages, key=lambda x: x.timestamp)
+    for message, key in zip(messages, thought_keys(messages)):
         message_date = message.timestamp.date()
         
         # 显示日期分隔符
@@ -24,9 +37,19 @@ def render_message_list(messages: List[Message], show_date: bool = True):
             current_date = message_date
         
         render_message(message)
+        if load_thought:
+            render_thought_process(message, load_thought, key=key)
+
+def render_thought_process(message: Message, load_thought: Callable[[str], Optional[str]] = None,
+                           key: str = None):
+    """渲染思维过程
 
-def render_thought_process(message: Message):
-    """渲染思维过程（仅在展开时显示）"""
+    只保存了引用（thought_ref）的消息在打开开关时才通过 load_thought 读取思维过程，
+    避免渲染消息列表时读取所有思维过程。渲染列表时通过 thought_keys 传入唯一的 key。
+    """
     if message.thought_process:
         with st.expander("查看思维过程"):
-            st.write(message.thought_process) 
\ No newline at end of file
+            st.write(message.thought_process)
+    elif message.thought_ref and load_thought:
+        if st.toggle("查看思维过程", key=key or thought_keys([message])[0]):
+            st.write(load_thought(message.thought_ref) or "思维过程已丢失") 
\ No newline at end of file
@@ -0,0 +1,81 @@
+import functools
+import os
+
+import streamlit as st
+
+from server.config.settings import get_config
+from utils.profiling import SamplingProfiler, profile_session
+
+_ENABLED_KEY = "_profiling_enabled"
+_ARMED_KEY = "_profiling_armed"
+_REPORT_KEY = "_profiling_report"
+
+
+def profiled_page(name: str):
+    """页面 main 函数的装饰器
+
+    开启性能分析（PROFILING_ENABLED 或侧边栏开关）时记录本次运行中各段 span 的耗时；
+    在侧边栏点击“采样下一次运行”后，下一次运行会同时进行栈采样并保存 speedscope 火焰图。
+    """
+    def decorator(main):
+        @functools.wraps(main)
+        def wrapper(*args, **kwargs):
+            config = get_config()
+            if _ENABLED_KEY not in st.session_state:
+                st.session_state[_ENABLED_KEY] = config.PROFILING_ENABLED
+            capture = st.session_state.pop(_ARMED_KEY, False)
+            if not st.session_state[_ENABLED_KEY] and not capture:
+                result = main(*args, **kwargs)
+                _render_controls(name)
+                return result
+
+            profiler = SamplingProfiler(interval=config.PROFILE_INTERVAL_MS / 1000) if capture else None
+            with profile_session(name) as session:
+                if profiler:
+                    profiler.start()
+                try:
+                    result = main(*args, **kwargs)
+                finally:
+                    # st.rerun()/st.stop() 通过异常中断运行，同样保存本次结果，在下一次运行时显示
+                    report = {"elapsed": session.elapsed, "spans": session.summary()}
+                    if profiler:
+                        profiler.stop()
+                        report["samples"] = profiler.sample_count
+                        report["profile_path"] = profiler.save(config.PROFILE_DIR, name)
+                        print(f"[profiling] 已保存采样结果: {report['profile_path']}")
+                    st.session_state[_REPORT_KEY] = report
+            _render_controls(name)
+            return result
+        return wrapper
+    return decorator
+
+
+def _render_controls(name: str):
+    with st.sidebar.expander("性能分析"):
+        st.checkbox("记录每次运行的耗时", key=_ENABLED_KEY)
+        if st.session_state.get(_ARMED_KEY):
+            st.caption("下一次运行将被采样")
+        elif st.button("采样下一次运行", help="对下一次页面运行进行栈采样，保存为 speedscope 火焰图"):
+            st.session_state[_ARMED_KEY] = True
+            st.caption("下一次运行将被采样")
+
+        report = st.session_state.get(_REPORT_KEY)
+        if not report:
+            return
+        st.caption(f"上一次运行耗时 {report['elapsed'] * 1000:.0f}ms")
+        if report["spans"]:
+            st.dataframe([
+                {
+                    "区间": span["name"],
+                    "次数": span["calls"],
+                    "总耗时": f"{span['total'] * 1000:.1f}ms",
+                    "最长": f"{span['max'] * 1000:.1f}ms",
+                }
+                for span in report["spans"]
+            ], use_container_width=True)
+
+        path = report.get("profile_path")
+        if path and os.path.exists(path):
+            st.caption(f"采样 {report['samples']} 次，已保存到 {path}（可在 speedscope.app 中打开）")
+            with open(path, "rb") as f:
+                st.download_button("下载火焰图", f, file_name=os.path.basename(path), mime="application/json")
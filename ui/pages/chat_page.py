@@ -88,7 +88,8 @@ class ChatPage:
         
         with message_container:
             # 显示历史消息
-            render_message_list(messages, show_date=False)
+            render_message_list(messages, show_date=False, presorted=True,
+                                load_thought=self.chat_service.storage.load_thought)
             
             # 如果正在等待响应或生成中，显示相应状态
             if st.session_state.current_sender:
@@ -2,6 +2,7 @@ import streamlit as st
 import json
 import os
 from typing import Dict, List
+from server.config.prompts import Prompts
 
 class PromptConfigPage:
     def __init__(self):
@@ -43,6 +44,8 @@ class PromptConfigPage:
         """保存提示词配置"""
         with open(self.config_file, 'w', encoding='utf-8') as f:
             json.dump(config, f, ensure_ascii=False, indent=2)
+        # 使提示词缓存立即失效
+        Prompts.invalidate()
             
     def _load_custom_terms(self) -> Dict[str, List[str]]:
         """加载自定义词条"""
@@ -53,6 +56,7 @@ class PromptConfigPage:
         """保存自定义词条"""
         with open(self.custom_terms_file, 'w', encoding='utf-8') as f:
             json.dump(terms, f, ensure_ascii=False, indent=2)
+        Prompts.invalidate()
             
     def render(self):
         """渲染配置页面"""
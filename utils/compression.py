@@ -0,0 +1,42 @@
+import gzip
+
+# 支持的压缩方式及文件扩展名
+EXTENSIONS = {"zstd": ".zst", "gzip": ".gz", "none": ""}
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def resolve_codec(codec: str, label: str = "数据") -> str:
+    """检查压缩方式，zstd 不可用（未安装 zstandard）时改用 gzip"""
+    if codec not in EXTENSIONS:
+        raise ValueError(f"不支持的压缩方式: {codec}")
+    if codec == "zstd" and _zstd() is None:
+        print(f"[compression] 未安装 zstandard，{label}改用 gzip 压缩")
+        return "gzip"
+    return codec
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    """压缩为一个独立的帧（gzip member / zstd frame），多个帧可以直接拼接在同一个文件中"""
+    if codec == "zstd":
+        return _zstd().ZstdCompressor(level=10).compress(data)
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    return data
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        zstandard = _zstd()
+        if zstandard is None:
+            raise ImportError("读取 zstd 压缩的数据需要安装 zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    return data
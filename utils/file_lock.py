@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# 当前线程已经持有的锁：锁文件路径 -> [文件对象, 是否共享锁, 嵌套层数]
+_held = threading.local()
+
+
+def _acquire(f, shared: bool):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        return
+    # msvcrt 只支持独占锁，锁住第一个字节，LK_LOCK 重试 10 次后抛出异常，继续等待
+    while True:
+        try:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            time.sleep(0.01)
+
+
+def _release(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False):
+    """跨线程、跨进程的建议性文件锁
+
+    共享锁之间不互斥，独占锁与其他任何锁互斥（Windows 上都按独占锁处理）。
+    每次加锁都单独打开锁文件，同一进程中的不同线程之间同样互斥；同一线程可以嵌套加锁，
+    已经持有锁时直接进入（持有独占锁时嵌套的共享锁不需要再加锁，不支持从共享锁升级为独占锁）。
+
+    Args:
+        path: 锁文件路径，不存在时自动创建
+        shared: 是否为共享（读）锁
+    """
+    held = getattr(_held, "locks", None)
+    if held is None:
+        held = _held.locks = {}
+    key = os.path.abspath(path)
+    if key in held:
+        if held[key][1] and not shared:
+            raise RuntimeError(f"不能把共享锁升级为独占锁: {path}")
+        held[key][2] += 1
+        try:
+            yield
+        finally:
+            held[key][2] -= 1
+        return
+
+    os.makedirs(os.path.dirname(key), exist_ok=True)
+    f = open(key, "a+b")
+    try:
+        _acquire(f, shared)
+        held[key] = [f, shared, 1]
+        try:
+            yield
+        finally:
+            del held[key]
+            _release(f)
+    finally:
+        f.close()
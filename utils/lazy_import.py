@@ -0,0 +1,56 @@
+import importlib
+import threading
+import types
+from typing import Any, Optional
+
+
+class LazyModule(types.ModuleType):
+    """延迟导入的模块代理，第一次访问属性时才真正导入
+
+    用于 langchain、plotly 等导入较慢的依赖，页面或服务只用到一部分功能时不必承担全部的导入耗时。
+    注意：类型注解和继承会在定义时访问属性，这类用法需要使用字符串注解或在函数内导入。
+    """
+
+    def __init__(self, name: str, attribute: Optional[str] = None):
+        super().__init__(name)
+        self.__dict__["_lazy_name"] = name
+        self.__dict__["_lazy_attribute"] = attribute
+        self.__dict__["_lazy_target"] = None
+        self.__dict__["_lazy_lock"] = threading.Lock()
+
+    def _load(self) -> Any:
+        target = self.__dict__["_lazy_target"]
+        if target is None:
+            with self.__dict__["_lazy_lock"]:
+                target = self.__dict__["_lazy_target"]
+                if target is None:
+                    target = importlib.import_module(self.__dict__["_lazy_name"])
+                    attribute = self.__dict__["_lazy_attribute"]
+                    if attribute:
+                        target = getattr(target, attribute)
+                    self.__dict__["_lazy_target"] = target
+        return target
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __call__(self, *args, **kwargs):
+        # 代理的是类或函数时可以直接调用
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_lazy_target"] is not None else "not loaded"
+        return f"<lazy {self.__dict__['_lazy_name']} ({state})>"
+
+
+def lazy_import(name: str, attribute: str = None) -> Any:
+    """返回延迟导入的模块，或模块中的某个属性（类、函数）
+
+    Args:
+        name: 模块名，例如 "plotly.graph_objects"
+        attribute: 模块中的属性名，例如 "ChatOpenAI"
+
+    Returns:
+        第一次使用时才导入的代理对象
+    """
+    return LazyModule(name, attribute)
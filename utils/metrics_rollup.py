@@ -0,0 +1,198 @@
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional
+
+# 汇总直方图的桶边界（秒），按对数间隔划分，最后一个桶之外的计入溢出桶
+ROLLUP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                  1, 2.5, 5, 10, 25, 50, 100, 250)
+ROLLUP_VERSION = 1
+SLOWEST_KEEP = 20
+
+
+def _new_histogram() -> Dict:
+    return {"counts": [0] * (len(ROLLUP_BUCKETS) + 1), "sum": 0.0, "total": 0, "max": 0.0}
+
+
+def _observe(hist: Dict, value: Optional[float]):
+    if value is None:
+        return
+    index = len(ROLLUP_BUCKETS)
+    for i, bound in enumerate(ROLLUP_BUCKETS):
+        if value <= bound:
+            index = i
+            break
+    hist["counts"][index] += 1
+    hist["sum"] += value
+    hist["total"] += 1
+    hist["max"] = max(hist["max"], value)
+
+
+def _merge_histogram(target: Dict, source: Dict):
+    target["counts"] = [a + b for a, b in zip(target["counts"], source["counts"])]
+    target["sum"] += source["sum"]
+    target["total"] += source["total"]
+    target["max"] = max(target["max"], source["max"])
+
+
+def histogram_percentile(hist: Dict, pct: float) -> Optional[float]:
+    """根据直方图估算百分位数，返回所在桶的上界（溢出桶返回最大值）"""
+    if not hist or not hist["total"]:
+        return None
+    threshold = hist["total"] * pct / 100
+    cumulative = 0
+    for i, count in enumerate(hist["counts"]):
+        cumulative += count
+        if cumulative >= threshold:
+            return ROLLUP_BUCKETS[i] if i < len(ROLLUP_BUCKETS) else hist["max"]
+    return hist["max"]
+
+
+def histogram_mean(hist: Dict) -> Optional[float]:
+    return hist["sum"] / hist["total"] if hist and hist["total"] else None
+
+
+def _read_jsonl(path: str) -> Iterator[Dict]:
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def _source_paths(metrics_dir: str, day: date) -> List[str]:
+    name = day.strftime("%Y-%m-%d")
+    return [os.path.join(metrics_dir, f"{kind}-{name}.jsonl") for kind in ("llm", "ops")]
+
+
+def _source_signature(metrics_dir: str, day: date) -> List:
+    signature = []
+    for path in _source_paths(metrics_dir, day):
+        try:
+            stat = os.stat(path)
+            signature.append([stat.st_mtime_ns, stat.st_size])
+        except FileNotFoundError:
+            signature.append(None)
+    return signature
+
+
+def _empty_rollup(day: date) -> Dict:
+    return {"version": ROLLUP_VERSION, "day": day.isoformat(), "llm": {}, "ops": {}, "slowest": []}
+
+
+def build_day_rollup(metrics_dir: str, day: date) -> Dict:
+    """从一天的原始指标文件计算汇总"""
+    rollup = _empty_rollup(day)
+    llm_path, ops_path = _source_paths(metrics_dir, day)
+    slowest = []
+
+    for record in _read_jsonl(llm_path):
+        key = f"{record.get('provider')}/{record.get('model')}/{record.get('source')}"
+        entry = rollup["llm"].setdefault(key, {
+            "provider": record.get("provider"),
+            "model": record.get("model"),
+            "source": record.get("source"),
+            "calls": 0,
+            "errors": 0,
+            "ttft": _new_histogram(),
+            "duration": _new_histogram(),
+            "tokens_per_second_sum": 0.0,
+            "tokens_per_second_count": 0,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+            "completion_tokens": 0,
+            "reasoning_tokens": 0,
+        })
+        entry["calls"] += 1
+        if record.get("error"):
+            entry["errors"] += 1
+        _observe(entry["ttft"], record.get("ttft"))
+        _observe(entry["duration"], record.get("duration"))
+        if record.get("tokens_per_second"):
+            entry["tokens_per_second_sum"] += record["tokens_per_second"]
+            entry["tokens_per_second_count"] += 1
+        for field in ("prompt_tokens", "cached_tokens", "completion_tokens", "reasoning_tokens"):
+            entry[field] += record.get(field) or 0
+        if record.get("duration") is not None:
+            slowest.append({"kind": "llm", "name": key, "duration": record["duration"],
+                            "timestamp": record.get("timestamp"), "error": record.get("error")})
+
+    for record in _read_jsonl(ops_path):
+        name = record.get("name")
+        entry = rollup["ops"].setdefault(name, {"calls": 0, "errors": 0, "duration": _new_histogram()})
+        entry["calls"] += 1
+        if record.get("error"):
+            entry["errors"] += 1
+        _observe(entry["duration"], record.get("duration"))
+        slowest.append({"kind": "ops", "name": name, "duration": record.get("duration") or 0,
+                        "timestamp": record.get("timestamp"), "error": record.get("error")})
+
+    rollup["slowest"] = sorted(slowest, key=lambda r: r["duration"], reverse=True)[:SLOWEST_KEEP]
+    return rollup
+
+
+def load_day_rollup(metrics_dir: str, day: date) -> Dict:
+    """读取一天的汇总，原始文件有变化（或没有缓存）时重新计算并保存"""
+    signature = _source_signature(metrics_dir, day)
+    if not any(signature):
+        return _empty_rollup(day)
+
+    rollup_dir = os.path.join(metrics_dir, "rollups")
+    rollup_path = os.path.join(rollup_dir, f"{day.isoformat()}.json")
+    try:
+        with open(rollup_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("version") == ROLLUP_VERSION and cached.get("source_signature") == signature:
+            return cached
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+
+    rollup = build_day_rollup(metrics_dir, day)
+    rollup["source_signature"] = signature
+    os.makedirs(rollup_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=rollup_dir, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(rollup, f, ensure_ascii=False)
+    os.replace(tmp_path, rollup_path)
+    return rollup
+
+
+def load_rollups(metrics_dir: str, start: date, end: date) -> List[Dict]:
+    """读取日期范围内（包含两端）每天的汇总"""
+    rollups = []
+    day = start
+    while day <= end:
+        rollups.append(load_day_rollup(metrics_dir, day))
+        day += timedelta(days=1)
+    return rollups
+
+
+def merge_rollups(rollups: List[Dict]) -> Dict:
+    """合并多天的汇总"""
+    merged = {"llm": {}, "ops": {}, "slowest": []}
+    for rollup in rollups:
+        for key, entry in rollup["llm"].items():
+            target = merged["llm"].get(key)
+            if target is None:
+                merged["llm"][key] = json.loads(json.dumps(entry))
+                continue
+            for field in ("calls", "errors", "tokens_per_second_sum", "tokens_per_second_count",
+                          "prompt_tokens", "cached_tokens", "completion_tokens", "reasoning_tokens"):
+                target[field] += entry[field]
+            _merge_histogram(target["ttft"], entry["ttft"])
+            _merge_histogram(target["duration"], entry["duration"])
+        for name, entry in rollup["ops"].items():
+            target = merged["ops"].get(name)
+            if target is None:
+                merged["ops"][name] = json.loads(json.dumps(entry))
+                continue
+            target["calls"] += entry["calls"]
+            target["errors"] += entry["errors"]
+            _merge_histogram(target["duration"], entry["duration"])
+        merged["slowest"].extend(rollup["slowest"])
+    merged["slowest"] = sorted(merged["slowest"], key=lambda r: r["duration"], reverse=True)[:SLOWEST_KEEP]
+    return merged
@@ -0,0 +1,186 @@
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+_local = threading.local()
+
+
+@dataclass
+class Span:
+    """一段计时区间（页面渲染、服务调用、存储读写等）"""
+    name: str
+    start: float  # 相对于本次运行开始的时间（秒）
+    duration: float
+    depth: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class ProfileSession:
+    """一次页面运行的计时记录，通过线程局部变量让各层代码找到当前会话"""
+    name: str
+    started_at: float = field(default_factory=time.perf_counter)
+    spans: List[Span] = field(default_factory=list)
+    _depth: int = 0
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def summary(self) -> List[Dict]:
+        """按名称汇总的耗时，按总耗时降序"""
+        totals: Dict[str, Dict] = {}
+        for span in self.spans:
+            entry = totals.setdefault(span.name, {"name": span.name, "calls": 0, "total": 0.0, "max": 0.0})
+            entry["calls"] += 1
+            entry["total"] += span.duration
+            entry["max"] = max(entry["max"], span.duration)
+        return sorted(totals.values(), key=lambda e: e["total"], reverse=True)
+
+
+def current_session() -> Optional[ProfileSession]:
+    return getattr(_local, "session", None)
+
+
+@contextlib.contextmanager
+def profile_session(name: str):
+    """在当前线程开启一次计时会话，期间的 span() 都记录到该会话"""
+    previous = current_session()
+    session = ProfileSession(name)
+    _local.session = session
+    try:
+        yield session
+    finally:
+        _local.session = previous
+
+
+@contextlib.contextmanager
+def span(name: str):
+    """记录一段代码的耗时，没有开启会话时几乎没有开销"""
+    session = current_session()
+    if session is None:
+        yield
+        return
+    start = time.perf_counter()
+    error = None
+    session._depth += 1
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        session._depth -= 1
+        session.spans.append(Span(
+            name=name,
+            start=start - session.started_at,
+            duration=time.perf_counter() - start,
+            depth=session._depth,
+            error=error
+        ))
+
+
+def profiled(name: str):
+    """用 span() 包裹整个函数的装饰器"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class SamplingProfiler:
+    """采样分析器
+
+    在后台线程按固定间隔读取目标线程的调用栈（sys._current_frames），
+    不需要 C 扩展，对被分析代码的影响与采样间隔成反比。结果保存为 speedscope 格式，
+    可以直接拖入 https://www.speedscope.app 查看火焰图。
+    """
+
+    def __init__(self, interval: float = 0.005, thread_id: int = None, max_depth: int = 200):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.max_depth = max_depth
+        self._frames: Dict[Tuple[str, str, int], int] = {}
+        self._samples: List[List[int]] = []
+        self._weights: List[float] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.duration = 0.0
+
+    def _frame_index(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frames.get(key)
+        if index is None:
+            index = self._frames[key] = len(self._frames)
+        return index
+
+    def _sample(self, frame) -> List[int]:
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            stack.append(self._frame_index(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is not None:
+                self._samples.append(self._sample(frame))
+                self._weights.append(now - last)
+            last = now
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    @property
+    def sample_count(self) -> int:
+        return len(self._samples)
+
+    def to_speedscope(self, name: str) -> Dict:
+        frames = [None] * len(self._frames)
+        for (func, filename, line), index in self._frames.items():
+            frames[index] = {"name": func, "file": filename, "line": line}
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(self._weights),
+                "samples": self._samples,
+                "weights": self._weights,
+            }],
+            "name": name,
+            "exporter": "two",
+        }
+
+    def save(self, directory: str, name: str) -> str:
+        """保存为 <directory>/<name>-<时间>.speedscope.json，返回文件路径"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.speedscope.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_speedscope(name), f)
+        return path
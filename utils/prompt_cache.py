@@ -0,0 +1,113 @@
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+
+def _as_dict(usage: Any) -> Dict:
+    """把不同 SDK 返回的 usage 对象统一转换为字典"""
+    if isinstance(usage, dict):
+        return usage
+    if hasattr(usage, "model_dump"):
+        return usage.model_dump()
+    return dict(vars(usage))
+
+
+def extract_cache_usage(usage: Any) -> Optional[Dict[str, int]]:
+    """从 usage 信息中提取命中缓存和未命中缓存的提示词 token 数
+
+    支持以下格式：
+    - OpenAI: prompt_tokens + prompt_tokens_details.cached_tokens
+    - DeepSeek: prompt_tokens + prompt_cache_hit_tokens
+    - LangChain usage_metadata: input_tokens + input_token_details.cache_read
+    - Ollama 原生接口: prompt_eval_count（不区分是否命中缓存）
+
+    Returns:
+        包含 prompt_tokens、cached_tokens、uncached_tokens 的字典，无法识别时返回 None
+    """
+    if usage is None:
+        return None
+    usage = _as_dict(usage)
+
+    if "prompt_tokens" in usage:
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        details = usage.get("prompt_tokens_details") or {}
+        cached_tokens = details.get("cached_tokens") or usage.get("prompt_cache_hit_tokens") or 0
+    elif "input_tokens" in usage:
+        prompt_tokens = usage.get("input_tokens") or 0
+        details = usage.get("input_token_details") or {}
+        cached_tokens = details.get("cache_read") or 0
+    elif "prompt_eval_count" in usage:
+        prompt_tokens = usage.get("prompt_eval_count") or 0
+        cached_tokens = 0
+    else:
+        return None
+
+    return {
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "uncached_tokens": max(0, prompt_tokens - cached_tokens),
+    }
+
+
+def _prompt_text(messages: List[Any]) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content") if isinstance(message, dict) else getattr(message, "content", "")
+        parts.append(content or "")
+    return "\n".join(parts)
+
+
+class PromptCacheStats:
+    """按调用来源统计提示词缓存命中情况（线程安全）
+
+    流式输出提前终止时收不到包含 usage 的最后一个数据块，这时用 record_estimated 按提示词字符数估算，
+    命中缓存的部分按与同一缓存键上一次提示词的公共前缀估算（服务端按前缀缓存），记录中标记 estimated。
+    """
+
+    def __init__(self, history: int = 100):
+        self._lock = threading.Lock()
+        self.totals: Dict[str, Dict[str, int]] = {}
+        self.recent = deque(maxlen=history)
+        self._last_prompts: Dict[str, str] = {}
+
+    def _add(self, source: str, info: Dict[str, int], estimated: bool):
+        with self._lock:
+            totals = self.totals.setdefault(source, {
+                "calls": 0, "estimated_calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "uncached_tokens": 0
+            })
+            totals["calls"] += 1
+            totals["estimated_calls"] += int(estimated)
+            for key in ("prompt_tokens", "cached_tokens", "uncached_tokens"):
+                totals[key] += info[key]
+            self.recent.append({"source": source, **info, "estimated": estimated})
+
+    def record(self, source: str, usage: Any) -> Optional[Dict[str, int]]:
+        """记录一次调用的 usage，返回提取出的缓存信息"""
+        info = extract_cache_usage(usage)
+        if info is not None:
+            self._add(source, info, estimated=False)
+        return info
+
+    def record_estimated(self, source: str, messages: List[Any], cache_key: str = None) -> Dict[str, int]:
+        """没有 usage 时按提示词估算一次调用（字符数近似 token 数，与限流器的估算一致）"""
+        text = _prompt_text(messages)
+        key = cache_key or source
+        with self._lock:
+            previous = self._last_prompts.get(key, "")
+            self._last_prompts[key] = text
+        cached = len(os.path.commonprefix([previous, text]))
+        info = {"prompt_tokens": len(text), "cached_tokens": cached, "uncached_tokens": len(text) - cached}
+        self._add(source, info, estimated=True)
+        return info
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "totals": {source: dict(values) for source, values in self.totals.items()},
+                "recent": list(self.recent),
+            }
+
+
+# 全局统计实例
+prompt_cache_stats = PromptCacheStats()
@@ -0,0 +1,223 @@
+import email.utils
+import itertools
+import random
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# 视为可重试的 HTTP 状态码
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class TokenBucket:
+    """令牌桶，按每分钟速率匀速补充，容量默认等于一分钟的配额"""
+
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """取出指定数量的令牌，不足时阻塞等待，返回等待的秒数"""
+        # 单次请求超过容量时按容量计算，避免永远等待
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def refund(self, amount: float):
+        """归还多扣的令牌"""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """客户端限流器：同时限制每分钟请求数和每分钟 token 数
+
+    服务端返回 Retry-After 时，所有调用方都会暂停到指定时间之后。
+    rpm/tpm 为 0 表示不限制。
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, estimated_tokens: int = 0) -> float:
+        """在发起请求前调用，返回等待的秒数"""
+        waited = 0.0
+        with self._lock:
+            pause = self._blocked_until - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+            waited += pause
+        if self.requests:
+            waited += self.requests.acquire(1)
+        if self.tokens and estimated_tokens:
+            waited += self.tokens.acquire(estimated_tokens)
+        return waited
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """请求完成后按实际用量（没有 usage 时为按已收到内容估算的用量）归还多扣的 token"""
+        if self.tokens and actual_tokens is not None and actual_tokens < estimated_tokens:
+            self.tokens.refund(estimated_tokens - actual_tokens)
+
+    def pause(self, seconds: float):
+        """服务端要求降速时，暂停所有调用方"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+def estimate_tokens(messages: List[Any], max_tokens: Optional[int] = None) -> int:
+    """粗略估算一次请求消耗的 token 数：提示词按字符数计算，加上最大生成长度"""
+    chars = 0
+    for message in messages:
+        content = message.get("content") if isinstance(message, dict) else getattr(message, "content", "")
+        chars += len(content or "")
+    return chars + (max_tokens or 0)
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None and getattr(exc, "response", None) is not None:
+        status = getattr(exc.response, "status_code", None)
+    return status
+
+
+def is_retryable(exc: Exception) -> bool:
+    """判断错误是否可以重试：限流、服务端错误、超时和连接错误"""
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    name = type(exc).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def retry_after_seconds(exc: Exception) -> Optional[float]:
+    """从错误响应的 Retry-After 头中读取等待时间"""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        # HTTP 日期格式
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def call_with_retry(fn: Callable[[], T], estimated_tokens: int = 0, limiter: "RateLimiter" = None,
+                    max_retries: int = None, base_delay: float = None, max_delay: float = None) -> T:
+    """经过限流器调用 fn，遇到 429/5xx 等可重试错误时按指数退避加随机抖动重试
+
+    优先使用服务端返回的 Retry-After；不可重试的错误和最后一次失败会直接抛出。
+    """
+    if limiter is None or max_retries is None or base_delay is None or max_delay is None:
+        settings = _retry_settings()
+        limiter = limiter or get_rate_limiter()
+        max_retries = settings["max_retries"] if max_retries is None else max_retries
+        base_delay = settings["base_delay"] if base_delay is None else base_delay
+        max_delay = settings["max_delay"] if max_delay is None else max_delay
+
+    for attempt in range(max_retries + 1):
+        limiter.acquire(estimated_tokens)
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            retry_after = retry_after_seconds(e)
+            delay = retry_after if retry_after is not None else \
+                min(max_delay, base_delay * (2 ** attempt)) * random.uniform(0.5, 1.5)
+            print(f"LLM 请求失败（{e}），{delay:.1f}s 后进行第 {attempt + 1} 次重试")
+            if retry_after is not None:
+                # 服务端指定的等待时间对所有调用方生效，在下一次 acquire 时等待
+                limiter.pause(retry_after)
+            else:
+                time.sleep(delay)
+    raise RuntimeError("unreachable")
+
+
+def open_stream_with_retry(create_stream: Callable[[], Iterable], estimated_tokens: int = 0,
+                           **retry_options) -> Tuple[Any, Iterator]:
+    """打开流式响应并读取第一个数据块，在此之前的错误按 call_with_retry 的规则重试
+
+    已经开始输出后的错误不会重试，避免重复输出内容。
+
+    Returns:
+        (原始流对象，用于关闭连接; 包含第一个数据块的迭代器)
+    """
+    def open_and_peek():
+        stream = create_stream()
+        iterator = iter(stream)
+        try:
+            first = next(iterator)
+        except StopIteration:
+            return stream, iter(())
+        except Exception:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+            raise
+        return stream, itertools.chain([first], iterator)
+
+    return call_with_retry(open_and_peek, estimated_tokens, **retry_options)
+
+
+_shared_limiter: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def _retry_settings() -> dict:
+    from server.config.settings import get_config
+
+    config = get_config()
+    return {
+        "max_retries": config.LLM_MAX_RETRIES,
+        "base_delay": config.LLM_RETRY_BASE_DELAY,
+        "max_delay": config.LLM_RETRY_MAX_DELAY,
+    }
+
+
+def get_rate_limiter() -> RateLimiter:
+    """获取所有 LLM 调用共享的限流器"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            from server.config.settings import get_config
+
+            config = get_config()
+            _shared_limiter = RateLimiter(config.LLM_RPM, config.LLM_TPM)
+        return _shared_limiter
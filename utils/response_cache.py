@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+class ResponseCache:
+    """基于内容寻址的 LLM 响应磁盘缓存
+
+    缓存键由 (模型, 消息, 温度, 其他参数) 计算得到，每个响应保存为一个 JSON 文件。
+    读取时检查 TTL，命中时刷新文件修改时间；总大小超过上限时按修改时间淘汰最久未使用的条目。
+    """
+
+    def __init__(self, cache_dir: str = "data/cache/llm_responses", ttl_seconds: float = 7 * 24 * 3600,
+                 max_bytes: int = 200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict], temperature: Optional[float] = None, **params) -> str:
+        """计算缓存键"""
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "params": params,
+        }
+        raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存，未命中或已过期时返回 None"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._count(hit=False)
+            return None
+
+        if self.ttl_seconds and time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+            self._remove(path)
+            self._count(hit=False)
+            return None
+
+        # 刷新修改时间，作为 LRU 淘汰依据
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._count(hit=True)
+        return entry.get("response")
+
+    def set(self, key: str, response: Any):
+        """写入缓存"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps({"created_at": time.time(), "response": response}, ensure_ascii=False)
+
+        # 先写临时文件再替换，避免并发读取到不完整的内容
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += len(data.encode("utf-8"))
+        self._evict_if_needed()
+
+    def clear(self):
+        """清空缓存"""
+        for path, _, _ in self._entries():
+            self._remove(path)
+        with self._lock:
+            self._total_bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0,
+            }
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _entries(self):
+        """遍历缓存文件，返回 (路径, 修改时间, 大小)"""
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def _evict_if_needed(self):
+        """总大小超过上限时，按修改时间淘汰最久未使用的条目，直到低于上限的 90%"""
+        if not self.max_bytes:
+            return
+        with self._lock:
+            if self._total_bytes is not None and self._total_bytes <= self.max_bytes:
+                return
+
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        if total > self.max_bytes:
+            target = self.max_bytes * 0.9
+            for path, _, size in entries:
+                if total <= target:
+                    break
+                self._remove(path)
+                total -= size
+
+        with self._lock:
+            self._total_bytes = total
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+_shared_cache: Optional[ResponseCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """获取共享的响应缓存实例，未启用缓存时返回 None"""
+    global _shared_cache
+    from server.config.settings import get_config
+
+    config = get_config()
+    if not config.LLM_CACHE_ENABLED:
+        return None
+
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache(
+                cache_dir=config.LLM_CACHE_DIR,
+                ttl_seconds=config.LLM_CACHE_TTL,
+                max_bytes=config.LLM_CACHE_MAX_MB * 1024 * 1024
+            )
+        return _shared_cache
@@ -0,0 +1,194 @@
+import json
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence
+
+# 句子结束符，用于在截断聊天回复时保持句子完整
+SENTENCE_BOUNDARIES = "。！？!?~～…\n"
+
+
+def strip_thinking(content: str) -> Optional[str]:
+    """去掉内容中的思考部分，返回可见回复
+
+    如果思考标签尚未闭合（模型仍在思考），返回 None
+    """
+    for open_tag, close_tag in (("<think>", "</think>"), ("<thought>", "</thought>")):
+        if open_tag in content:
+            close_pos = content.rfind(close_tag)
+            if close_pos == -1 or close_pos < content.rfind(open_tag):
+                return None
+            return content[close_pos + len(close_tag):]
+    return content
+
+
+class StopCondition(ABC):
+    """流式输出的停止条件基类"""
+
+    name = "base"
+
+    @abstractmethod
+    def check(self, content: str, reasoning: str, delta: str) -> bool:
+        """根据累计内容和最新增量判断是否可以停止"""
+
+    def trim(self, content: str) -> str:
+        """停止后对累计内容进行裁剪，默认原样返回"""
+        return content
+
+
+class JsonObjectComplete(StopCondition):
+    """回复中已出现包含指定键的完整 JSON 对象时停止"""
+
+    name = "json_complete"
+
+    def __init__(self, required_keys: Sequence[str] = ("x", "y")):
+        self.required_keys = tuple(required_keys)
+
+    def check(self, content: str, reasoning: str, delta: str) -> bool:
+        if "}" not in delta:
+            return False
+        visible = strip_thinking(content)
+        if visible is None:
+            return False
+
+        json_end = visible.rfind("}")
+        json_start = visible.rfind("{", 0, json_end)
+        if json_start == -1:
+            return False
+
+        try:
+            result = json.loads(visible[json_start:json_end + 1])
+        except json.JSONDecodeError:
+            return False
+        return isinstance(result, dict) and all(key in result for key in self.required_keys)
+
+    def trim(self, content: str) -> str:
+        return content[:content.rfind("}") + 1]
+
+
+class MaxCharsComplete(StopCondition):
+    """可见回复超过指定字数并且到达句子结尾时停止
+
+    若一直没有出现句子结束符，则在达到 hard_limit 时强制停止
+    """
+
+    name = "max_chars"
+
+    def __init__(self, max_chars: int, hard_limit: Optional[int] = None):
+        self.max_chars = max_chars
+        self.hard_limit = hard_limit or max_chars * 2
+
+    def check(self, content: str, reasoning: str, delta: str) -> bool:
+        visible = strip_thinking(content)
+        if visible is None:
+            return False
+
+        length = len(visible.strip())
+        if length >= self.hard_limit:
+            return True
+        return length >= self.max_chars and any(ch in SENTENCE_BOUNDARIES for ch in delta)
+
+    def trim(self, content: str) -> str:
+        visible = strip_thinking(content) or ""
+        prefix = content[:len(content) - len(visible)]
+        cut = max(visible.rfind(ch) for ch in SENTENCE_BOUNDARIES)
+        if cut == -1 or len(visible[:cut + 1].strip()) < self.max_chars:
+            return content
+        return prefix + visible[:cut + 1]
+
+
+class StopSequence(StopCondition):
+    """回复中出现指定字符串时停止"""
+
+    name = "stop_sequence"
+
+    def __init__(self, sequences: Sequence[str]):
+        self.sequences = [s for s in sequences if s]
+
+    def check(self, content: str, reasoning: str, delta: str) -> bool:
+        tail = content[-(len(delta) + max((len(s) for s in self.sequences), default=0)):]
+        return any(s in tail for s in self.sequences)
+
+    def trim(self, content: str) -> str:
+        positions = [content.find(s) for s in self.sequences if s in content]
+        return content[:min(positions)] if positions else content
+
+
+class StreamStats:
+    """提前终止的统计计数（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total_streams = 0
+        self.stopped_streams = 0
+        self.chunks_received = 0
+        self.estimated_tokens_saved = 0
+        self.stops_by_condition: Dict[str, int] = {}
+
+    def record(self, stopped_by: Optional[str], chunks: int, max_tokens: Optional[int]):
+        with self._lock:
+            self.total_streams += 1
+            self.chunks_received += chunks
+            if stopped_by:
+                self.stopped_streams += 1
+                self.stops_by_condition[stopped_by] = self.stops_by_condition.get(stopped_by, 0) + 1
+                if max_tokens:
+                    self.estimated_tokens_saved += max(0, max_tokens - chunks)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "total_streams": self.total_streams,
+                "stopped_streams": self.stopped_streams,
+                "chunks_received": self.chunks_received,
+                "estimated_tokens_saved": self.estimated_tokens_saved,
+                "stops_by_condition": dict(self.stops_by_condition),
+            }
+
+
+# 全局统计实例
+stream_stats = StreamStats()
+
+
+class StreamStopper:
+    """对流式增量逐个检查停止条件，并收集内容
+
+    使用方式：每收到一个增量调用 feed，返回 True 时调用方应关闭流；
+    结束后调用 finish 记录统计。节省的 token 数按 max_tokens 预算估算，是一个上限值。
+    """
+
+    def __init__(self, conditions: Optional[List[StopCondition]] = None,
+                 max_tokens: Optional[int] = None, stats: StreamStats = None):
+        self.conditions = conditions or []
+        self.max_tokens = max_tokens
+        self.stats = stats or stream_stats
+        self._content = ""
+        self.reasoning = ""
+        self.chunks = 0
+        self.stopped_by: Optional[str] = None
+
+    def feed(self, content: str = "", reasoning: str = "") -> bool:
+        """处理一个流式增量，返回是否应当停止"""
+        if not content and not reasoning:
+            return False
+
+        self.chunks += 1
+        self._content += content
+        self.reasoning += reasoning
+
+        if self.stopped_by or not content:
+            return bool(self.stopped_by)
+
+        for condition in self.conditions:
+            if condition.check(self._content, self.reasoning, content):
+                self.stopped_by = condition.name
+                self._content = condition.trim(self._content)
+                return True
+        return False
+
+    @property
+    def content(self) -> str:
+        return self._content
+
+    def finish(self):
+        """记录本次流的统计信息"""
+        self.stats.record(self.stopped_by, self.chunks, self.max_tokens)
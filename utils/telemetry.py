@@ -0,0 +1,334 @@
+import functools
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.profiling import span
+from utils.prompt_cache import extract_cache_usage
+
+# 直方图的桶边界（秒）
+TTFT_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+DURATION_BUCKETS = (0.5, 1, 2, 5, 10, 30, 60, 120)
+
+
+@dataclass
+class CallRecord:
+    """一次 LLM 调用的耗时和用量"""
+    provider: str
+    model: str
+    source: str
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+    ttft: Optional[float] = None  # 首 token 延迟（秒）
+    duration: Optional[float] = None  # 总耗时（秒）
+    inter_token_mean: Optional[float] = None  # 平均 token 间隔（秒）
+    inter_token_p95: Optional[float] = None
+    tokens_per_second: Optional[float] = None  # 首 token 之后的生成速率
+    prompt_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    reasoning_tokens: Optional[int] = None
+    usage_estimated: bool = False  # 没有收到 usage（如提前终止）时按增量数估算
+    chunks: int = 0
+    finish_reason: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def usage_tokens(usage: Any) -> Dict[str, Optional[int]]:
+    """从不同后端的 usage 中提取 prompt/cached/completion/reasoning token 数"""
+    result = {"prompt_tokens": None, "cached_tokens": None, "completion_tokens": None, "reasoning_tokens": None}
+    if usage is None:
+        return result
+    data = usage if isinstance(usage, dict) else (usage.model_dump() if hasattr(usage, "model_dump") else dict(vars(usage)))
+
+    cache = extract_cache_usage(data)
+    if cache:
+        result["prompt_tokens"] = cache["prompt_tokens"]
+        result["cached_tokens"] = cache["cached_tokens"]
+    result["completion_tokens"] = data.get("completion_tokens", data.get("output_tokens", data.get("eval_count")))
+    details = data.get("completion_tokens_details") or data.get("output_token_details") or {}
+    result["reasoning_tokens"] = details.get("reasoning_tokens", details.get("reasoning"))
+    return result
+
+
+class StreamTimer:
+    """记录一次流式调用的时间点，结束时生成 CallRecord"""
+
+    def __init__(self, provider: str, model: str, source: str, clock=None):
+        self._clock = clock or time.perf_counter
+        self.started = self._clock()
+        self.record = CallRecord(provider=provider, model=model, source=source)
+        self._first_token: Optional[float] = None
+        self._last_token: Optional[float] = None
+        self._gaps: List[float] = []
+        self._content_chunks = 0
+        self._reasoning_chunks = 0
+        self._usage = None
+
+    def on_delta(self, content: str = "", reasoning: str = "", usage: Any = None, finish_reason: str = None):
+        now = self._clock()
+        self.record.chunks += 1
+        if usage is not None:
+            self._usage = usage
+        if finish_reason:
+            self.record.finish_reason = finish_reason
+        if not (content or reasoning):
+            return
+        if content:
+            self._content_chunks += 1
+        if reasoning:
+            self._reasoning_chunks += 1
+        if self._first_token is None:
+            self._first_token = now
+        else:
+            self._gaps.append(now - self._last_token)
+        self._last_token = now
+
+    def on_error(self, error: BaseException):
+        self.record.error = f"{type(error).__name__}: {error}"
+
+    @property
+    def usage(self) -> Any:
+        return self._usage
+
+    def finish(self) -> CallRecord:
+        record = self.record
+        record.duration = round(self._clock() - self.started, 4)
+        if self._first_token is not None:
+            record.ttft = round(self._first_token - self.started, 4)
+        if self._gaps:
+            gaps = sorted(self._gaps)
+            record.inter_token_mean = round(sum(gaps) / len(gaps), 5)
+            record.inter_token_p95 = round(gaps[min(len(gaps) - 1, int(len(gaps) * 0.95))], 5)
+
+        record.__dict__.update(usage_tokens(self._usage))
+        if record.completion_tokens is None:
+            # 没有 usage 时每个增量按一个 token 估算
+            record.completion_tokens = self._content_chunks + self._reasoning_chunks
+            record.usage_estimated = True
+        if record.reasoning_tokens is None and self._reasoning_chunks:
+            record.reasoning_tokens = self._reasoning_chunks
+
+        if self._first_token is not None and self._last_token > self._first_token:
+            record.tokens_per_second = round(record.completion_tokens / (self._last_token - self._first_token), 2)
+        return record
+
+
+@dataclass
+class OperationRecord:
+    """一次存储读写、分析或绘图操作的耗时"""
+    name: str
+    duration: float
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+    error: Optional[str] = None
+
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.total += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class TelemetryStore:
+    """LLM 调用和操作耗时指标的本地存储
+
+    每次 LLM 调用追加一行 JSON 到 <metrics_dir>/llm-YYYY-MM-DD.jsonl，存储、分析等操作的耗时写入 ops-YYYY-MM-DD.jsonl，
+    同时在内存中累计计数器和直方图，用于输出 Prometheus 文本格式。
+    """
+
+    def __init__(self, metrics_dir: str = os.path.join("data", "metrics"), log: bool = True):
+        self.metrics_dir = metrics_dir
+        self.log = log
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[str, str, str, str], int] = {}
+        self._tokens: Dict[Tuple[str, str, str], int] = {}
+        self._ttft: Dict[Tuple[str, str], _Histogram] = {}
+        self._duration: Dict[Tuple[str, str], _Histogram] = {}
+        self._operations: Dict[str, _Histogram] = {}
+        os.makedirs(self.metrics_dir, exist_ok=True)
+
+    def _path(self, day: date, kind: str = "llm") -> str:
+        return os.path.join(self.metrics_dir, f"{kind}-{day.strftime('%Y-%m-%d')}.jsonl")
+
+    def record(self, record: CallRecord):
+        """保存一次调用的指标"""
+        line = json.dumps(asdict(record), ensure_ascii=False) + "\n"
+        status = "ok" if record.ok else "error"
+        key = (record.provider, record.model)
+        with self._lock:
+            with open(self._path(datetime.now().date()), "a", encoding="utf-8") as f:
+                f.write(line)
+
+            call_key = (record.provider, record.model, record.source, status)
+            self._calls[call_key] = self._calls.get(call_key, 0) + 1
+            for kind in ("prompt", "cached", "completion", "reasoning"):
+                value = getattr(record, f"{kind}_tokens")
+                if value:
+                    token_key = (record.provider, record.model, kind)
+                    self._tokens[token_key] = self._tokens.get(token_key, 0) + value
+            if record.ttft is not None:
+                self._ttft.setdefault(key, _Histogram(TTFT_BUCKETS)).observe(record.ttft)
+            if record.duration is not None:
+                self._duration.setdefault(key, _Histogram(DURATION_BUCKETS)).observe(record.duration)
+
+        if self.log:
+            if record.ok:
+                print(f"[llm] {record.provider}/{record.model} ({record.source}) 首 token {record.ttft}s，"
+                      f"总耗时 {record.duration}s，{record.completion_tokens} tokens"
+                      f"{'（估算）' if record.usage_estimated else ''}，{record.tokens_per_second} tokens/s，"
+                      f"结束原因 {record.finish_reason}")
+            else:
+                print(f"[llm] {record.provider}/{record.model} ({record.source}) 调用失败: {record.error}")
+
+    def record_operation(self, record: OperationRecord):
+        """保存一次操作的耗时"""
+        line = json.dumps(asdict(record), ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self._path(datetime.now().date(), "ops"), "a", encoding="utf-8") as f:
+                f.write(line)
+            self._operations.setdefault(record.name, _Histogram(DURATION_BUCKETS)).observe(record.duration)
+
+    def read_records(self, start: date, end: date = None, kind: str = "llm") -> Iterator[Dict]:
+        """按日期范围读取记录（包含两端），kind 为 llm（LLM 调用）或 ops（操作耗时）"""
+        end = end or datetime.now().date()
+        day = start
+        while day <= end:
+            path = self._path(day, kind)
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            yield json.loads(line)
+                        except json.JSONDecodeError:
+                            # 写入中断时可能留下不完整的最后一行
+                            continue
+            day += timedelta(days=1)
+
+    def prometheus_text(self) -> str:
+        """以 Prometheus 文本格式输出本进程启动以来的指标"""
+        def labels(**values) -> str:
+            return "{" + ",".join(f'{k}="{v}"' for k, v in values.items()) + "}"
+
+        lines = [
+            "# HELP llm_calls_total LLM 调用次数",
+            "# TYPE llm_calls_total counter",
+        ]
+        with self._lock:
+            for (provider, model, source, status), count in sorted(self._calls.items()):
+                lines.append(f"llm_calls_total{labels(provider=provider, model=model, source=source, status=status)} {count}")
+
+            lines += ["# HELP llm_tokens_total LLM token 用量", "# TYPE llm_tokens_total counter"]
+            for (provider, model, kind), count in sorted(self._tokens.items()):
+                lines.append(f"llm_tokens_total{labels(provider=provider, model=model, type=kind)} {count}")
+
+            for name, help_text, histograms in (
+                ("llm_time_to_first_token_seconds", "首 token 延迟", self._ttft),
+                ("llm_request_duration_seconds", "调用总耗时", self._duration),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (provider, model), hist in sorted(histograms.items()):
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        lines.append(f"{name}_bucket{labels(provider=provider, model=model, le=bound)} {count}")
+                    lines.append(f"{name}_bucket{labels(provider=provider, model=model, le='+Inf')} {hist.total}")
+                    lines.append(f"{name}_sum{labels(provider=provider, model=model)} {round(hist.sum, 4)}")
+                    lines.append(f"{name}_count{labels(provider=provider, model=model)} {hist.total}")
+
+            lines += ["# HELP operation_duration_seconds 存储、分析和绘图操作耗时",
+                      "# TYPE operation_duration_seconds summary"]
+            for name, hist in sorted(self._operations.items()):
+                lines.append(f"operation_duration_seconds_sum{labels(operation=name)} {round(hist.sum, 4)}")
+                lines.append(f"operation_duration_seconds_count{labels(operation=name)} {hist.total}")
+        return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(store: TelemetryStore, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """在后台线程中提供 /metrics 接口，供 Prometheus 抓取"""
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = store.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"[telemetry] 指标接口: http://{host}:{port}/metrics")
+    return server
+
+
+_shared_store: Optional[TelemetryStore] = None
+_shared_lock = threading.Lock()
+
+
+def get_telemetry() -> Optional[TelemetryStore]:
+    """获取共享的指标存储，未启用时返回 None；配置了 METRICS_PORT 时同时启动指标接口"""
+    global _shared_store
+    from server.config.settings import get_config
+
+    config = get_config()
+    if not config.TELEMETRY_ENABLED:
+        return None
+
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = TelemetryStore(config.METRICS_DIR, log=config.TELEMETRY_LOG)
+            if config.METRICS_PORT:
+                try:
+                    start_metrics_server(_shared_store, config.METRICS_PORT)
+                except OSError as e:
+                    # Streamlit 多进程或重复启动时端口可能已被占用
+                    print(f"[telemetry] 指标接口启动失败: {e}")
+        return _shared_store
+
+
+def timed(name: str):
+    """记录被装饰函数耗时的装饰器，未启用指标时只在开启了性能分析会话时计时"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            telemetry = get_telemetry()
+            if telemetry is None:
+                with span(name):
+                    return fn(*args, **kwargs)
+            start = time.perf_counter()
+            error = None
+            try:
+                with span(name):
+                    return fn(*args, **kwargs)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                telemetry.record_operation(OperationRecord(
+                    name=name,
+                    duration=round(time.perf_counter() - start, 5),
+                    error=error
+                ))
+        return wrapper
+    return decorator